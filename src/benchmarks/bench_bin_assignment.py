@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Benchmark spatial BIN assignment with and without an RTREE index on
+building footprints.
+"""
+
+import json
+import time
+
+import click
+import duckdb as db
+
+from building_damage.DamageReportPipeline import DamageReportPipeline
+from building_damage.utils.extraction_utils import ensure_spatial_extension
+from building_damage.utils.spatial_utils import assign_bins_from_footprints
+
+
+def _time_assignment(
+    conn: db.DuckDBPyConnection, bin_rule: str, scale: int
+) -> float:
+    """Stage the reports and time one BIN assignment pass over them."""
+    conn.execute(
+        f"""
+        CREATE OR REPLACE TEMPORARY TABLE bench_reports AS
+        SELECT r.*
+        FROM reports AS r, range({scale})
+    """
+    )
+    start = time.perf_counter()
+    assign_bins_from_footprints(conn, "bench_reports", bin_rule)
+    return time.perf_counter() - start
+
+
+@click.command()
+@click.option(
+    "--db-path",
+    type=click.Path(exists=True),
+    required=True,
+    help="DuckDB database with a building_footprints table",
+)
+@click.option(
+    "--csv-path",
+    type=click.Path(exists=True),
+    default="data/raw/storm_damage_BIN.csv",
+    show_default=True,
+    help="Damage report CSV to assign BINs to",
+)
+@click.option(
+    "--scale",
+    type=click.IntRange(min=1),
+    default=100,
+    show_default=True,
+    help="Number of times to replicate the CSV rows",
+)
+@click.option(
+    "--repeat",
+    type=click.IntRange(min=1),
+    default=3,
+    show_default=True,
+    help="Number of timed runs per variant",
+)
+def main(db_path: str, csv_path: str, scale: int, repeat: int) -> None:
+    """Print JSON timings for BIN assignment with and without RTREE."""
+    conn = db.connect()
+    ensure_spatial_extension(conn)
+    conn.execute(f"ATTACH '{db_path}' AS base (READ_ONLY)")
+    conn.execute(
+        """
+        CREATE TABLE building_footprints AS
+        SELECT bin, geom FROM base.building_footprints
+    """
+    )
+    conn.execute(
+        f"CREATE TABLE reports AS SELECT * FROM read_csv('{csv_path}')"
+    )
+    rows = scale * conn.execute("SELECT COUNT(*) FROM reports").fetchone()[0]
+    bin_rule = DamageReportPipeline(conn, "").column_validation_rules()["bin"]
+
+    for variant in ["no_index", "rtree"]:
+        if variant == "rtree":
+            conn.execute(
+                """
+                CREATE INDEX building_footprints_geom
+                ON building_footprints USING RTREE (geom)
+            """
+            )
+        for run in range(repeat):
+            seconds = _time_assignment(conn, bin_rule, scale)
+            print(
+                json.dumps(
+                    {
+                        "benchmark": "bin_assignment",
+                        "variant": variant,
+                        "run": run,
+                        "rows": rows,
+                        "seconds": round(seconds, 4),
+                        "rows_per_sec": round(rows / seconds, 1),
+                    }
+                )
+            )
+
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
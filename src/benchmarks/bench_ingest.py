@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""
+Benchmark the ingestion path end to end on synthetic damage reports:
+DamageReportPipeline.process_csv (whole-file and chunked), spatial BIN
+assignment, and loading base data from GeoJSON and from snapshots.
+
+Each case runs in a fresh process so its peak RSS is its own. Results
+are printed as JSON lines, one per case and run, and can be appended to
+a file for comparing runs.
+"""
+
+import functools
+import http.server
+import json
+import resource
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from multiprocessing import get_context
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import click
+import duckdb as db
+
+from building_damage.DamageReportPipeline import (
+    DAMAGE_REPORT_COLUMNS,
+    DamageReportPipeline,
+)
+from building_damage.utils.extraction_utils import (
+    download_geojson_to_table,
+    ensure_spatial_extension,
+    load_snapshot,
+    write_snapshot,
+)
+from building_damage.utils.synthetic_utils import (
+    create_synthetic_footprints,
+    write_synthetic_reports,
+)
+
+SEED = 0
+
+
+def _peak_rss_mb() -> float:
+    """Peak resident set size of this process so far (Linux reports KB)."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _stage_seconds(pipeline: DamageReportPipeline) -> Dict[str, float]:
+    """Total seconds per stage from a pipeline's metrics."""
+    totals: Dict[str, float] = {}
+    for metric in pipeline.metrics.stages:
+        totals[metric.stage] = totals.get(metric.stage, 0.0) + metric.seconds
+    return {stage: round(seconds, 4) for stage, seconds in totals.items()}
+
+
+def _bench_pipeline(
+    csv_path: str,
+    batch_size: Optional[int],
+    assign_bins: bool,
+    buildings: int,
+) -> Tuple[float, Dict[str, float]]:
+    """Run one CSV through a fresh in-memory pipeline."""
+    conn = db.connect()
+    if assign_bins:
+        ensure_spatial_extension(conn)
+        create_synthetic_footprints(conn, buildings, SEED)
+        conn.execute(
+            """
+            CREATE INDEX building_footprints_geom
+            ON building_footprints USING RTREE (geom)
+        """
+        )
+    pipeline = DamageReportPipeline(
+        conn, DAMAGE_REPORT_COLUMNS, assign_bins=assign_bins
+    )
+
+    start = time.perf_counter()
+    if batch_size:
+        pipeline.process_csv_chunked(
+            csv_path, "storm_damage", "storm_damage_invalid", batch_size
+        )
+    else:
+        pipeline.process_csv(csv_path, "storm_damage", "storm_damage_invalid")
+    seconds = time.perf_counter() - start
+
+    conn.close()
+    return seconds, _stage_seconds(pipeline)
+
+
+def _bench_base_data(
+    work_dir: str, buildings: int
+) -> Tuple[float, Dict[str, float]]:
+    """Download synthetic footprints over local HTTP, then snapshot them."""
+    conn = db.connect()
+    ensure_spatial_extension(conn)
+    create_synthetic_footprints(conn, buildings, SEED, "synthetic_footprints")
+    geojson_path = Path(work_dir) / "footprints.geojson"
+    conn.execute(
+        f"""
+        COPY synthetic_footprints TO '{geojson_path}'
+        WITH (FORMAT GDAL, DRIVER 'GeoJSON')
+    """
+    )
+
+    handler = functools.partial(
+        http.server.SimpleHTTPRequestHandler, directory=work_dir
+    )
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    endpoint = f"http://127.0.0.1:{server.server_port}/footprints.geojson"
+
+    stages = {}
+    start = time.perf_counter()
+    try:
+        download_geojson_to_table(
+            conn, "building_footprints", endpoint, create_spatial_index=True
+        )
+        stages["download_and_load"] = time.perf_counter() - start
+    finally:
+        server.shutdown()
+
+    stage_start = time.perf_counter()
+    cache_dir = str(Path(work_dir) / "cache")
+    write_snapshot(conn, "building_footprints", cache_dir, "bench")
+    stages["snapshot_write"] = time.perf_counter() - stage_start
+
+    stage_start = time.perf_counter()
+    load_snapshot(
+        conn, "building_footprints", cache_dir, create_spatial_index=True
+    )
+    stages["snapshot_load"] = time.perf_counter() - stage_start
+    seconds = time.perf_counter() - start
+
+    conn.close()
+    return seconds, {k: round(v, 4) for k, v in stages.items()}
+
+
+def _run_case(case: Dict[str, Any]) -> Dict[str, Any]:
+    """Run one benchmark case; executed in its own process."""
+    if case["benchmark"] == "base_data":
+        seconds, stages = _bench_base_data(case["work_dir"], case["rows"])
+    else:
+        seconds, stages = _bench_pipeline(
+            case["csv_path"],
+            case.get("batch_size"),
+            case["benchmark"] == "assign_bins",
+            max(case["rows"] // 10, 1),
+        )
+    return {
+        "seconds": round(seconds, 4),
+        "rows_per_sec": round(case["rows"] / seconds, 1),
+        "peak_rss_mb": round(_peak_rss_mb(), 1),
+        "stages": stages,
+    }
+
+
+def _build_cases(
+    work_dir: str,
+    rows: List[int],
+    invalid_ratio: float,
+    batch_size: int,
+    spatial: bool,
+) -> List[Dict[str, Any]]:
+    """Generate one synthetic CSV per size and list the cases to run."""
+    conn = db.connect()
+    cases = []
+    for num_rows in rows:
+        csv_path = str(Path(work_dir) / f"reports_{num_rows}.csv")
+        write_synthetic_reports(conn, csv_path, num_rows, invalid_ratio, SEED)
+        base = {"rows": num_rows, "csv_path": csv_path, "work_dir": work_dir}
+        cases.append({**base, "benchmark": "process_csv"})
+        cases.append(
+            {
+                **base,
+                "benchmark": "process_csv_chunked",
+                "batch_size": batch_size,
+            }
+        )
+        if spatial:
+            cases.append({**base, "benchmark": "assign_bins"})
+            # Here rows counts footprints rather than reports
+            cases.append({**base, "benchmark": "base_data"})
+    conn.close()
+    return cases
+
+
+@click.command()
+@click.option(
+    "--rows",
+    type=click.IntRange(min=1),
+    multiple=True,
+    default=[10_000, 100_000],
+    show_default=True,
+    help="Number of synthetic reports; repeat for several sizes",
+)
+@click.option(
+    "--invalid-ratio",
+    type=click.FloatRange(0, 1),
+    default=0.02,
+    show_default=True,
+    help="Share of synthetic reports that fail validation",
+)
+@click.option(
+    "--batch-size",
+    type=click.IntRange(min=1),
+    default=100_000,
+    show_default=True,
+    help="Batch size for the chunked pipeline case",
+)
+@click.option(
+    "--spatial/--no-spatial",
+    default=True,
+    show_default=True,
+    help="Include BIN assignment and base-data cases, which need spatial",
+)
+@click.option(
+    "--repeat",
+    type=click.IntRange(min=1),
+    default=1,
+    show_default=True,
+    help="Number of timed runs per case",
+)
+@click.option(
+    "--output",
+    type=click.Path(dir_okay=False),
+    help="Also append the JSON lines to this file",
+)
+@click.option(
+    "--work-dir",
+    type=click.Path(file_okay=False),
+    help="Directory for generated files (default: a temporary directory)",
+)
+def main(
+    rows: Tuple[int, ...],
+    invalid_ratio: float,
+    batch_size: int,
+    spatial: bool,
+    repeat: int,
+    output: Optional[str],
+    work_dir: Optional[str],
+) -> None:
+    """Print JSON lines with rows/sec, peak RSS and per-stage time."""
+    started_at = datetime.now().isoformat(timespec="seconds")
+    with tempfile.TemporaryDirectory() as temp_dir:
+        work_dir = work_dir or temp_dir
+        Path(work_dir).mkdir(parents=True, exist_ok=True)
+        cases = _build_cases(
+            work_dir, list(rows), invalid_ratio, batch_size, spatial
+        )
+
+        for case in cases:
+            for run in range(repeat):
+                with ProcessPoolExecutor(
+                    max_workers=1, mp_context=get_context("spawn")
+                ) as executor:
+                    result = executor.submit(_run_case, case).result()
+                record = {
+                    "started_at": started_at,
+                    "duckdb_version": db.__version__,
+                    "benchmark": case["benchmark"],
+                    "rows": case["rows"],
+                    "invalid_ratio": invalid_ratio,
+                    "batch_size": case.get("batch_size"),
+                    "run": run,
+                    **result,
+                }
+                line = json.dumps(record)
+                print(line)
+                if output:
+                    with open(output, "a") as output_file:
+                        output_file.write(line + "\n")
+
+
+if __name__ == "__main__":
+    main()
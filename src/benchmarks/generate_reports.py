@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Generate a synthetic damage report CSV, and optionally matching building
+footprints, for benchmarking and load testing the pipeline.
+"""
+
+from typing import Optional
+
+import click
+import duckdb as db
+
+from building_damage.utils.extraction_utils import ensure_spatial_extension
+from building_damage.utils.synthetic_utils import (
+    create_synthetic_footprints,
+    write_synthetic_reports,
+)
+
+
+@click.command()
+@click.option(
+    "--output",
+    type=click.Path(dir_okay=False),
+    required=True,
+    help="Path of the CSV to write",
+)
+@click.option(
+    "--rows",
+    type=click.IntRange(min=1),
+    default=10_000,
+    show_default=True,
+    help="Number of reports, e.g. 10000 to 50000000",
+)
+@click.option(
+    "--invalid-ratio",
+    type=click.FloatRange(0, 1),
+    default=0.02,
+    show_default=True,
+    help="Share of reports that fail validation",
+)
+@click.option(
+    "--seed",
+    type=int,
+    default=0,
+    show_default=True,
+    help="Seed for the generated values",
+)
+@click.option(
+    "--footprints-db",
+    type=click.Path(dir_okay=False),
+    help="Also create matching building_footprints in this DuckDB file",
+)
+def main(
+    output: str,
+    rows: int,
+    invalid_ratio: float,
+    seed: int,
+    footprints_db: Optional[str],
+) -> None:
+    """Write synthetic damage reports to a CSV."""
+    buildings = max(rows // 10, 1)
+    conn = db.connect(footprints_db or ":memory:")
+    try:
+        write_synthetic_reports(
+            conn, output, rows, invalid_ratio, seed, buildings
+        )
+        if footprints_db:
+            ensure_spatial_extension(conn)
+            create_synthetic_footprints(conn, buildings, seed)
+    finally:
+        conn.close()
+    print(f"Wrote {rows} reports to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,24 +1,166 @@
 import logging
+import os
+import threading
+import time
+import uuid
 from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext, suppress
+from functools import partial
 from pathlib import Path
-from typing import Callable, Dict, List, Optional, Tuple
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+)
 
 import duckdb as db
 
-ValidationFunction = Callable[[db.DuckDBPyConnection], None]
+from building_damage.QueryCache import QueryCache
+from building_damage.utils.csv_utils import (
+    CsvDialect,
+    iter_csv_chunk_offsets,
+    read_csv_query,
+    sniff_dialect,
+)
+from building_damage.utils.metrics_utils import RunMetrics, StageMetric
+from building_damage.utils.partition_utils import (
+    DEFAULT_EVENT,
+    check_event_name,
+    create_partition_view,
+    publish_batch_files,
+    remove_batch_files,
+    write_partitions,
+)
+from building_damage.utils.reader_utils import (
+    describe_source,
+    read_query,
+    source_format,
+)
+from building_damage.utils.schema_utils import (
+    Schema,
+    match_columns,
+    parse_schema,
+    projection_query,
+)
+
+# Hooks receive the connection and the name of the run's staging table
+ValidationFunction = Callable[[db.DuckDBPyConnection, str], None]
+
+# Batch hooks receive a pyarrow RecordBatch of staged rows and return a
+# RecordBatch or pandas DataFrame to replace it
+BatchFunction = Callable[[Any], Any]
+
+# Rows per Arrow batch handed to batch hooks; one DuckDB row group
+ARROW_BATCH_ROWS = 122_880
+
+DEFAULT_BATCH_SIZE = 100_000
+
+RULE_STATS_TABLE = "validation_rule_stats"
 
 
 class BasePipeline(ABC):
-    def __init__(self, db_conn: db.DuckDBPyConnection, schema: str):
+    def __init__(
+        self,
+        db_conn: db.DuckDBPyConnection,
+        schema: Schema,
+        write_lock: Optional[threading.Lock] = None,
+        merge_key: Optional[Sequence[str]] = None,
+        profile_rules: bool = False,
+        profile_dir: Optional[str] = None,
+        partition_dir: Optional[str] = None,
+        event: str = DEFAULT_EVENT,
+        hook_workers: Optional[int] = None,
+        result_cache: Optional[QueryCache] = None,
+    ):
         """Initialize pipeline with database connection.
 
         Args:
             db_conn: DuckDB database connection
-            schema: Table schema definition
+            schema: Staging columns, as a list of Column or a
+                "Name TYPE, ..." schema string. Source columns are matched
+                to them by sanitized name or alias when read.
+            write_lock: Optional lock shared by pipelines running in
+                parallel, so that only one of them writes to the output
+                tables at a time
+            merge_key: Optional columns identifying one entity, e.g.
+                ["bin"]. When set, the target table is kept as an
+                append-only history and the latest valid row per key is
+                upserted into a "<target_table>_current" table.
+            profile_rules: Whether to also time each validation rule on
+                its own, to find expensive rules. Costs one extra pass
+                over staging per rule.
+            profile_dir: Optional directory to write a DuckDB JSON query
+                profile (the EXPLAIN ANALYZE tree) of every stage to
+            partition_dir: Optional root of a Hive-partitioned Parquet
+                store. When set, valid rows are written there by event
+                and ingest date, and the target table is a view over it.
+            event: Event the ingested reports belong to, e.g. a storm
+                name; partitions the store
+            hook_workers: Threads running batch hooks over staging's
+                Arrow batches; defaults to ThreadPoolExecutor's default
+            result_cache: Optional query cache to invalidate results of
+                the tables each batch writes to, once it commits
         """
         self.conn = db_conn
         self.logger = logging.getLogger(__name__)
         self.schema = schema
+        self.columns = parse_schema(schema)
+        self._mappings: Dict[Tuple[str, ...], Dict[str, Optional[str]]] = {}
+        self.write_lock = write_lock
+        self.merge_key = list(merge_key) if merge_key else None
+        self.profile_rules = profile_rules
+        self.rule_failures: Dict[str, int] = {}
+        self.rule_seconds: Dict[str, float] = {}
+        self._batch_rule_seconds: Dict[str, float] = {}
+        self.profile_dir = profile_dir
+        # Absolute, since the view over the store is saved in the database
+        self.partition_dir = (
+            str(Path(partition_dir).resolve()) if partition_dir else None
+        )
+        self.event = check_event_name(event)
+        self.hook_workers = hook_workers
+        self.result_cache = result_cache
+        self.metrics = RunMetrics()
+        self._source = ""
+        self._batch = 0
+        # Target of the batch being processed, for hooks that read it
+        self.target_table: Optional[str] = None
+        self.staging_table = self._new_staging_name()
+
+    def validation_rules(self) -> Dict[str, str]:
+        """All column and row rules by name.
+
+        Column rules are named after their column; row rules keep their
+        own names.
+        """
+        return {
+            **self.column_validation_rules(),
+            **self.row_validation_rules(),
+        }
+
+    def failed_rules_expression(self) -> str:
+        """Build an expression listing the rules a record fails.
+
+        Every rule is evaluated in the same projection, and rules that are
+        false or NULL contribute their name to the list.
+
+        Returns:
+            SQL expression that evaluates to a VARCHAR[] of rule names,
+            empty for valid records
+        """
+        checks = [
+            f"CASE WHEN COALESCE({rule}, FALSE) THEN NULL ELSE '{name}' END"
+            for name, rule in self.validation_rules().items()
+        ]
+        if not checks:
+            return "[]::VARCHAR[]"
+        return f"list_filter([{', '.join(checks)}], r -> r IS NOT NULL)"
 
     def validation_expression(self) -> str:
         """Build validation expression from column and row rules.
@@ -41,6 +183,43 @@ class BasePipeline(ABC):
         # Return combined validation expression
         return " AND ".join(conditions)
 
+    def column_normalizations(self) -> Dict[str, str]:
+        """Optional SQL expressions applied to columns as they are read.
+
+        Each expression replaces the column named by its key and is
+        written in terms of that column, e.g. {"city": "TRIM(city)"}.
+        """
+        return {}
+
+    def derived_columns(self) -> Dict[str, str]:
+        """Optional SQL expressions for columns computed from the staged ones.
+
+        They are evaluated in the validation projection, so a derived
+        column costs no extra pass over staging, e.g.
+        {"grid_cell": grid_cell_expression()}. Existing output tables gain
+        new derived columns filled in for their older rows.
+        """
+        return {}
+
+    def cluster_columns(self) -> List[str]:
+        """Optional columns to sort each batch's valid rows by on insert.
+
+        Rows with close values then share row groups, so the min/max
+        zonemaps DuckDB keeps per row group let filters on these columns,
+        including the dynamic filters of joins, skip most of the table.
+        Costs a sort of each batch; not applied to partitioned stores.
+        """
+        return []
+
+    def written_tables(
+        self, target_table: str, invalid_table: str
+    ) -> List[str]:
+        """Tables a batch writes to, including those written by hooks."""
+        tables = [target_table, invalid_table, RULE_STATS_TABLE]
+        if self.merge_key:
+            tables.append(f"{target_table}_current")
+        return tables
+
     @property
     def pre_validation_hooks(self) -> Optional[List[ValidationFunction]]:
         """Optional hooks to run before validation for data enrichment."""
@@ -51,6 +230,19 @@ class BasePipeline(ABC):
         """Optional hooks to run after validation."""
         return None
 
+    @property
+    def batch_hooks(self) -> Optional[List[BatchFunction]]:
+        """Optional Python hooks to run over staging before validation.
+
+        For enrichment that SQL cannot express, e.g. parsing addresses
+        or calling a local model. Each hook gets the staged rows as
+        pyarrow RecordBatches, which it can process with pyarrow.compute
+        or as a DataFrame, and returns the batch to keep, with the same
+        columns. Batches run in parallel on a thread pool, so hooks must
+        be thread-safe; pyarrow and NumPy release the GIL for most work.
+        """
+        return None
+
     @abstractmethod
     def column_validation_rules(self) -> Dict[str, str]:
         """Mapping of column names to validation rules."""
@@ -71,6 +263,11 @@ class BasePipeline(ABC):
         Process CSV through staging and validation into target table.
         Store invalid records in separate table.
 
+        Columns are renamed, cast and normalized as the file is read,
+        and validity and the update timestamp are computed in a single
+        projection over the staged rows, so staging is never rewritten
+        by ALTER/UPDATE statements before the rows are routed.
+
         Args:
             csv_path: Path to input CSV
             target_table: Name of final table
@@ -79,103 +276,819 @@ class BasePipeline(ABC):
         Returns:
             Tuple of (valid_count, invalid_count)
         """
+        return self._process_source(
+            self._csv_source([csv_path]),
+            csv_path,
+            1,
+            target_table,
+            invalid_table,
+        )
+
+    def process_csv_files(
+        self,
+        csv_paths: Sequence[str],
+        target_table: str,
+        invalid_table: str,
+    ) -> Tuple[int, int]:
+        """
+        Process several CSVs as one batch.
+
+        Files sharing a header and dialect are read by a single read_csv
+        call, so a micro-batch of small files costs one staging,
+        validation and commit rather than one per file. Each file is
+        mapped by its own header, so files listing the columns in a
+        different order still land in the right staging columns.
+
+        Args:
+            csv_paths: Paths to input CSVs
+            target_table: Name of final table
+            invalid_table: Name of table to store invalid records
+
+        Returns:
+            Tuple of (valid_count, invalid_count)
+        """
+        source_name = csv_paths[0]
+        if len(csv_paths) > 1:
+            source_name += f" (+{len(csv_paths) - 1} files)"
+        return self._process_source(
+            self._csv_source(csv_paths),
+            source_name,
+            1,
+            target_table,
+            invalid_table,
+        )
+
+    def process_file(
+        self,
+        path: str,
+        target_table: str,
+        invalid_table: str,
+        file_format: Optional[str] = None,
+        where: Optional[str] = None,
+        on_commit: Optional[Callable[[], None]] = None,
+    ) -> Tuple[int, int]:
+        """
+        Process a CSV, Parquet, NDJSON or GeoJSON file in its own format.
+
+        Each format is read natively rather than converted to CSV, so
+        source types are kept, and only the mapped columns are read from
+        formats that store columns separately.
+
+        Args:
+            path: Path to input file
+            target_table: Name of final table
+            invalid_table: Name of table to store invalid records
+            file_format: One of reader_utils.SOURCE_FORMATS values;
+                inferred from the extension when not given
+            where: Optional SQL filter over the staging columns, applied
+                while reading, e.g. "zip_code LIKE '104%'"
+            on_commit: Optional callback run inside the transaction that
+                commits the rows, e.g. to record the file as ingested
+
+        Returns:
+            Tuple of (valid_count, invalid_count)
+        """
+        file_format = file_format or source_format(path)
+        if file_format == "csv":
+            source = self._csv_source([path], where)
+        else:
+            reader = read_query(self.conn, [path], file_format)
+            source = self._mapped_source(
+                reader, describe_source(self.conn, reader), where
+            )
+        return self._process_source(
+            source, path, 1, target_table, invalid_table, on_commit
+        )
+
+    def process_arrow(
+        self,
+        table: Any,
+        target_table: str,
+        invalid_table: str,
+        source_name: str = "arrow",
+        where: Optional[str] = None,
+    ) -> Tuple[int, int]:
+        """
+        Process an in-memory Arrow table (or pandas DataFrame).
+
+        The table is registered as a view, so DuckDB scans its buffers
+        directly instead of copying or serializing it first.
+
+        Args:
+            table: pyarrow Table, RecordBatchReader or DataFrame
+            target_table: Name of final table
+            invalid_table: Name of table to store invalid records
+            source_name: Name to record the batch under in metrics
+            where: Optional SQL filter over the staging columns
+
+        Returns:
+            Tuple of (valid_count, invalid_count)
+        """
+        view = f"arrow_{uuid.uuid4().hex}"
+        self.conn.register(view, table)
         try:
-            # Create temporary staging table
-            self.conn.execute(
-                f"""
-                CREATE TEMPORARY TABLE staging_data (
-                    {self.schema}
+            source = self._mapped_source(
+                view, describe_source(self.conn, view), where
+            )
+            return self._process_source(
+                source, source_name, 1, target_table, invalid_table
+            )
+        finally:
+            self.conn.unregister(view)
+
+    def process_csv_chunked(
+        self,
+        csv_path: str,
+        target_table: str,
+        invalid_table: str,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        memory_limit: Optional[str] = None,
+        start_offset: int = 0,
+        end_offset: Optional[int] = None,
+        on_commit: Optional[Callable[[int], None]] = None,
+    ) -> Tuple[int, int]:
+        """
+        Process a CSV in bounded batches so memory stays flat with file size.
+
+        Each batch is staged, run through the pre-validation hooks,
+        validated and inserted on its own, so only one batch is ever
+        held in staging.
+
+        Args:
+            csv_path: Path to input CSV
+            target_table: Name of final table
+            invalid_table: Name of table to store invalid records
+            batch_size: Maximum number of CSV records per batch
+            memory_limit: Optional DuckDB memory ceiling, e.g. '2GB'. The
+                setting is database-wide, so it also applies to other
+                sessions until this call restores the previous limit.
+            start_offset: Byte offset to start reading records from, used
+                to ingest only the rows appended to a file
+            end_offset: Optional byte offset to stop reading at, so rows
+                appended during the run are left for the next one
+            on_commit: Optional callback run inside each batch's commit
+                transaction with the byte offset the batch ends at, e.g.
+                to record progress in the ingest manifest
+
+        Returns:
+            Tuple of (valid_count, invalid_count) summed over all batches
+        """
+        previous_limit = None
+        if memory_limit:
+            previous_limit = self.conn.execute(
+                "SELECT current_setting('memory_limit')"
+            ).fetchone()[0]
+            self.conn.execute(f"SET memory_limit = '{memory_limit}'")
+
+        valid_total, invalid_total = 0, 0
+        try:
+            for batch_number, (chunk_path, chunk_end) in enumerate(
+                iter_csv_chunk_offsets(
+                    csv_path, batch_size, start_offset, end_offset
+                ),
+                start=1,
+            ):
+                valid_count, invalid_count = self._process_source(
+                    self._csv_source([chunk_path]),
+                    csv_path,
+                    batch_number,
+                    target_table,
+                    invalid_table,
+                    on_commit and partial(on_commit, chunk_end),
                 )
-            """
+                valid_total += valid_count
+                invalid_total += invalid_count
+                self.logger.info(
+                    f"Batch {batch_number}: {valid_count} valid, "
+                    f"{invalid_count} invalid records"
+                )
+        finally:
+            if previous_limit:
+                self._restore_memory_limit(previous_limit)
+
+        return valid_total, invalid_total
+
+    def _restore_memory_limit(self, previous_limit: str) -> None:
+        """Put back a memory limit saved by current_setting.
+
+        The saved value is rounded for display, so the exact default is
+        restored by RESET when the previous limit was the default.
+        """
+        self.conn.execute("RESET memory_limit")
+        default_limit = self.conn.execute(
+            "SELECT current_setting('memory_limit')"
+        ).fetchone()[0]
+        if default_limit != previous_limit:
+            self.conn.execute(f"SET memory_limit = '{previous_limit}'")
+
+    def _process_source(
+        self,
+        source: str,
+        source_name: str,
+        batch: int,
+        target_table: str,
+        invalid_table: str,
+        on_commit: Optional[Callable[[], None]] = None,
+    ) -> Tuple[int, int]:
+        """Stage, validate and route one batch, timing each stage.
+
+        Args:
+            source: SQL table expression to read from, e.g. read_csv(...)
+            source_name: Input the batch came from, for metrics
+            batch: Batch number within the input, for metrics
+            target_table: Name of final table
+            invalid_table: Name of table to store invalid records
+            on_commit: Optional callback run inside the commit transaction
+
+        Returns:
+            Tuple of (valid_count, invalid_count)
+        """
+        self._source, self._batch = source_name, batch
+        self.target_table = target_table
+        self.staging_table = self._new_staging_name()
+        try:
+            with self._stage("load") as metric:
+                staged_count = metric.rows = self._load_staging(source)
+
+            # Run pre-validation hooks if any
+            self._run_hooks(self.pre_validation_hooks, "pre")
+            if self.batch_hooks:
+                with self._stage("batch_hooks") as metric:
+                    metric.rows = self._run_batch_hooks(self.batch_hooks)
+
+            with self._stage("validate") as metric:
+                self._validate_staging()
+                metric.rows = staged_count
+
+            # Post-validation hooks and inserts are the write phase; run
+            # them as one transaction, one pipeline at a time
+            with self.write_lock or nullcontext():
+                return self._commit_staging(
+                    target_table, invalid_table, on_commit
+                )
+
+        # Clean up the staging table whether or not the run succeeded
+        finally:
+            self.conn.execute(f"DROP TABLE IF EXISTS {self.staging_table}")
+
+    def _csv_source(
+        self, csv_paths: Sequence[str], where: Optional[str] = None
+    ) -> str:
+        """Build a table expression reading CSVs into the staging columns.
+
+        Files are grouped by dialect, sniffed once per distinct header
+        line, and each group is read by one read_csv call mapped by its
+        own header. Matched columns are typed in the reader itself.
+
+        Args:
+            csv_paths: Paths to CSVs
+            where: Optional filter over the staging columns
+
+        Returns:
+            SQL table expression producing the staging columns
+        """
+        groups: Dict[CsvDialect, List[str]] = {}
+        for csv_path in csv_paths:
+            dialect = sniff_dialect(self.conn, csv_path)
+            groups.setdefault(dialect, []).append(csv_path)
+
+        sources = []
+        for dialect, paths in groups.items():
+            mapping = self._mapping(dialect.headers, dialect.has_header)
+            types = {
+                header: column.type
+                for column in self.columns
+                if (header := mapping.get(column.name))
+            }
+            sources.append(
+                self._mapped_source(
+                    read_csv_query(paths, dialect, types),
+                    dialect.headers,
+                    where,
+                )
+            )
+        if len(sources) == 1:
+            return sources[0]
+        return "({})".format(
+            " UNION ALL BY NAME ".join(
+                f"SELECT * FROM {source}" for source in sources
             )
+        )
 
-            # Load data into staging table
-            self.conn.execute(
-                f"""
-                INSERT INTO staging_data 
-                SELECT * FROM read_csv('{csv_path}')
-            """
+    def _mapping(
+        self, headers: Tuple[str, ...], has_header: bool = True
+    ) -> Dict[str, Optional[str]]:
+        """Source header per staging column, computed once per header."""
+        if headers not in self._mappings:
+            if has_header:
+                mapping = match_columns(self.columns, headers)
+            else:
+                # Without a header, columns are taken in schema order
+                mapping = {
+                    column.name: header
+                    for column, header in zip(self.columns, headers)
+                }
+            self._mappings[headers] = mapping
+        return self._mappings[headers]
+
+    def _mapped_source(
+        self,
+        source: str,
+        headers: Tuple[str, ...],
+        where: Optional[str] = None,
+    ) -> str:
+        """Project a source onto the staging columns.
+
+        Args:
+            source: SQL table expression to read from
+            headers: Column names of the source
+            where: Optional filter over the staging columns
+
+        Returns:
+            SQL table expression producing the staging columns
+        """
+        query = projection_query(
+            source,
+            self.columns,
+            self._mapping(headers),
+            self.column_normalizations(),
+        )
+        if where:
+            # DuckDB pushes the filter through the projection into the
+            # scan, e.g. to skip Parquet row groups
+            query = f"SELECT * FROM ({query}) WHERE {where}"
+        return f"({query})"
+
+    @staticmethod
+    def _new_staging_name() -> str:
+        """Unique staging table name, so that runs sharing a connection
+        never see each other's rows."""
+        return f"staging_{uuid.uuid4().hex}"
+
+    @contextmanager
+    def _stage(self, name: str) -> Iterator[StageMetric]:
+        """Time a stage of the current batch, profiling it if requested."""
+        if self.profile_dir:
+            Path(self.profile_dir).mkdir(parents=True, exist_ok=True)
+            profile_path = Path(self.profile_dir) / (
+                f"{self.metrics.run_id}_{Path(self._source).stem}_"
+                f"{self._batch:05d}_{name}.json"
             )
+            self.conn.execute("SET enable_profiling = 'json'")
+            self.conn.execute(f"SET profiling_output = '{profile_path}'")
+        try:
+            with self.metrics.stage(self._source, self._batch, name) as metric:
+                yield metric
+        finally:
+            if self.profile_dir:
+                self.conn.execute("RESET enable_profiling")
 
-            # Run pre-validation hooks if any
-            if self.pre_validation_hooks:
-                for hook in self.pre_validation_hooks:
-                    hook(self.conn)
+    def _load_staging(self, source: str) -> int:
+        """Load rows from a table expression into the staging table.
+
+        Args:
+            source: SQL table expression to read from, already projected
+                to the staging columns
+
+        Returns:
+            Number of rows staged
+        """
+        return self.conn.execute(
+            f"""
+            CREATE TEMPORARY TABLE {self.staging_table} AS
+            SELECT * FROM {source}
+        """
+        ).fetchone()[0]
+
+    def _run_hooks(
+        self, hooks: Optional[List[ValidationFunction]], stage_prefix: str
+    ) -> None:
+        """Run a list of hooks against the connection, if any."""
+        for hook in hooks or []:
+            with self._stage(f"{stage_prefix}:{hook.__name__}"):
+                hook(self.conn, self.staging_table)
+
+    def _run_batch_hooks(self, hooks: List[BatchFunction]) -> int:
+        """Run batch hooks over staging and replace it with their output.
+
+        Staging is read in windows of consecutive rowids, one Arrow batch
+        per hook worker. Each window's batches are passed through every
+        hook on the thread pool, and the results are appended to a new
+        staging table before the next window is read, so only one window
+        is held in memory at a time.
+
+        Args:
+            hooks: Batch hooks, applied in order to each batch
+
+        Returns:
+            Number of rows in staging afterwards
+        """
+        import pyarrow as pa
+
+        def run_hooks(batch: Any) -> Any:
+            for hook in hooks:
+                batch = hook(batch)
+                if not isinstance(batch, pa.RecordBatch):
+                    batch = pa.RecordBatch.from_pandas(
+                        batch, preserve_index=False
+                    )
+            return batch
+
+        output = f"{self.staging_table}_hooked"
+        view = f"{self.staging_table}_arrow"
+        self.conn.execute(
+            f"""
+            CREATE OR REPLACE TEMPORARY TABLE {output} AS
+            SELECT * FROM {self.staging_table} LIMIT 0
+        """
+        )
+        last_rowid = self.conn.execute(
+            f"SELECT MAX(rowid) FROM {self.staging_table}"
+        ).fetchone()[0]
+        window = ARROW_BATCH_ROWS * (self.hook_workers or os.cpu_count() or 1)
+        row_count = 0
+        try:
+            with ThreadPoolExecutor(self.hook_workers) as executor:
+                for start in range(0, (last_rowid or 0) + 1, window):
+                    # Read the whole window before scanning the results
+                    # back, since the reader holds the connection until
+                    # it is exhausted
+                    reader = self.conn.execute(
+                        f"""
+                        SELECT * FROM {self.staging_table}
+                        WHERE rowid >= {start} AND rowid < {start + window}
+                    """
+                    ).to_arrow_reader(ARROW_BATCH_ROWS)
+                    results = list(executor.map(run_hooks, reader))
+                    if not results:
+                        continue
+                    self.conn.register(view, pa.Table.from_batches(results))
+                    try:
+                        row_count += self.conn.execute(
+                            f"""
+                            INSERT INTO {output} BY NAME
+                            SELECT * FROM {view}
+                        """
+                        ).fetchone()[0]
+                    finally:
+                        self.conn.unregister(view)
+        except Exception:
+            self.conn.execute(f"DROP TABLE IF EXISTS {output}")
+            raise
+
+        self.conn.execute(
+            f"""
+            DROP TABLE {self.staging_table};
+            ALTER TABLE {output} RENAME TO {self.staging_table};
+        """
+        )
+        return row_count
+
+    def _validate_staging(self) -> None:
+        """Add failed_rules, is_valid, time_updated and derived columns.
+
+        All rules are evaluated in one projection. Rows whose rules
+        evaluate to NULL count as failing them, so that every staged row
+        lands in exactly one table.
+        """
+        if self.profile_rules:
+            self._time_rules()
 
-            # Create target and invalid tables if they don't exist
+        derived = "".join(
+            f"{expression} AS {name},\n"
+            for name, expression in self.derived_columns().items()
+        )
+        self.conn.execute(
+            f"""
+            CREATE OR REPLACE TEMPORARY TABLE {self.staging_table} AS
+            SELECT
+                *,
+                len(failed_rules) = 0 AS is_valid
+            FROM (
+                SELECT
+                    *,
+                    -- Stamped when the batch commits
+                    NULL::TIMESTAMP AS time_updated,
+                    {derived}
+                    {self.failed_rules_expression()} AS failed_rules
+                FROM {self.staging_table}
+            )
+        """
+        )
+
+    def _time_rules(self) -> None:
+        """Evaluate each rule on its own over staging, timing each one."""
+        seconds = {}
+        for name, rule in self.validation_rules().items():
+            start = time.perf_counter()
             self.conn.execute(
                 f"""
-                CREATE TABLE IF NOT EXISTS {target_table} AS 
-                SELECT * FROM staging_data WHERE 1=0;
-                
-                CREATE TABLE IF NOT EXISTS {invalid_table} AS 
-                SELECT * FROM staging_data WHERE 1=0;
+                SELECT COUNT(*) FILTER (WHERE NOT COALESCE({rule}, FALSE))
+                FROM {self.staging_table}
             """
+            ).fetchone()
+            seconds[name] = time.perf_counter() - start
+            self.rule_seconds[name] = (
+                self.rule_seconds.get(name, 0.0) + seconds[name]
             )
+        self._batch_rule_seconds = seconds
 
-            # Get validation expression
-            validation_expr = self.validation_expression()
+    def _record_rule_stats(self, target_table: str, batch_rows: int) -> None:
+        """Count failures per rule in staging and publish them.
 
-            # Run post-validation hooks if any
-            if self.post_validation_hooks:
-                for hook in self.post_validation_hooks:
-                    hook(self.conn)
+        Counts accumulate on the pipeline across batches and are appended
+        to the rule stats table, along with per-rule timings when
+        profile_rules is set.
 
-            # add an is_valid column to the staging table
+        Args:
+            target_table: Name of final table the batch was validated for
+            batch_rows: Rows routed from staging, valid and invalid
+        """
+        failures = dict(
             self.conn.execute(
                 f"""
-                ALTER TABLE staging_data
-                ADD COLUMN is_valid BOOLEAN;
-                """
+                SELECT rule, COUNT(*)
+                FROM (
+                    SELECT UNNEST(failed_rules) AS rule
+                    FROM {self.staging_table}
+                )
+                GROUP BY rule
+            """
+            ).fetchall()
+        )
+        rows = []
+        for name in self.validation_rules():
+            count = failures.get(name, 0)
+            self.rule_failures[name] = self.rule_failures.get(name, 0) + count
+            rows.append(
+                [
+                    target_table,
+                    name,
+                    count,
+                    self._batch_rule_seconds.get(name),
+                    batch_rows,
+                ]
             )
 
-            # Update with the validation expression
-            self.conn.execute(
-                f"""
-                UPDATE staging_data
-                SET is_valid = {self.validation_expression()};
-                """
+        self.conn.execute(
+            f"""
+            CREATE TABLE IF NOT EXISTS {RULE_STATS_TABLE} (
+                table_name VARCHAR,
+                rule VARCHAR,
+                failures BIGINT,
+                eval_seconds DOUBLE,
+                batch_rows BIGINT,
+                recorded_at TIMESTAMP
             )
+        """
+        )
+        self.conn.executemany(
+            f"""
+            INSERT INTO {RULE_STATS_TABLE}
+            VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP::TIMESTAMP)
+        """,
+            rows,
+        )
 
-            # Add time_updated column to staging table
+    def _commit_staging(
+        self,
+        target_table: str,
+        invalid_table: str,
+        on_commit: Optional[Callable[[], None]] = None,
+    ) -> Tuple[int, int]:
+        """Run post-validation hooks and route staging in one transaction.
+
+        Rows are stamped with the transaction's start time, taken under
+        the write lock, so time_updated follows commit order and a batch
+        validated earlier can't commit behind an export's watermark.
+        """
+        self.conn.begin()
+        try:
             self.conn.execute(
                 f"""
-                ALTER TABLE staging_data
-                ADD COLUMN time_updated TIMESTAMP;
-                """
+                UPDATE {self.staging_table}
+                SET time_updated = CURRENT_TIMESTAMP::TIMESTAMP
+            """
             )
+            # Run post-validation hooks if any
+            self._run_hooks(self.post_validation_hooks, "post")
+            counts = self._route_staging(target_table, invalid_table)
+            with self._stage("rule_stats"):
+                self._record_rule_stats(target_table, sum(counts))
+            if on_commit:
+                on_commit()
+            with self._stage("commit"):
+                self.conn.commit()
+        except Exception:
+            # A commit that failed has already rolled back
+            with suppress(db.TransactionException):
+                self.conn.rollback()
+            if self.partition_dir:
+                remove_batch_files(self.partition_dir, self.staging_table)
+            raise
+        if self.partition_dir:
+            # Batch files only become visible once their rows are committed
+            publish_batch_files(self.partition_dir, self.staging_table)
+            create_partition_view(self.conn, target_table, self.partition_dir)
+        if self.result_cache:
+            self.result_cache.invalidate(
+                self.written_tables(target_table, invalid_table)
+            )
+        return counts
+
+    def _route_staging(
+        self, target_table: str, invalid_table: str
+    ) -> Tuple[int, int]:
+        """Insert validated staging rows into the target and invalid tables.
+
+        Args:
+            target_table: Name of final table
+            invalid_table: Name of table to store invalid records
+
+        Returns:
+            Tuple of (valid_count, invalid_count)
+        """
+        # Create invalid and target tables if they don't exist. Only
+        # invalid rows keep the names of the rules they failed.
+        self.conn.execute(
+            f"""
+            CREATE TABLE IF NOT EXISTS {invalid_table} AS
+            SELECT * EXCLUDE (is_valid) FROM {self.staging_table} WHERE 1=0;
+
+            ALTER TABLE {invalid_table}
+            ADD COLUMN IF NOT EXISTS failed_rules VARCHAR[];
+        """
+        )
+        self._add_derived_columns(invalid_table)
 
-            # Update time_updated column
+        if self.partition_dir:
+            valid_count = self._write_partitions()
+        else:
             self.conn.execute(
                 f"""
-                UPDATE staging_data
-                SET time_updated = CURRENT_TIMESTAMP;
-                """
+                CREATE TABLE IF NOT EXISTS {target_table} AS
+                SELECT * EXCLUDE (is_valid, failed_rules)
+                FROM {self.staging_table} WHERE 1=0
+            """
             )
+            self._add_derived_columns(target_table)
+            cluster = self.cluster_columns()
+            order_by = f"ORDER BY {', '.join(cluster)}" if cluster else ""
+            with self._stage("insert_valid") as metric:
+                valid_count = metric.rows = self.conn.execute(
+                    f"""
+                    INSERT INTO {target_table} BY NAME
+                    SELECT * EXCLUDE (is_valid, failed_rules)
+                    FROM {self.staging_table}
+                    WHERE is_valid
+                    {order_by}
+                """
+                ).fetchone()[0]
 
-            # Insert valid and invalid records
-            self.conn.execute(
+        with self._stage("insert_invalid") as metric:
+            invalid_count = metric.rows = self.conn.execute(
                 f"""
-                INSERT INTO {target_table}
-                SELECT * EXCLUDE(is_valid)
-                FROM staging_data
-                WHERE is_valid
+                INSERT INTO {invalid_table} BY NAME
+                SELECT * EXCLUDE (is_valid)
+                FROM {self.staging_table}
+                WHERE NOT is_valid
             """
-            )
+            ).fetchone()[0]
+
+        if self.merge_key:
+            with self._stage("merge_current"):
+                self._merge_current_state(f"{target_table}_current")
+
+        return valid_count, invalid_count
 
+    def _add_derived_columns(self, table_name: str) -> None:
+        """Add derived columns missing from an output table created
+        before they were configured, computed for the rows it holds."""
+        derived = self.derived_columns()
+        if not derived:
+            return
+        existing = {
+            row[0]
+            for row in self.conn.execute(
+                f"SELECT column_name FROM (DESCRIBE {table_name})"
+            ).fetchall()
+        }
+        missing = {
+            name: expression
+            for name, expression in derived.items()
+            if name not in existing
+        }
+        if not missing:
+            return
+        types = dict(
             self.conn.execute(
                 f"""
-                INSERT INTO {invalid_table}
-                SELECT * EXCLUDE(is_valid)
-                FROM staging_data
-                WHERE NOT is_valid
+                SELECT column_name, column_type
+                FROM (DESCRIBE {self.staging_table})
             """
+            ).fetchall()
+        )
+        for name in missing:
+            self.conn.execute(
+                f"ALTER TABLE {table_name} ADD COLUMN {name} {types[name]}"
             )
+        # One pass, in the batch's transaction, so no stored row is left
+        # without the columns' values
+        assignments = ", ".join(
+            f"{name} = {expression}" for name, expression in missing.items()
+        )
+        self.conn.execute(f"UPDATE {table_name} SET {assignments}")
 
-        # Clean up the staging table if there was an error
-        except:
-            self.conn.execute("DROP TABLE staging_data")
-            raise
+    def _write_partitions(self) -> int:
+        """Append valid staging rows to the partitioned store.
+
+        Files are named after the staging table and staged outside the
+        view, so they can be published once the batch's transaction
+        commits or removed if it rolls back.
+
+        Returns:
+            Number of valid rows written
+        """
+        with self._stage("write_partitions") as metric:
+            metric.rows = write_partitions(
+                self.conn,
+                f"""(
+                    SELECT * EXCLUDE (is_valid, failed_rules)
+                    FROM {self.staging_table}
+                    WHERE is_valid
+                )""",
+                self.partition_dir,
+                self.event,
+                self.staging_table,
+            )
+        return metric.rows
+
+    def _merge_current_state(self, current_table: str) -> None:
+        """Upsert the latest valid staging row per merge key.
+
+        The current-state table has a unique index on the merge key, so
+        looking up one entity is a single index probe rather than an
+        aggregate over the full history.
+
+        Args:
+            current_table: Name of table holding one row per merge key
+        """
+        key = ", ".join(self.merge_key)
+        self.conn.execute(
+            f"""
+            CREATE TABLE IF NOT EXISTS {current_table} AS
+            SELECT * EXCLUDE (is_valid, failed_rules)
+            FROM {self.staging_table} WHERE 1=0;
+
+            CREATE UNIQUE INDEX IF NOT EXISTS {current_table}_key
+            ON {current_table} ({key});
+        """
+        )
+        self._add_derived_columns(current_table)
+
+        columns = [
+            col[0]
+            for col in self.conn.execute(
+                f"SELECT * FROM {current_table} LIMIT 0"
+            ).description
+        ]
+        updates = ", ".join(
+            f'"{col}" = EXCLUDED."{col}"'
+            for col in columns
+            if col not in self.merge_key
+        )
+        not_null = " AND ".join(f"{col} IS NOT NULL" for col in self.merge_key)
+
+        # Later rows in the batch win when a key appears more than once
+        self.conn.execute(
+            f"""
+            INSERT INTO {current_table} BY NAME
+            SELECT * EXCLUDE (is_valid, failed_rules)
+            FROM {self.staging_table}
+            WHERE is_valid AND {not_null}
+            QUALIFY ROW_NUMBER() OVER (
+                PARTITION BY {key} ORDER BY rowid DESC
+            ) = 1
+            ON CONFLICT ({key}) DO UPDATE SET {updates}
+        """
+        )
+
+    def log_rule_stats(self) -> None:
+        """Log failures per rule so far, slowest rules first if profiled."""
+        names = sorted(
+            self.rule_failures,
+            key=lambda name: self.rule_seconds.get(name, 0.0),
+            reverse=True,
+        )
+        for name in names:
+            timing = (
+                f" in {self.rule_seconds[name]:.3f}s"
+                if name in self.rule_seconds
+                else ""
+            )
+            self.logger.info(
+                f"Rule {name}: {self.rule_failures[name]} failures{timing}"
+            )
 
     def close(self):
         """Close database connection."""
@@ -0,0 +1,77 @@
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional, Sequence
+
+import duckdb as db
+
+from building_damage.utils.extension_utils import ensure_extension
+
+
+class ConnectionPool:
+    def __init__(
+        self,
+        db_path: str,
+        extensions: Sequence[str] = (),
+        config: Optional[Dict[str, Any]] = None,
+        max_sessions: Optional[int] = None,
+    ):
+        """Open a database once and hand out sessions on it.
+
+        DuckDB allows one read-write connection per database file per
+        process, and connecting, attaching and loading extensions is the
+        expensive part of a short run. The pool opens the connection and
+        loads extensions once; each session is a cursor on it, so
+        sessions can run concurrently in threads without reconnecting.
+
+        Args:
+            db_path: Path to DuckDB database file, or ':memory:'
+            extensions: Extensions to load once for every session, e.g.
+                ["spatial"]
+            config: Optional DuckDB settings applied when connecting, e.g.
+                {"memory_limit": "2GB"}
+            max_sessions: Optional limit on concurrently open sessions;
+                further sessions wait for one to close
+        """
+        self.db_path = db_path
+        self.logger = logging.getLogger(__name__)
+        self.conn = db.connect(db_path, config=config or {})
+        self.write_lock = threading.Lock()
+        self._sessions = (
+            threading.BoundedSemaphore(max_sessions) if max_sessions else None
+        )
+        for extension in extensions:
+            self.load_extension(extension)
+        self.logger.info(f"Opened connection pool on {db_path}")
+
+    def load_extension(self, name: str) -> None:
+        """Load an extension for every session, if not already loaded."""
+        ensure_extension(self.conn, name)
+
+    @contextmanager
+    def session(self) -> Iterator[db.DuckDBPyConnection]:
+        """Yield a cursor on the shared connection, closed afterwards.
+
+        Temporary tables and transactions are private to a session, so
+        each session can stage and commit independently; writers to the
+        same output tables should still share write_lock.
+        """
+        if self._sessions:
+            self._sessions.acquire()
+        cursor = self.conn.cursor()
+        try:
+            yield cursor
+        finally:
+            cursor.close()
+            if self._sessions:
+                self._sessions.release()
+
+    def close(self) -> None:
+        """Close the shared connection."""
+        self.conn.close()
+
+    def __enter__(self) -> "ConnectionPool":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
@@ -1,11 +1,80 @@
-from typing import Dict, List
+from typing import Any, Dict, List
 
 import duckdb as db
 
 from building_damage.BasePipeline import BasePipeline, ValidationFunction
+from building_damage.utils.dedup_utils import dedup_key_columns, dedup_reports
+from building_damage.utils.extraction_utils import table_exists
+from building_damage.utils.grid_utils import grid_cell_expression
+from building_damage.utils.rollup_utils import (
+    DISTRICT_ROLLUP_TABLE,
+    ZIP_ROLLUP_TABLE,
+    update_rollups,
+)
+from building_damage.utils.schema_utils import Column, Schema
+from building_damage.utils.spatial_utils import assign_bins_from_footprints
+
+TARGET_TABLE = "storm_damage"
+INVALID_TABLE = "storm_damage_invalid"
+
+# Columns of a damage report, shared by the CSV readers and the tables
+# created by set_up_database.py
+DAMAGE_REPORT_COLUMNS = [
+    Column("address", "VARCHAR"),
+    Column("city", "VARCHAR"),
+    Column("zip_code", "VARCHAR", aliases=("zip",)),
+    Column("no_electricity", "BOOLEAN"),
+    Column("basement_flooded", "BOOLEAN"),
+    Column("roof_damaged", "BOOLEAN"),
+    Column("insurance", "BOOLEAN"),
+    Column("bin", "VARCHAR"),
+    Column("latitude", "DOUBLE", aliases=("lat",)),
+    Column("longitude", "DOUBLE", aliases=("lon", "lng")),
+]
 
 
 class DamageReportPipeline(BasePipeline):
+    def __init__(
+        self,
+        db_conn: db.DuckDBPyConnection,
+        schema: Schema,
+        assign_bins: bool = False,
+        footprints_table: str = "building_footprints",
+        maintain_rollups: bool = False,
+        grid_index: bool = False,
+        dedup: bool = False,
+        **kwargs: Any,
+    ):
+        """Initialize damage report pipeline.
+
+        Args:
+            db_conn: DuckDB database connection
+            schema: Staging columns, usually DAMAGE_REPORT_COLUMNS
+            assign_bins: Whether to fill in missing or malformed BINs from
+                the building footprint under each report's coordinates
+            footprints_table: Table of building footprints to match against
+            maintain_rollups: Whether to add each batch's valid reports to
+                the per-ZIP rollup, and to the per-district rollup when the
+                base layers have been downloaded
+            grid_index: Whether to store each report's grid cell and point
+                geometry, inserting reports ordered by cell so the map
+                queries in grid_utils skip row groups outside their cells
+            dedup: Whether to drop valid reports that duplicate an earlier
+                report of the batch or of the target table, matched by
+                BIN, address similarity and distance
+            **kwargs: Passed through to BasePipeline
+        """
+        super().__init__(db_conn, schema, **kwargs)
+        self.assign_bins = assign_bins
+        self.footprints_table = footprints_table
+        self.maintain_rollups = maintain_rollups
+        self.grid_index = grid_index
+        self.dedup = dedup
+        self.district_rollups = maintain_rollups and all(
+            table_exists(db_conn, table)
+            for table in ["building_footprints", "community_districts"]
+        )
+
     def column_validation_rules(self) -> Dict[str, str]:
         return {
             "latitude": "latitude BETWEEN 40 AND 42",  # NYC area
@@ -30,38 +99,78 @@ class DamageReportPipeline(BasePipeline):
             """
         }
 
+    def column_normalizations(self) -> Dict[str, str]:
+        return {
+            "city": "TRIM(UPPER(city))",
+            "address": "TRIM(UPPER(address))",
+        }
+
+    def derived_columns(self) -> Dict[str, str]:
+        columns = dedup_key_columns() if self.dedup else {}
+        if self.grid_index:
+            columns.update(
+                {
+                    "grid_cell": grid_cell_expression(),
+                    # Built from WKT, so the spatial extension is not needed
+                    "geom": (
+                        "('POINT (' || longitude || ' ' || latitude || ')')"
+                        "::GEOMETRY"
+                    ),
+                }
+            )
+        return columns
+
+    def cluster_columns(self) -> List[str]:
+        return ["grid_cell"] if self.grid_index else []
+
+    def written_tables(
+        self, target_table: str, invalid_table: str
+    ) -> List[str]:
+        tables = super().written_tables(target_table, invalid_table)
+        if self.maintain_rollups:
+            tables.append(ZIP_ROLLUP_TABLE)
+        if self.district_rollups:
+            tables.append(DISTRICT_ROLLUP_TABLE)
+        return tables
+
     @property
     def pre_validation_hooks(self) -> List[ValidationFunction]:
-        def sanitize_column_names(conn: db.DuckDBPyConnection) -> None:
-            # Get current column names
-            columns = conn.execute(
-                "SELECT * FROM staging_data LIMIT 0"
-            ).description
-            old_names = [col[0] for col in columns]
-
-            # Create new sanitized names
-            new_names = [name.lower().replace(" ", "_") for name in old_names]
-
-            # Build and execute rename statement if any changes needed
-            if old_names != new_names:
-                rename_pairs = [
-                    f'"{old}" as "{new}"'
-                    for old, new in zip(old_names, new_names)
-                ]
-                rename_sql = f"""
-                    CREATE OR REPLACE TEMPORARY TABLE staging_data AS 
-                    SELECT {', '.join(rename_pairs)}
-                    FROM staging_data
-                """
-                conn.execute(rename_sql)
-
-        def normalize_data(conn: db.DuckDBPyConnection) -> None:
-            conn.execute(
-                """
-                UPDATE staging_data SET
-                    city = TRIM(UPPER(city)),
-                    address = TRIM(UPPER(address))
-                """
+        def fill_bins_from_footprints(
+            conn: db.DuckDBPyConnection, staging_table: str
+        ) -> None:
+            assign_bins_from_footprints(
+                conn,
+                staging_table,
+                self.column_validation_rules()["bin"],
+                self.footprints_table,
+            )
+
+        return [fill_bins_from_footprints] if self.assign_bins else []
+
+    @property
+    def post_validation_hooks(self) -> List[ValidationFunction]:
+        def drop_duplicate_reports(
+            conn: db.DuckDBPyConnection, staging_table: str
+        ) -> None:
+            stored = self.target_table
+            dedup_reports(
+                conn,
+                staging_table,
+                "is_valid",
+                stored if stored and table_exists(conn, stored) else None,
+            )
+
+        def add_batch_to_rollups(
+            conn: db.DuckDBPyConnection, staging_table: str
+        ) -> None:
+            update_rollups(
+                conn,
+                f"(SELECT * FROM {staging_table} WHERE is_valid)",
+                districts=self.district_rollups,
             )
 
-        return [sanitize_column_names, normalize_data]
+        # Duplicates are dropped first, so they are not counted in rollups
+        hooks = [drop_duplicate_reports] if self.dedup else []
+        if self.maintain_rollups:
+            hooks.append(add_batch_to_rollups)
+        return hooks
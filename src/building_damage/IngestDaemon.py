@@ -0,0 +1,202 @@
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from building_damage.ConnectionPool import ConnectionPool
+from building_damage.DamageReportPipeline import DamageReportPipeline
+from building_damage.utils.schema_utils import Schema
+
+
+class IngestDaemon:
+    def __init__(
+        self,
+        pool: ConnectionPool,
+        inbox: str,
+        schema: Schema,
+        target_table: str,
+        invalid_table: str,
+        pipeline_options: Optional[Dict[str, Any]] = None,
+        max_batch_files: int = 100,
+        max_batch_bytes: int = 256 << 20,
+        max_wait: float = 1.0,
+        poll_interval: float = 0.5,
+        max_queued_files: int = 1000,
+    ):
+        """Watch an inbox directory and ingest CSVs as they arrive.
+
+        A watcher thread polls the inbox and queues each CSV once its size
+        and mtime stop changing. The ingest loop takes queued files as
+        micro-batches, closing a batch when it reaches max_batch_files or
+        max_batch_bytes, or max_wait seconds after its first file, and
+        runs each batch through one warm DamageReportPipeline. Ingested
+        files are moved to inbox/processed, and files that fail on their
+        own to inbox/failed.
+
+        The queue holds at most max_queued_files. When ingestion falls
+        behind, the watcher stops queueing and new files wait in the inbox
+        until there is room.
+
+        Args:
+            pool: Connection pool on the database to ingest into
+            inbox: Directory to watch for CSV files
+            schema: Staging columns, usually DAMAGE_REPORT_COLUMNS
+            target_table: Name of final table
+            invalid_table: Name of table to store invalid records
+            pipeline_options: Optional keyword arguments for
+                DamageReportPipeline, e.g. assign_bins or merge_key
+            max_batch_files: Maximum number of files per batch
+            max_batch_bytes: Batch size, in bytes, that closes a batch
+            max_wait: Seconds to wait for more files after the first
+            poll_interval: Seconds between inbox scans
+            max_queued_files: Maximum number of files waiting to be
+                ingested
+        """
+        self.pool = pool
+        self.inbox = Path(inbox)
+        self.processed_dir = self.inbox / "processed"
+        self.failed_dir = self.inbox / "failed"
+        self.schema = schema
+        self.target_table = target_table
+        self.invalid_table = invalid_table
+        self.pipeline_options = pipeline_options or {}
+        self.max_batch_files = max_batch_files
+        self.max_batch_bytes = max_batch_bytes
+        self.max_wait = max_wait
+        self.poll_interval = poll_interval
+        self.logger = logging.getLogger(__name__)
+
+        self.files: "queue.Queue[Tuple[Path, int]]" = queue.Queue(
+            maxsize=max_queued_files
+        )
+        self._queued: set = set()
+        self._stopping = threading.Event()
+
+    def run(self) -> None:
+        """Watch and ingest until stop is called, then drain the queue."""
+        self.processed_dir.mkdir(parents=True, exist_ok=True)
+        self.failed_dir.mkdir(parents=True, exist_ok=True)
+        watcher = threading.Thread(target=self._watch, daemon=True)
+        watcher.start()
+        self.logger.info(f"Watching {self.inbox} for CSV files")
+
+        with self.pool.session() as conn:
+            pipeline = DamageReportPipeline(
+                conn,
+                self.schema,
+                write_lock=self.pool.write_lock,
+                **self.pipeline_options,
+            )
+            while not (self._stopping.is_set() and self.files.empty()):
+                batch = self._next_batch()
+                if batch:
+                    self._ingest(pipeline, batch)
+
+        watcher.join()
+        self.logger.info("Ingest daemon stopped")
+
+    def stop(self) -> None:
+        """Ask the daemon to stop once queued files are ingested."""
+        self._stopping.set()
+
+    def _watch(self) -> None:
+        """Queue inbox CSVs whose size and mtime held across one poll."""
+        previous: Dict[Path, Tuple[int, int]] = {}
+        backlogged = False
+        while not self._stopping.is_set():
+            current = {}
+            for entry in os.scandir(self.inbox):
+                path = Path(entry.path)
+                if not entry.is_file() or path.suffix.lower() != ".csv":
+                    continue
+                if path in self._queued:
+                    continue
+                stat = entry.stat()
+                current[path] = (stat.st_size, stat.st_mtime_ns)
+
+            for path, state in sorted(current.items()):
+                if previous.get(path) != state:
+                    continue
+                try:
+                    self.files.put_nowait((path, state[0]))
+                except queue.Full:
+                    if not backlogged:
+                        self.logger.warning(
+                            f"Ingest queue full ({self.files.maxsize} "
+                            "files); leaving new files in the inbox"
+                        )
+                    backlogged = True
+                    break
+                self._queued.add(path)
+            else:
+                backlogged = False
+
+            previous = current
+            self._stopping.wait(self.poll_interval)
+
+    def _next_batch(self) -> List[Path]:
+        """Take queued files until the batch is full or its window ends."""
+        try:
+            path, size = self.files.get(timeout=self.poll_interval)
+        except queue.Empty:
+            return []
+
+        batch, batch_bytes = [path], size
+        deadline = time.monotonic() + self.max_wait
+        while (
+            len(batch) < self.max_batch_files
+            and batch_bytes < self.max_batch_bytes
+        ):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                path, size = self.files.get(timeout=remaining)
+            except queue.Empty:
+                break
+            batch.append(path)
+            batch_bytes += size
+        return batch
+
+    def _ingest(
+        self, pipeline: DamageReportPipeline, batch: List[Path]
+    ) -> None:
+        """Ingest a batch, falling back to one file at a time on error."""
+        try:
+            valid, invalid = pipeline.process_csv_files(
+                [str(path) for path in batch],
+                self.target_table,
+                self.invalid_table,
+            )
+        except Exception as e:
+            if len(batch) == 1:
+                self.logger.error(f"Failed to ingest {batch[0]}: {str(e)}")
+                self._archive(batch, self.failed_dir)
+                return
+            self.logger.warning(
+                f"Batch of {len(batch)} files failed ({str(e)}); "
+                "retrying one file at a time"
+            )
+            for path in batch:
+                self._ingest(pipeline, [path])
+            return
+
+        # Time from the newest file landing to its rows being committed
+        latency = time.time() - max(path.stat().st_mtime for path in batch)
+        self._archive(batch, self.processed_dir)
+        pipeline.metrics.stages.clear()
+        self.logger.info(
+            f"Ingested {len(batch)} file(s): {valid} valid, {invalid} "
+            f"invalid records, {latency:.2f}s after arrival"
+        )
+
+    def _archive(self, batch: List[Path], directory: Path) -> None:
+        """Move ingested files out of the inbox, keeping earlier copies."""
+        stamp = datetime.now().strftime("%Y%m%dT%H%M%S")
+        for path in batch:
+            os.replace(path, directory / f"{stamp}_{path.name}")
+            self._queued.discard(path)
@@ -0,0 +1,195 @@
+import json
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, FrozenSet, Iterable, Iterator, Optional, Sequence
+
+import duckdb as db
+
+# Parsed queries differ only in these offsets when spelled differently
+_QUERY_LOCATION = re.compile(r'"query_location":\d+,?')
+
+
+@dataclass
+class _Entry:
+    result: Any
+    tables: FrozenSet[str]
+    nbytes: int
+    created: float
+
+
+class QueryCache:
+    def __init__(
+        self,
+        max_entries: int = 128,
+        max_bytes: int = 256 << 20,
+        max_age: Optional[float] = None,
+    ):
+        """Keep the results of repeated read queries in memory.
+
+        Results are keyed by the parsed query, so queries differing only
+        in whitespace or keyword case share an entry, and by their
+        parameters. Each entry remembers the tables it read, following
+        views to their tables, and is dropped when a pipeline sharing
+        the cache commits rows to one of them. The least recently used
+        entries are evicted beyond max_entries or max_bytes.
+
+        Args:
+            max_entries: Maximum number of cached results
+            max_bytes: Maximum total size of cached results; larger
+                results are returned but not cached
+            max_age: Optional seconds after which an entry is recomputed,
+                for tables also written by other processes
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.logger = logging.getLogger(__name__)
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Any, _Entry]" = OrderedDict()
+        self._nbytes = 0
+        # Bumped by every invalidation, so results computed across one
+        # are not cached
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def query(
+        self,
+        conn: db.DuckDBPyConnection,
+        sql: str,
+        params: Optional[Sequence[Any]] = None,
+    ) -> Any:
+        """Run a SELECT query, or return its cached result.
+
+        Args:
+            conn: DuckDB connection or session to run the query on
+            sql: SELECT statement, optionally with ? parameters
+            params: Optional parameter values
+
+        Returns:
+            Result as a pyarrow Table, shared between callers; treat it
+            as read-only
+
+        Raises:
+            ValueError: If sql is not a single SELECT statement
+        """
+        serialized = conn.execute(
+            "SELECT json_serialize_sql(?)", [sql]
+        ).fetchone()[0]
+        parsed = json.loads(serialized)
+        if parsed["error"] or len(parsed["statements"]) != 1:
+            raise ValueError(
+                f"Only single SELECT statements can be cached: {sql}"
+            )
+        key = (_QUERY_LOCATION.sub("", serialized), tuple(params or ()))
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and self.max_age is not None:
+                if time.monotonic() - entry.created > self.max_age:
+                    self._remove(key)
+                    entry = None
+            if entry:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry.result
+            self.misses += 1
+            generation = self._generation
+
+        tables = self._dependencies(conn, parsed)
+        result = conn.execute(sql, params or []).to_arrow_table()
+        entry = _Entry(result, tables, result.nbytes, time.monotonic())
+
+        with self._lock:
+            if (
+                entry.nbytes <= self.max_bytes
+                and generation == self._generation
+            ):
+                if key in self._entries:
+                    self._remove(key)
+                self._entries[key] = entry
+                self._nbytes += entry.nbytes
+                self._evict()
+        return result
+
+    def invalidate(self, tables: Iterable[str]) -> int:
+        """Drop cached results that read any of the given tables.
+
+        Args:
+            tables: Names of tables that changed
+
+        Returns:
+            Number of results dropped
+        """
+        changed = {table.lower() for table in tables}
+        with self._lock:
+            self._generation += 1
+            stale = [
+                key
+                for key, entry in self._entries.items()
+                if entry.tables & changed
+            ]
+            for key in stale:
+                self._remove(key)
+        if stale:
+            self.logger.debug(
+                f"Invalidated {len(stale)} cached results of "
+                f"{', '.join(sorted(changed))}"
+            )
+        return len(stale)
+
+    def clear(self) -> None:
+        """Drop every cached result."""
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._nbytes = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _remove(self, key: Any) -> None:
+        self._nbytes -= self._entries.pop(key).nbytes
+
+    def _evict(self) -> None:
+        """Drop least recently used results until within the limits."""
+        while self._entries and (
+            len(self._entries) > self.max_entries
+            or self._nbytes > self.max_bytes
+        ):
+            self._remove(next(iter(self._entries)))
+
+    @staticmethod
+    def _dependencies(
+        conn: db.DuckDBPyConnection, parsed: Any
+    ) -> FrozenSet[str]:
+        """Tables a parsed query reads, with views resolved to tables."""
+        names = {name.lower() for name in _table_refs(parsed)}
+        views = {
+            row[0].lower()
+            for row in conn.execute(
+                "SELECT view_name FROM duckdb_views() WHERE NOT internal"
+            ).fetchall()
+        }
+        for view in names & views:
+            names |= {
+                name.lower()
+                for name in conn.get_table_names(f"SELECT * FROM {view}")
+            }
+        return frozenset(names)
+
+
+def _table_refs(node: Any) -> Iterator[str]:
+    """Names of the base tables referenced anywhere in a parsed query."""
+    if isinstance(node, dict):
+        if node.get("type") == "BASE_TABLE":
+            yield node["table_name"]
+        for value in node.values():
+            yield from _table_refs(value)
+    elif isinstance(node, list):
+        for value in node:
+            yield from _table_refs(value)
@@ -0,0 +1,223 @@
+"""Utility functions for reading CSV inputs in bounded pieces."""
+
+import logging
+import os
+import tempfile
+import threading
+from dataclasses import dataclass
+from typing import BinaryIO, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from duckdb import DuckDBPyConnection
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class CsvDialect:
+    """Dialect and header of a CSV source, as detected by DuckDB."""
+
+    delimiter: str
+    quote: str
+    escape: str
+    has_header: bool
+    skip_rows: int
+    headers: Tuple[str, ...]
+
+
+# Sniffed dialects by header line, shared by every pipeline in the
+# process, so files from the same feed are only sniffed once
+_dialects: Dict[bytes, CsvDialect] = {}
+_dialects_lock = threading.Lock()
+
+
+def _iter_records(
+    handle: BinaryIO, end_offset: Optional[int] = None
+) -> Iterator[bytes]:
+    """Yield complete CSV records, keeping quoted newlines together.
+
+    Reading stops at end_offset, if given, so bytes appended to the file
+    while it is read are left for a later ingest.
+    """
+    pending = b""
+    position = handle.tell()
+    for line in handle:
+        if end_offset is not None and position + len(line) > end_offset:
+            line = line[: max(end_offset - position, 0)]
+        position += len(line)
+        if not line:
+            break
+        pending += line
+        # A record is complete once its quote characters are balanced
+        if pending.count(b'"') % 2 == 0:
+            yield pending
+            pending = b""
+    if pending:
+        yield pending
+
+
+def _write_chunk(path: str, header: bytes, records: List[bytes]) -> None:
+    with open(path, "wb") as chunk_file:
+        chunk_file.write(header)
+        chunk_file.writelines(records)
+
+
+def iter_csv_chunks(
+    csv_path: str,
+    batch_size: int,
+    start_offset: int = 0,
+    end_offset: Optional[int] = None,
+) -> Iterator[str]:
+    """
+    Split a CSV into bounded chunks without reading it all into memory.
+
+    Each chunk is written to the same temporary file, prefixed with the
+    original header, and the path is yielded for the caller to read
+    before the next chunk overwrites it.
+
+    Args:
+        csv_path: Path to input CSV
+        batch_size: Maximum number of records per chunk
+        start_offset: Byte offset of the first record to read; must fall
+            on a record boundary. Defaults to the start of the data.
+        end_offset: Optional byte offset to stop reading at, e.g. the
+            file size the ingest was planned for
+
+    Yields:
+        Path to a CSV file holding the current chunk
+    """
+    for chunk_path, _ in iter_csv_chunk_offsets(
+        csv_path, batch_size, start_offset, end_offset
+    ):
+        yield chunk_path
+
+
+def iter_csv_chunk_offsets(
+    csv_path: str,
+    batch_size: int,
+    start_offset: int = 0,
+    end_offset: Optional[int] = None,
+) -> Iterator[Tuple[str, int]]:
+    """
+    Split a CSV into bounded chunks like iter_csv_chunks, also yielding
+    the byte offset in the file just past each chunk's last record.
+
+    The offset is where an ingest that committed the chunk would resume,
+    e.g. as recorded in the ingest manifest.
+
+    Yields:
+        Tuple of (chunk path, end offset of the chunk in csv_path)
+    """
+    if batch_size < 1:
+        raise ValueError(f"batch_size must be positive, got {batch_size}")
+
+    with tempfile.TemporaryDirectory() as temp_dir, open(
+        csv_path, "rb"
+    ) as handle:
+        chunk_path = os.path.join(temp_dir, "chunk.csv")
+        records = _iter_records(handle, end_offset)
+        header = next(records, b"")
+        if start_offset:
+            handle.seek(max(start_offset, handle.tell()))
+            records = _iter_records(handle, end_offset)
+        offset = handle.tell()
+
+        batch: List[bytes] = []
+        for record in records:
+            batch.append(record)
+            offset += len(record)
+            if len(batch) == batch_size:
+                _write_chunk(chunk_path, header, batch)
+                batch = []
+                yield chunk_path, offset
+
+        if batch:
+            _write_chunk(chunk_path, header, batch)
+            yield chunk_path, offset
+
+
+def _read_header(csv_path: str) -> bytes:
+    """First line of a file, used to recognize files from one feed."""
+    with open(csv_path, "rb") as handle:
+        return handle.readline(1 << 16)
+
+
+def _sniffed(value: str) -> str:
+    """Map the sniffer's '(empty)' to an empty read_csv option."""
+    return "" if value == "(empty)" else value
+
+
+def sniff_dialect(conn: DuckDBPyConnection, csv_path: str) -> CsvDialect:
+    """
+    Detect a CSV's dialect and header, reusing earlier results.
+
+    Results are cached per process by the file's header line, so repeat
+    loads of the same feed, and chunks of one file, skip sniffing.
+
+    Args:
+        conn: DuckDB connection to sniff with
+        csv_path: Path to a CSV file
+
+    Returns:
+        The file's dialect
+    """
+    key = _read_header(csv_path)
+    with _dialects_lock:
+        if key in _dialects:
+            return _dialects[key]
+
+    delimiter, quote, escape, has_header, skip_rows, columns = conn.execute(
+        f"""
+        SELECT Delimiter, Quote, Escape, HasHeader, SkipRows, Columns
+        FROM sniff_csv('{csv_path}')
+    """
+    ).fetchone()
+    dialect = CsvDialect(
+        delimiter=delimiter,
+        quote=_sniffed(quote),
+        escape=_sniffed(escape),
+        has_header=has_header,
+        skip_rows=skip_rows,
+        headers=tuple(column["name"] for column in columns),
+    )
+    logger.info(f"Sniffed CSV dialect of {csv_path}: {dialect}")
+    with _dialects_lock:
+        _dialects[key] = dialect
+    return dialect
+
+
+def _literal(value: str) -> str:
+    return "'" + value.replace("'", "''") + "'"
+
+
+def read_csv_query(
+    csv_paths: Sequence[str], dialect: CsvDialect, types: Dict[str, str]
+) -> str:
+    """
+    Build a read_csv call with a fixed dialect and column types.
+
+    With the dialect and every column given, DuckDB reads the files
+    without sniffing them again and parses typed columns directly.
+
+    Args:
+        csv_paths: Paths to CSV files sharing the dialect
+        dialect: Dialect of the files
+        types: DuckDB type per header; other columns are read as VARCHAR
+
+    Returns:
+        SQL table expression reading the files
+    """
+    files = ", ".join(_literal(path) for path in csv_paths)
+    columns = ", ".join(
+        f"{_literal(header)}: {_literal(types.get(header, 'VARCHAR'))}"
+        for header in dialect.headers
+    )
+    return f"""read_csv(
+        [{files}],
+        delim = {_literal(dialect.delimiter)},
+        quote = {_literal(dialect.quote)},
+        escape = {_literal(dialect.escape)},
+        header = {str(dialect.has_header).lower()},
+        skip = {dialect.skip_rows},
+        auto_detect = false,
+        columns = {{{columns}}}
+    )"""
@@ -0,0 +1,233 @@
+"""Utility functions for collapsing near-duplicate damage reports."""
+
+import logging
+from typing import Dict, Optional
+
+from duckdb import DuckDBPyConnection
+
+from building_damage.utils.grid_utils import (
+    distance_expression,
+    grid_cell_expression,
+)
+
+logger = logging.getLogger(__name__)
+
+# Reports of one building are usually filed from within this distance
+DEFAULT_MAX_DISTANCE_M = 30.0
+
+# Jaro-Winkler similarity of normalized addresses above which two nearby
+# reports are taken to describe the same building
+DEFAULT_MIN_SIMILARITY = 0.9
+
+# Candidates are blocked by the tile they fall in at this zoom (about
+# 60 m across at NYC latitudes), so each block stays small even where
+# reports are dense
+DEDUP_ZOOM = 19
+
+# Spelled-out street words and their usual abbreviations
+ADDRESS_ABBREVIATIONS = {
+    "STREET": "ST",
+    "AVENUE": "AVE",
+    "ROAD": "RD",
+    "BOULEVARD": "BLVD",
+    "PLACE": "PL",
+    "DRIVE": "DR",
+    "PARKWAY": "PKWY",
+    "EAST": "E",
+    "WEST": "W",
+    "NORTH": "N",
+    "SOUTH": "S",
+}
+
+
+def normalized_address_expression(column: str = "address") -> str:
+    """
+    SQL expression normalizing an address for comparison.
+
+    Punctuation and repeated spaces are dropped and street words are
+    abbreviated, so "12 West 3rd Street." and "12 W 3RD ST" compare
+    equal. Used only to find duplicates; stored addresses are unchanged.
+
+    Args:
+        column: Address column
+
+    Returns:
+        SQL expression evaluating to the normalized address
+    """
+    expression = f"regexp_replace(UPPER({column}), '[^A-Z0-9]+', ' ', 'g')"
+    for word, abbreviation in ADDRESS_ABBREVIATIONS.items():
+        expression = (
+            f"regexp_replace({expression}, '\\b{word}\\b', "
+            f"'{abbreviation}', 'g')"
+        )
+    return f"TRIM({expression})"
+
+
+def house_number_expression(column: str = "address") -> str:
+    """
+    SQL expression for the leading house number of an address.
+
+    Equal to the leading digits of the normalized address, but computed
+    with one regular expression rather than the full normalization.
+
+    Args:
+        column: Address column
+
+    Returns:
+        SQL expression evaluating to the house number, or '' if none
+    """
+    return f"regexp_extract(UPPER({column}), '^[^A-Z0-9]*([0-9]*)', 1)"
+
+
+def dedup_key_columns() -> Dict[str, str]:
+    """
+    Derived columns holding the address keys duplicates are matched on.
+
+    Stored with each report, they let dedup_reports narrow the stored
+    reports with plain column comparisons instead of evaluating regular
+    expressions over the whole table on every batch.
+
+    Returns:
+        Mapping of column name to SQL expression over the address
+    """
+    return {
+        "address_key": normalized_address_expression(),
+        "house_number": house_number_expression(),
+    }
+
+
+def _key_expressions(
+    conn: DuckDBPyConnection, table_name: str
+) -> Dict[str, str]:
+    """Expressions for the dedup keys of a table's rows, reading the
+    stored key columns where the table has them."""
+    columns = {
+        row[0]
+        for row in conn.execute(
+            f"SELECT column_name FROM (DESCRIBE {table_name})"
+        ).fetchall()
+    }
+    # Rows stored before the key columns were added hold NULL keys
+    return {
+        name: (
+            f"COALESCE({name}, {expression})"
+            if name in columns
+            else expression
+        )
+        for name, expression in dedup_key_columns().items()
+    }
+
+
+def dedup_reports(
+    conn: DuckDBPyConnection,
+    table_name: str,
+    where: str = "TRUE",
+    reference_table: Optional[str] = None,
+    max_distance_m: float = DEFAULT_MAX_DISTANCE_M,
+    min_similarity: float = DEFAULT_MIN_SIMILARITY,
+) -> int:
+    """
+    Delete reports that duplicate an earlier report.
+
+    Candidate pairs are only formed within blocks sharing a BIN, a
+    normalized address or a small grid cell, each found by an equality
+    join, so the cost grows with the size of the blocks rather than
+    with the square of the batch. A candidate is a duplicate when it
+    lies within max_distance_m of the earlier report and shares its BIN
+    or has the same house number and a similar street; reports without
+    coordinates need the same BIN or normalized address.
+
+    Since every duplicate shares a BIN or a house number with the batch
+    row it duplicates, stored reports are first narrowed by a semi-join
+    on those two keys, and only the remainder are placed in grid cells.
+    Tables with the dedup_key_columns stored are matched on them rather
+    than on the address expressions, so the semi-join compares plain
+    columns and the cost per batch follows the matching history rather
+    than the whole reference table.
+
+    Args:
+        conn: DuckDB connection to use
+        table_name: Table of reports to deduplicate in place
+        where: Filter selecting the rows to consider, e.g. "is_valid"
+        reference_table: Optional table of already stored reports; rows
+            duplicating any of them are deleted too
+        max_distance_m: Distance within which reports can be duplicates
+        min_similarity: Jaro-Winkler address similarity, from 0 to 1,
+            above which nearby reports are duplicates
+
+    Returns:
+        Number of rows deleted
+    """
+
+    def reports(table: str, keys: Dict[str, str], table_where: str) -> str:
+        return f"""
+            SELECT
+                rowid AS row_id,
+                bin,
+                {keys["address_key"]} AS address_key,
+                {keys["house_number"]} AS house_number,
+                {grid_cell_expression(zoom=DEDUP_ZOOM)} AS cell,
+                latitude,
+                longitude
+            FROM {table}
+            WHERE {table_where}
+        """
+
+    sources = {
+        "batch": reports(
+            table_name, _key_expressions(conn, table_name), where
+        ),
+    }
+    # Pairs within the batch keep the earlier row
+    pair_filters = {"batch": "a.row_id < b.row_id"}
+    if reference_table:
+        stored_keys = _key_expressions(conn, reference_table)
+        stored_where = f"""
+            bin IN (SELECT bin FROM batch)
+            OR {stored_keys["house_number"]} IN (
+                SELECT house_number FROM batch
+            )
+        """
+        sources["stored"] = reports(reference_table, stored_keys, stored_where)
+        pair_filters["stored"] = "TRUE"
+
+    distance = distance_expression(
+        "a.latitude", "a.longitude", "b.latitude", "b.longitude"
+    )
+    candidates = " UNION ".join(
+        f"""
+        SELECT b.row_id AS duplicate_id
+        FROM {source} AS a
+        JOIN batch AS b ON a.{key} = b.{key} AND {pair_filters[source]}
+        WHERE COALESCE(
+            {distance} <= {max_distance_m},
+            a.address_key = b.address_key OR a.bin = b.bin
+        )
+        AND (
+            a.bin = b.bin
+            OR (
+                a.house_number = b.house_number
+                AND jaro_winkler_similarity(a.address_key, b.address_key)
+                    >= {min_similarity}
+            )
+        )
+        """
+        for source in sources
+        for key in ["bin", "address_key", "cell"]
+    )
+    ctes = ", ".join(
+        f"{name} AS MATERIALIZED ({query})" for name, query in sources.items()
+    )
+
+    deleted = conn.execute(
+        f"""
+        DELETE FROM {table_name}
+        WHERE rowid IN (
+            WITH {ctes}
+            {candidates}
+        )
+    """
+    ).fetchone()[0]
+    if deleted:
+        logger.info(f"Dropped {deleted} duplicate reports from {table_name}")
+    return deleted
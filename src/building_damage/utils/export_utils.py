@@ -0,0 +1,271 @@
+"""Utility functions for exporting processed damage data to map formats."""
+
+import logging
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from duckdb import DuckDBPyConnection
+
+from building_damage.utils.rollup_utils import (
+    DISTRICT_ROLLUP_TABLE,
+    district_counts_query,
+    rollup_tracks,
+)
+
+logger = logging.getLogger(__name__)
+
+WATERMARK_TABLE = "export_watermarks"
+
+# Export format -> COPY options. GDAL writers stream features to disk, and
+# Parquet gets GeoParquet metadata when the spatial extension is loaded.
+EXPORT_FORMATS: Dict[str, str] = {
+    "geojson": "FORMAT GDAL, DRIVER 'GeoJSON'",
+    "flatgeobuf": "FORMAT GDAL, DRIVER 'FlatGeobuf', SRS 'EPSG:4326'",
+    "geoparquet": "FORMAT PARQUET, COMPRESSION ZSTD",
+}
+
+FORMAT_EXTENSIONS: Dict[str, str] = {
+    ".geojson": "geojson",
+    ".json": "geojson",
+    ".fgb": "flatgeobuf",
+    ".parquet": "geoparquet",
+    ".geoparquet": "geoparquet",
+}
+
+
+def format_for_path(path: str) -> str:
+    """Infers the export format from an output file's extension."""
+    suffix = Path(path).suffix.lower()
+    if suffix not in FORMAT_EXTENSIONS:
+        raise ValueError(
+            f"Cannot infer export format from '{suffix}'; "
+            f"expected one of {sorted(FORMAT_EXTENSIONS)}"
+        )
+    return FORMAT_EXTENSIONS[suffix]
+
+
+def ensure_watermark_table(conn: DuckDBPyConnection) -> None:
+    """Creates the export watermark table if it does not exist."""
+    conn.execute(
+        f"""
+        CREATE TABLE IF NOT EXISTS {WATERMARK_TABLE} (
+            export_name VARCHAR PRIMARY KEY,
+            watermark TIMESTAMP,
+            exported_at TIMESTAMP
+        )
+    """
+    )
+
+
+def get_watermark(
+    conn: DuckDBPyConnection, export_name: str
+) -> Optional[datetime]:
+    """Returns the latest time_updated already exported under a name."""
+    row = conn.execute(
+        f"SELECT watermark FROM {WATERMARK_TABLE} WHERE export_name = ?",
+        [export_name],
+    ).fetchone()
+    return row[0] if row else None
+
+
+def set_watermark(
+    conn: DuckDBPyConnection, export_name: str, watermark: datetime
+) -> None:
+    """Records the latest time_updated exported under a name."""
+    conn.execute(
+        f"""
+        INSERT OR REPLACE INTO {WATERMARK_TABLE}
+        VALUES (?, ?, CURRENT_TIMESTAMP::TIMESTAMP)
+    """,
+        [export_name, watermark],
+    )
+
+
+def _pending_rows(
+    conn: DuckDBPyConnection,
+    report_table: str,
+    since: Optional[datetime],
+) -> Tuple[int, Optional[datetime]]:
+    """Counts rows updated after since, and the newest time_updated.
+
+    The upper bound is fixed here, before exporting, so reports committed
+    while the export runs are left for the next one rather than skipped.
+    """
+    return conn.execute(
+        f"""
+        SELECT COUNT(*), MAX(time_updated)
+        FROM {report_table}
+        WHERE ? IS NULL OR time_updated > ?
+    """,
+        [since, since],
+    ).fetchone()
+
+
+def reports_query(
+    report_table: str = "storm_damage",
+    with_districts: bool = False,
+    district_column: str = "BoroCD",
+    time_range: Optional[Tuple[Optional[datetime], datetime]] = None,
+) -> str:
+    """
+    SQL selecting damage reports with a geometry column for export.
+
+    Reports take their building footprint's geometry, falling back to the
+    reported coordinates when the BIN matches no footprint.
+
+    Args:
+        report_table: Table of valid damage reports
+        with_districts: Whether to add the community district containing
+            each report as a district column
+        district_column: Community district identifier column
+        time_range: Optional (exclusive start, inclusive end) bounds on
+            time_updated; a None start means no lower bound
+
+    Returns:
+        SELECT statement over the reports
+    """
+    district_select, district_join = "", ""
+    if with_districts:
+        district_select = f", cd.{district_column}::VARCHAR AS district"
+        district_join = (
+            "LEFT JOIN community_districts AS cd "
+            "ON ST_Within(ST_Point(sd.longitude, sd.latitude), cd.geom)"
+        )
+
+    where = "TRUE"
+    if time_range:
+        start, end = time_range
+        where = f"sd.time_updated <= TIMESTAMP '{end}'"
+        if start is not None:
+            where += f" AND sd.time_updated > TIMESTAMP '{start}'"
+
+    return f"""
+        SELECT
+            sd.*,
+            COALESCE(bf.geom, ST_Point(sd.longitude, sd.latitude)) AS geom
+            {district_select}
+        -- The report point stored with --grid-index is superseded by the
+        -- geom below; COLUMNS also works for tables without it
+        FROM (
+            SELECT COLUMNS(c -> c <> 'geom') FROM {report_table}
+        ) AS sd
+        LEFT JOIN building_footprints AS bf ON sd.bin = bf.bin::VARCHAR
+        {district_join}
+        WHERE {where}
+    """
+
+
+def districts_query(counts_sql: str, district_column: str = "BoroCD") -> str:
+    """
+    SQL joining per-district damage counts to district geometries.
+
+    Args:
+        counts_sql: SELECT statement with a district column and counts
+        district_column: Community district identifier column
+
+    Returns:
+        SELECT statement over the districts with reports
+    """
+    return f"""
+        SELECT cd.geom, counts.*
+        FROM community_districts AS cd
+        JOIN ({counts_sql}) AS counts
+            ON cd.{district_column}::VARCHAR = counts.district
+    """
+
+
+def copy_to_file(
+    conn: DuckDBPyConnection, query: str, path: str, export_format: str
+) -> None:
+    """
+    Streams a query's results to a file with DuckDB's COPY writers.
+
+    The file is written next to its destination and moved into place once
+    complete, so readers never see a partial export.
+
+    Args:
+        conn: DuckDB connection with the spatial extension loaded
+        query: SELECT statement to export
+        path: Output file path
+        export_format: One of EXPORT_FORMATS
+    """
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    temp_path = f"{path}.part"
+    conn.execute(
+        f"COPY ({query}) TO '{temp_path}' ({EXPORT_FORMATS[export_format]})"
+    )
+    os.replace(temp_path, path)
+
+
+def export_reports(
+    conn: DuckDBPyConnection,
+    path: str,
+    export_format: str,
+    report_table: str = "storm_damage",
+    with_districts: bool = False,
+    watermark_name: Optional[str] = None,
+) -> int:
+    """
+    Exports damage reports to a GeoJSON, GeoParquet or FlatGeobuf file.
+
+    With a watermark_name, only reports updated since the last export
+    under that name are written, and the watermark is advanced once the
+    file is in place. Nothing is written when there are no new reports.
+
+    Args:
+        conn: DuckDB connection with the spatial extension loaded
+        path: Output file path
+        export_format: One of EXPORT_FORMATS
+        report_table: Table of valid damage reports
+        with_districts: Whether to tag reports with their district
+        watermark_name: Optional name under which to export incrementally
+
+    Returns:
+        Number of reports exported
+    """
+    since = None
+    if watermark_name:
+        ensure_watermark_table(conn)
+        since = get_watermark(conn, watermark_name)
+
+    num_rows, newest = _pending_rows(conn, report_table, since)
+    if num_rows == 0:
+        logger.info(f"No reports updated since {since}; nothing to export")
+        return 0
+
+    query = reports_query(
+        report_table, with_districts, time_range=(since, newest)
+    )
+    copy_to_file(conn, query, path, export_format)
+    if watermark_name:
+        set_watermark(conn, watermark_name, newest)
+
+    logger.info(f"Exported {num_rows} reports to {path}")
+    return num_rows
+
+
+def export_district_counts(
+    conn: DuckDBPyConnection,
+    path: str,
+    export_format: str,
+    report_table: str = "storm_damage",
+) -> None:
+    """
+    Exports per-district damage counts with district geometries.
+
+    Args:
+        conn: DuckDB connection with the spatial extension loaded
+        path: Output file path
+        export_format: One of EXPORT_FORMATS
+        report_table: Table of valid damage reports, aggregated unless
+            district_damage_rollup is known to count all of them
+    """
+    # A complete rollup of the same reports saves rescanning every report
+    if rollup_tracks(conn, DISTRICT_ROLLUP_TABLE, report_table):
+        counts_sql = f"SELECT * FROM {DISTRICT_ROLLUP_TABLE}"
+    else:
+        counts_sql = district_counts_query(report_table)
+    copy_to_file(conn, districts_query(counts_sql), path, export_format)
+    logger.info(f"Exported district damage counts to {path}")
@@ -0,0 +1,84 @@
+"""Utility functions for installing and loading DuckDB extensions."""
+
+import logging
+import os
+import threading
+import weakref
+from typing import Optional, Set
+
+from duckdb import DuckDBPyConnection, Error
+
+logger = logging.getLogger(__name__)
+
+# Directory to install extensions into and load them from. Pointing this
+# at a pre-populated local directory lets air-gapped workers load
+# extensions without ever reaching the extension repository.
+EXTENSION_DIR_ENV = "BUILDING_DAMAGE_EXTENSION_DIR"
+
+_extension_dir: Optional[str] = os.environ.get(EXTENSION_DIR_ENV)
+_lock = threading.Lock()
+
+# Extensions known to be loaded, per connection object
+_loaded: "weakref.WeakKeyDictionary[DuckDBPyConnection, Set[str]]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def set_extension_directory(path: Optional[str]) -> None:
+    """Pins the directory extensions are installed into and loaded from.
+
+    Overrides BUILDING_DAMAGE_EXTENSION_DIR; None restores DuckDB's
+    default directory under the home directory.
+    """
+    global _extension_dir
+    _extension_dir = path
+
+
+def ensure_extension(conn: DuckDBPyConnection, name: str) -> None:
+    """
+    Loads a DuckDB extension the first time a connection needs it.
+
+    The loaded state is cached per connection, so repeat calls cost a
+    dictionary lookup. Otherwise the extension is loaded if it is already
+    installed, and installed only if it is not, so an installed extension
+    never triggers a download attempt.
+
+    Args:
+        conn: DuckDB connection (or cursor) that needs the extension
+        name: Extension name, e.g. 'spatial'
+    """
+    with _lock:
+        if name in _loaded.get(conn, set()):
+            return
+
+        if _extension_dir:
+            conn.execute(f"SET extension_directory = '{_extension_dir}'")
+
+        installed, loaded = (
+            conn.execute(
+                """
+            SELECT installed, loaded
+            FROM duckdb_extensions()
+            WHERE extension_name = ?
+        """,
+                [name],
+            ).fetchone()
+            or (False, False)
+        )
+
+        if not installed:
+            location = _extension_dir or "the default extension directory"
+            logger.info(f"Installing DuckDB extension {name} into {location}")
+            try:
+                conn.execute(f"INSTALL {name}")
+            except Error as e:
+                raise RuntimeError(
+                    f"DuckDB extension {name} is not installed and could not "
+                    f"be downloaded ({e}). On offline machines, install it "
+                    f"into a directory and point {EXTENSION_DIR_ENV} at it."
+                ) from e
+        if not loaded:
+            conn.execute(f"LOAD {name}")
+            logger.info(f"Loaded DuckDB extension {name}")
+
+        _loaded.setdefault(conn, set()).add(name)
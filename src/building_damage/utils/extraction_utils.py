@@ -1,20 +1,137 @@
 """Utility functions for extraction layer of building damage pipeline."""
 
+import hashlib
 import json
 import logging
+import os
 import tempfile
-from typing import Any, Dict, Optional
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
 
 import requests
 from duckdb import DuckDBPyConnection
 
+from building_damage.utils.extension_utils import ensure_extension
+
 logger = logging.getLogger(__name__)
 
+DOWNLOAD_CHUNK_SIZE = 1 << 20
+
+# (connect, read) seconds; read is the longest wait between bytes, so a
+# stalled connection fails and is retried instead of hanging forever
+REQUEST_TIMEOUT = (10, 120)
+
+# Format of modified dates in API filters and sync state
+MODIFIED_FORMAT = "%Y-%m-%dT%H:%M:%S"
+
+
+@dataclass(frozen=True)
+class PagingScheme:
+    """Query parameters used to count and page through a feature API."""
+
+    offset_param: str
+    limit_param: str
+    count_params: Dict[str, Any]
+    where_param: str
+    since_template: str
+    order_params: Dict[str, Any] = field(default_factory=dict)
+    select_params: Dict[str, str] = field(default_factory=dict)
+    latest_params: Dict[str, str] = field(default_factory=dict)
+
+    def changed_since(self, modified_field: str, since: str) -> Dict[str, str]:
+        """Query parameters selecting records modified at or after since."""
+        return {
+            self.where_param: self.since_template.format(
+                field=modified_field, since=since
+            )
+        }
+
+    def only_field(self, name: str) -> Dict[str, str]:
+        """Query parameters returning only one field of each record."""
+        return {
+            param: value.format(field=name)
+            for param, value in self.select_params.items()
+        }
+
+    def latest_of(self, modified_field: str) -> Dict[str, str]:
+        """Query parameters asking for the latest value of a field."""
+        return {
+            param: value.format(field=modified_field)
+            for param, value in self.latest_params.items()
+        }
+
+
+SOCRATA_PAGING = PagingScheme(
+    offset_param="$offset",
+    limit_param="$limit",
+    count_params={"$select": "count(*)"},
+    where_param="$where",
+    since_template="{field} >= '{since}'",
+    order_params={"$order": ":id"},
+    select_params={"$select": "{field}"},
+    latest_params={"$select": "max({field}) AS latest"},
+)
+
+ARCGIS_PAGING = PagingScheme(
+    offset_param="resultOffset",
+    limit_param="resultRecordCount",
+    count_params={"returnCountOnly": "true", "f": "json"},
+    where_param="where",
+    since_template="{field} >= TIMESTAMP '{since}'",
+    order_params={"orderByFields": "OBJECTID"},
+    select_params={"outFields": "{field}", "returnGeometry": "false"},
+    latest_params={
+        "outStatistics": (
+            '[{{"statisticType": "max", "onStatisticField": "{field}", '
+            '"outStatisticFieldName": "latest"}}]'
+        ),
+        "f": "json",
+    },
+)
+
+SYNC_TABLE = "base_data_sync"
+
 
 def ensure_spatial_extension(conn: DuckDBPyConnection) -> None:
     """Ensures the DuckDB spatial extension is installed and loaded."""
-    conn.execute("INSTALL spatial")
-    conn.execute("LOAD spatial")
+    ensure_extension(conn, "spatial")
+
+
+def download_to_file(
+    endpoint: str,
+    path: str,
+    params: Optional[Dict[str, Any]] = None,
+    chunk_size: int = DOWNLOAD_CHUNK_SIZE,
+) -> int:
+    """
+    Streams an API response body straight to a file.
+
+    The body is never parsed or held in memory as a whole, so peak memory
+    is bounded by chunk_size rather than by the size of the response.
+
+    Args:
+        endpoint: URL to download
+        path: File to write the response body to
+        params: Query parameters for the API request
+        chunk_size: Number of bytes to read from the response at a time
+
+    Returns:
+        Number of bytes written
+    """
+    with requests.get(
+        endpoint, params=params or {}, stream=True, timeout=REQUEST_TIMEOUT
+    ) as response:
+        response.raise_for_status()
+        num_bytes = 0
+        with open(path, "wb") as out_file:
+            for chunk in response.iter_content(chunk_size=chunk_size):
+                out_file.write(chunk)
+                num_bytes += len(chunk)
+    return num_bytes
 
 
 def download_geojson_to_table(
@@ -23,30 +140,28 @@ def download_geojson_to_table(
     endpoint: str,
     params: Optional[Dict[str, Any]] = None,
     create_spatial_index: bool = False,
+    chunk_size: int = DOWNLOAD_CHUNK_SIZE,
 ) -> None:
     """
     Downloads GeoJSON data from an API endpoint and loads it into a new DuckDB table.
+    The response is streamed to a tempfile for ST_Read rather than parsed in
+    Python, so memory use does not grow with the size of the layer.
     Args:
         conn: DuckDB connection to use
         table_name: Name of the table to create in DuckDB
         endpoint: URL of the GeoJSON API endpoint
         params: Query parameters for the API request
         create_spatial_index: Whether to create a spatial index on the geom column
+        chunk_size: Number of bytes to stream from the response at a time
     """
-    # Get the response from the API
-    logger.info(f"Downloading data from {endpoint}")
-    response = requests.get(endpoint, params=params or {})
-    response.raise_for_status()
-    geojson_data = response.json()
-
-    logger.info(
-        f"Downloaded {len(geojson_data['features'])} features from {endpoint}"
-    )
+    # DuckDB reading utility expects a file, so stream to a tempfile
+    with tempfile.NamedTemporaryFile(suffix=".geojson") as temp_file:
+        logger.info(f"Downloading data from {endpoint}")
+        num_bytes = download_to_file(
+            endpoint, temp_file.name, params, chunk_size
+        )
+        logger.info(f"Downloaded {num_bytes} bytes from {endpoint}")
 
-    # DuckDB reading utility expects a file, so write to a tempfile
-    with tempfile.NamedTemporaryFile(mode="w", suffix=".geojson") as temp_file:
-        json.dump(geojson_data, temp_file)
-        temp_file.flush()
         conn.execute(
             f"CREATE TABLE IF NOT EXISTS {table_name} AS SELECT * FROM ST_Read('{temp_file.name}')"
         )
@@ -62,3 +177,758 @@ def download_geojson_to_table(
                 f"CREATE INDEX IF NOT EXISTS {table_name}_geom ON {table_name} USING RTREE (geom)"
             )
             logger.info(f"Created spatial index on {table_name}")
+
+
+def _parse_count(payload: Any) -> int:
+    """Reads a record count from a Socrata or ArcGIS count response."""
+    # ArcGIS returnCountOnly: {"count": n}
+    if isinstance(payload, dict) and "count" in payload:
+        return int(payload["count"])
+    # Socrata JSON: [{"count": "n"}]
+    if isinstance(payload, list):
+        return int(payload[0]["count"])
+    # Socrata GeoJSON: one feature carrying the count as a property
+    return int(payload["features"][0]["properties"]["count"])
+
+
+def fetch_record_count(
+    endpoint: str, paging: PagingScheme, params: Optional[Dict[str, Any]]
+) -> int:
+    """Asks a paged API how many records match the query."""
+    response = requests.get(
+        endpoint,
+        params={**(params or {}), **paging.count_params},
+        timeout=REQUEST_TIMEOUT,
+    )
+    response.raise_for_status()
+    return _parse_count(response.json())
+
+
+def _parse_latest(payload: Any) -> Optional[str]:
+    """Reads a max() statistic from a Socrata or ArcGIS response as a
+    modified date in MODIFIED_FORMAT."""
+    if isinstance(payload, list):
+        record = payload[0] if payload else {}
+    else:
+        features = payload.get("features") or [{}]
+        record = features[0].get("properties") or features[0].get(
+            "attributes", {}
+        )
+    latest = record.get("latest")
+    if latest is None:
+        return None
+    # ArcGIS dates are epoch milliseconds, Socrata's ISO 8601 strings
+    if isinstance(latest, (int, float)):
+        moment = datetime.fromtimestamp(latest / 1000, tz=timezone.utc)
+    else:
+        moment = datetime.fromisoformat(latest)
+    return moment.strftime(MODIFIED_FORMAT)
+
+
+def fetch_source_version(
+    endpoint: str,
+    paging: PagingScheme,
+    params: Optional[Dict[str, Any]] = None,
+    modified_field: Optional[str] = None,
+    **fetch_options: Any,
+) -> Optional[str]:
+    """
+    Asks a feature API for the current version of its data.
+
+    With a modified field, the version is the latest modified date, one
+    small request. Otherwise the pages are downloaded and hashed, which
+    only suits small layers. Either way it matches the version recorded
+    by a complete download or refresh of the source (get_source_version),
+    so it can validate snapshots before anything is loaded.
+
+    Args:
+        endpoint: URL of the feature API
+        paging: Paging scheme of the API, e.g. SOCRATA_PAGING
+        params: Query parameters shared by every request
+        modified_field: Optional field holding each record's last
+            modified date
+        **fetch_options: Passed through to fetch_pages when hashing;
+            must match those used to download the layer
+
+    Returns:
+        Version of the source data, or None for an empty source
+    """
+    if modified_field:
+        response = requests.get(
+            endpoint,
+            params={**(params or {}), **paging.latest_of(modified_field)},
+            timeout=REQUEST_TIMEOUT,
+        )
+        response.raise_for_status()
+        return _parse_latest(response.json())
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        page_paths = fetch_pages(
+            endpoint, paging, temp_dir, params, **fetch_options
+        )
+        return _hash_files(page_paths) if page_paths else None
+
+
+def _download_page(
+    endpoint: str,
+    page_path: Path,
+    params: Dict[str, Any],
+    max_retries: int,
+    retry_delay: float,
+) -> None:
+    """Downloads one page with retries, then moves it into place."""
+    part_path = page_path.with_suffix(".part")
+    for attempt in range(1, max_retries + 1):
+        try:
+            download_to_file(endpoint, str(part_path), params)
+            break
+        except requests.RequestException as e:
+            if attempt == max_retries:
+                raise
+            logger.warning(
+                f"Page {page_path.name} failed ({e}), "
+                f"retry {attempt} of {max_retries - 1}"
+            )
+            time.sleep(retry_delay * 2 ** (attempt - 1))
+    # The rename marks the page as complete for resumed runs
+    os.replace(part_path, page_path)
+
+
+def fetch_pages(
+    endpoint: str,
+    paging: PagingScheme,
+    checkpoint_dir: str,
+    params: Optional[Dict[str, Any]] = None,
+    page_size: int = 50_000,
+    max_records: Optional[int] = None,
+    max_workers: int = 4,
+    max_retries: int = 3,
+    retry_delay: float = 1.0,
+) -> List[str]:
+    """
+    Downloads every page of a paged feature API into a checkpoint directory.
+
+    Pages are fetched concurrently by up to max_workers threads. Each page
+    is only moved into its final file name once fully downloaded, so a
+    rerun after a failure skips completed pages and resumes where the
+    previous run stopped.
+
+    Args:
+        endpoint: URL of the feature API
+        paging: Paging scheme of the API, e.g. SOCRATA_PAGING
+        checkpoint_dir: Directory holding completed pages
+        params: Query parameters shared by every page request
+        page_size: Number of records per page; must not exceed the
+            server's maximum record count
+        max_records: Optional cap on the total number of records
+        max_workers: Maximum number of concurrent page downloads
+        max_retries: Attempts per page before giving up
+        retry_delay: Seconds to wait before the first retry; doubles on
+            each further retry
+
+    Returns:
+        Paths of all page files, in offset order
+    """
+    total = fetch_record_count(endpoint, paging, params)
+    if max_records is not None:
+        total = min(total, max_records)
+
+    Path(checkpoint_dir).mkdir(parents=True, exist_ok=True)
+    pages = {
+        offset: Path(checkpoint_dir)
+        / f"page_{page_size}_{offset:012d}.geojson"
+        for offset in range(0, total, page_size)
+    }
+    pending = {
+        offset: path for offset, path in pages.items() if not path.exists()
+    }
+    logger.info(
+        f"{total} records in {len(pages)} pages from {endpoint}; "
+        f"{len(pages) - len(pending)} already downloaded"
+    )
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            executor.submit(
+                _download_page,
+                endpoint,
+                path,
+                {
+                    **(params or {}),
+                    **paging.order_params,
+                    paging.offset_param: offset,
+                    paging.limit_param: min(page_size, total - offset),
+                },
+                max_retries,
+                retry_delay,
+            )
+            for offset, path in pending.items()
+        ]
+        # Surface the first failure once every page has had its chance
+        errors = [future.exception() for future in futures]
+    for error in errors:
+        if error is not None:
+            raise error
+
+    return [str(pages[offset]) for offset in sorted(pages)]
+
+
+def table_exists(conn: DuckDBPyConnection, table_name: str) -> bool:
+    """Whether a table or view of the given name exists."""
+    return bool(
+        conn.execute(
+            """
+            SELECT COUNT(*) FROM information_schema.tables
+            WHERE table_name = ?
+        """,
+            [table_name],
+        ).fetchone()[0]
+    )
+
+
+def _load_pages(
+    conn: DuckDBPyConnection, table_name: str, page_paths: List[str]
+) -> None:
+    """Creates a table from downloaded GeoJSON pages in one transaction."""
+    conn.begin()
+    try:
+        conn.execute(
+            f"CREATE OR REPLACE TABLE {table_name} AS SELECT * FROM ST_Read('{page_paths[0]}')"
+        )
+        for page_path in page_paths[1:]:
+            conn.execute(
+                f"INSERT INTO {table_name} BY NAME SELECT * FROM ST_Read('{page_path}')"
+            )
+    except Exception:
+        conn.rollback()
+        raise
+    conn.commit()
+
+
+def _create_spatial_index(conn: DuckDBPyConnection, table_name: str) -> None:
+    logger.info(f"Creating spatial index on {table_name}...")
+    conn.execute(
+        f"CREATE INDEX IF NOT EXISTS {table_name}_geom ON {table_name} USING RTREE (geom)"
+    )
+    logger.info(f"Created spatial index on {table_name}")
+
+
+def download_paged_geojson_to_table(
+    conn: DuckDBPyConnection,
+    table_name: str,
+    endpoint: str,
+    paging: PagingScheme,
+    params: Optional[Dict[str, Any]] = None,
+    create_spatial_index: bool = False,
+    checkpoint_dir: Optional[str] = None,
+    modified_field: Optional[str] = None,
+    **fetch_options: Any,
+) -> None:
+    """
+    Downloads a paged GeoJSON API concurrently and loads it into a new table.
+
+    Completed pages are kept in checkpoint_dir until the table has been
+    loaded, so an interrupted download can be resumed by calling again
+    with the same directory. The source version is recorded as for a
+    refresh, so snapshots of the table are tagged with it.
+
+    Args:
+        conn: DuckDB connection to use
+        table_name: Name of the table to create in DuckDB
+        endpoint: URL of the GeoJSON API endpoint
+        paging: Paging scheme of the API, e.g. SOCRATA_PAGING
+        params: Query parameters for the API requests
+        create_spatial_index: Whether to create a spatial index on the geom column
+        checkpoint_dir: Directory for completed pages; a temporary
+            directory, removed afterwards, is used if not given
+        modified_field: Optional field holding each record's last
+            modified date, recorded as the source version
+        **fetch_options: Passed through to fetch_pages, e.g. page_size
+    """
+    if table_exists(conn, table_name):
+        logger.info(f"Table {table_name} already exists, skipping download")
+        return
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        page_paths = fetch_pages(
+            endpoint,
+            paging,
+            checkpoint_dir or temp_dir,
+            params,
+            **fetch_options,
+        )
+        if not page_paths:
+            raise ValueError(f"No records available from {endpoint}")
+
+        _load_pages(conn, table_name, page_paths)
+        num_rows = conn.execute(
+            f"SELECT COUNT(*) FROM {table_name}"
+        ).fetchone()[0]
+        logger.info(f"Created table {table_name} with {num_rows} rows")
+
+        _ensure_sync_table(conn)
+        _record_sync(
+            conn,
+            table_name,
+            (
+                _max_modified(conn, table_name, modified_field)
+                if modified_field
+                else None
+            ),
+            _hash_files(page_paths),
+        )
+
+        # The pages are no longer needed once the table is committed
+        for page_path in page_paths:
+            os.remove(page_path)
+
+    if create_spatial_index:
+        _create_spatial_index(conn, table_name)
+
+
+def _ensure_sync_table(conn: DuckDBPyConnection) -> None:
+    conn.execute(
+        f"""
+        CREATE TABLE IF NOT EXISTS {SYNC_TABLE} (
+            table_name VARCHAR PRIMARY KEY,
+            last_modified VARCHAR,
+            source_hash VARCHAR,
+            synced_at TIMESTAMP
+        )
+    """
+    )
+
+
+def _record_sync(
+    conn: DuckDBPyConnection,
+    table_name: str,
+    last_modified: Optional[str],
+    source_hash: Optional[str],
+) -> None:
+    conn.execute(
+        f"""
+        INSERT OR REPLACE INTO {SYNC_TABLE}
+        VALUES (?, ?, ?, CURRENT_TIMESTAMP::TIMESTAMP)
+    """,
+        [table_name, last_modified, source_hash],
+    )
+
+
+def _max_modified(
+    conn: DuckDBPyConnection, table_name: str, modified_field: str
+) -> Optional[str]:
+    """Latest modified value in a table, formatted for API filters."""
+    return conn.execute(
+        f"""
+        SELECT strftime(MAX({modified_field})::TIMESTAMP, '{MODIFIED_FORMAT}')
+        FROM {table_name}
+    """
+    ).fetchone()[0]
+
+
+def _hash_files(paths: List[str]) -> str:
+    hasher = hashlib.sha256()
+    for path in paths:
+        with open(path, "rb") as in_file:
+            for block in iter(lambda: in_file.read(DOWNLOAD_CHUNK_SIZE), b""):
+                hasher.update(block)
+    return hasher.hexdigest()
+
+
+def _load_keys(
+    conn: DuckDBPyConnection,
+    keys_table: str,
+    key_column: str,
+    page_paths: List[str],
+) -> None:
+    """Creates a temporary table of the keys in downloaded GeoJSON pages.
+
+    Only the feature properties are read, so this needs neither the
+    spatial extension nor geometries in the response.
+    """
+    files = ", ".join(f"'{path}'" for path in page_paths)
+    conn.execute(
+        f"""
+        CREATE OR REPLACE TEMPORARY TABLE {keys_table} AS
+        SELECT DISTINCT feature->>'$.properties.{key_column}' AS key
+        FROM (
+            SELECT unnest(features) AS feature
+            FROM read_json(
+                [{files}],
+                columns = {{'features': 'JSON[]'}},
+                maximum_object_size = {1 << 30}
+            )
+        )
+    """
+    )
+
+
+def _merge_changes(
+    conn: DuckDBPyConnection,
+    table_name: str,
+    changes_table: str,
+    key_column: str,
+    keys_table: Optional[str] = None,
+) -> Tuple[int, int]:
+    """Replaces rows of a table with their changed versions by key.
+
+    Args:
+        conn: DuckDB connection to use
+        table_name: Table to update
+        changes_table: Table of new and changed rows; dropped afterwards
+        key_column: Column that uniquely identifies a row
+        keys_table: Optional table of every key still at the source;
+            rows with other keys are deleted
+
+    Returns:
+        Tuple of (rows inserted or replaced, rows deleted)
+    """
+    conn.begin()
+    try:
+        num_deleted = 0
+        if keys_table:
+            num_deleted = conn.execute(
+                f"""
+                DELETE FROM {table_name}
+                WHERE {key_column}::VARCHAR NOT IN (
+                    SELECT key FROM {keys_table} WHERE key IS NOT NULL
+                )
+            """
+            ).fetchone()[0]
+        conn.execute(
+            f"""
+            DELETE FROM {table_name}
+            WHERE {key_column} IN (SELECT {key_column} FROM {changes_table})
+        """
+        )
+        num_changed = conn.execute(
+            f"INSERT INTO {table_name} BY NAME SELECT * FROM {changes_table}"
+        ).fetchone()[0]
+        conn.execute(f"DROP TABLE {changes_table}")
+    except Exception:
+        conn.rollback()
+        raise
+    conn.commit()
+    return num_changed, num_deleted
+
+
+def refresh_paged_geojson_table(
+    conn: DuckDBPyConnection,
+    table_name: str,
+    endpoint: str,
+    paging: PagingScheme,
+    params: Optional[Dict[str, Any]] = None,
+    key_column: Optional[str] = None,
+    modified_field: Optional[str] = None,
+    create_spatial_index: bool = False,
+    rebuild_index_fraction: float = 0.2,
+    remove_deleted: bool = False,
+    **fetch_options: Any,
+) -> int:
+    """
+    Brings a base-data table up to date without a full reload where possible.
+
+    With a key column and modified-date field, only features modified
+    since the last sync are downloaded and merged in by key. When more
+    than rebuild_index_fraction of the table changes, the RTREE index is
+    dropped before the merge and rebuilt once after it; otherwise the
+    merge maintains it in place. Without them, the full
+    layer is downloaded and the table is replaced only if the content
+    hash differs from the last sync. A table that does not exist yet is
+    always loaded in full.
+
+    Sync state is kept per table in the base_data_sync table. A
+    modified-date refresh cannot see features deleted at the source;
+    with remove_deleted, the source's keys alone are downloaded too and
+    rows whose key is gone are deleted in the same transaction.
+
+    Args:
+        conn: DuckDB connection to use
+        table_name: Name of the table to refresh
+        endpoint: URL of the GeoJSON API endpoint
+        paging: Paging scheme of the API, e.g. SOCRATA_PAGING
+        params: Query parameters for the API requests
+        key_column: Column that uniquely identifies a feature
+        modified_field: Field holding each feature's last modified date
+        create_spatial_index: Whether to keep a spatial index on the geom column
+        rebuild_index_fraction: Fraction of changed rows above which the
+            spatial index is rebuilt rather than updated in place
+        remove_deleted: Whether an incremental refresh also deletes rows
+            whose key no longer exists at the source
+        **fetch_options: Passed through to fetch_pages, e.g. page_size
+
+    Returns:
+        Number of rows inserted or replaced
+    """
+    _ensure_sync_table(conn)
+    incremental = bool(key_column and modified_field)
+    sync_state = conn.execute(
+        f"SELECT last_modified, source_hash FROM {SYNC_TABLE} WHERE table_name = ?",
+        [table_name],
+    ).fetchone()
+    exists = table_exists(conn, table_name)
+
+    since = None
+    if exists and incremental:
+        since = (sync_state and sync_state[0]) or _max_modified(
+            conn, table_name, modified_field
+        )
+    base_params = params
+    if since:
+        params = {
+            **(params or {}),
+            **paging.changed_since(modified_field, since),
+        }
+        logger.info(f"Fetching {table_name} features modified since {since}")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        page_paths = fetch_pages(
+            endpoint, paging, temp_dir, params, **fetch_options
+        )
+        source_hash = None if since else _hash_files(page_paths)
+
+        keys_table = None
+        if since and remove_deleted:
+            keys_table = f"{table_name}_source_keys"
+            key_pages = fetch_pages(
+                endpoint,
+                paging,
+                str(Path(temp_dir) / "keys"),
+                {**(base_params or {}), **paging.only_field(key_column)},
+                **fetch_options,
+            )
+            if key_pages:
+                _load_keys(conn, keys_table, key_column, key_pages)
+            else:
+                # An empty listing is more likely an outage than a source
+                # with every feature deleted
+                logger.warning(
+                    f"No keys listed for {table_name}; skipping deletes"
+                )
+                keys_table = None
+
+        if not page_paths and not keys_table:
+            logger.info(f"No new or changed records for {table_name}")
+            return 0
+        if (
+            exists
+            and not since
+            and sync_state
+            and source_hash == sync_state[1]
+        ):
+            logger.info(f"{table_name} is unchanged at the source")
+            return 0
+
+        if since:
+            changes_table = f"{table_name}_changes"
+            if page_paths:
+                _load_pages(conn, changes_table, page_paths)
+            else:
+                conn.execute(
+                    f"""
+                    CREATE OR REPLACE TABLE {changes_table} AS
+                    SELECT * FROM {table_name} WHERE 1=0
+                """
+                )
+            if create_spatial_index:
+                _drop_index_for_merge(
+                    conn,
+                    table_name,
+                    changes_table,
+                    keys_table,
+                    key_column,
+                    rebuild_index_fraction,
+                )
+            num_changed, num_deleted = _merge_changes(
+                conn, table_name, changes_table, key_column, keys_table
+            )
+            if keys_table:
+                conn.execute(f"DROP TABLE {keys_table}")
+                logger.info(
+                    f"Deleted {num_deleted} rows of {table_name} removed "
+                    "at the source"
+                )
+        else:
+            _load_pages(conn, table_name, page_paths)
+            num_changed = conn.execute(
+                f"SELECT COUNT(*) FROM {table_name}"
+            ).fetchone()[0]
+
+    last_modified = (
+        _max_modified(conn, table_name, modified_field)
+        if incremental
+        else None
+    )
+    _record_sync(conn, table_name, last_modified, source_hash)
+    logger.info(f"Refreshed {num_changed} rows of {table_name}")
+
+    # Recreates the index if the reload or a large merge dropped it
+    if create_spatial_index:
+        _create_spatial_index(conn, table_name)
+
+    return num_changed
+
+
+def _drop_index_for_merge(
+    conn: DuckDBPyConnection,
+    table_name: str,
+    changes_table: str,
+    keys_table: Optional[str],
+    key_column: str,
+    rebuild_index_fraction: float,
+) -> None:
+    """Drops the spatial index before a merge that changes enough rows
+    that rebuilding it afterwards is cheaper than maintaining it."""
+    num_rows = conn.execute(f"SELECT COUNT(*) FROM {table_name}").fetchone()[0]
+    num_changed = conn.execute(
+        f"SELECT COUNT(*) FROM {changes_table}"
+    ).fetchone()[0]
+    if keys_table:
+        num_changed += conn.execute(
+            f"""
+            SELECT COUNT(*) FROM {table_name}
+            WHERE {key_column}::VARCHAR NOT IN (
+                SELECT key FROM {keys_table} WHERE key IS NOT NULL
+            )
+        """
+        ).fetchone()[0]
+    if num_changed > rebuild_index_fraction * num_rows:
+        logger.info(
+            f"Dropping spatial index on {table_name} to rebuild after "
+            f"merging {num_changed} changes"
+        )
+        conn.execute(f"DROP INDEX IF EXISTS {table_name}_geom")
+
+
+def _snapshot_paths(cache_dir: str, table_name: str) -> Tuple[Path, Path]:
+    """Parquet file and metadata sidecar of a table snapshot."""
+    return (
+        Path(cache_dir) / f"{table_name}.parquet",
+        Path(cache_dir) / f"{table_name}.json",
+    )
+
+
+def get_source_version(
+    conn: DuckDBPyConnection, table_name: str
+) -> Optional[str]:
+    """Source version of a table as of its last sync, if it was refreshed."""
+    if not table_exists(conn, SYNC_TABLE):
+        return None
+    row = conn.execute(
+        f"""
+        SELECT COALESCE(last_modified, source_hash)
+        FROM {SYNC_TABLE} WHERE table_name = ?
+    """,
+        [table_name],
+    ).fetchone()
+    return row[0] if row else None
+
+
+def write_snapshot(
+    conn: DuckDBPyConnection,
+    table_name: str,
+    cache_dir: str,
+    source_version: Optional[str] = None,
+) -> str:
+    """
+    Writes a table to a compressed (Geo)Parquet snapshot in a cache directory.
+
+    With the spatial extension loaded, geometry columns are written with
+    GeoParquet metadata. A JSON sidecar records the source version and a
+    SHA-256 checksum of the file, which load_snapshot uses to decide
+    whether the snapshot can be trusted. An existing snapshot of the same
+    source version is left as is.
+
+    Args:
+        conn: DuckDB connection to use
+        table_name: Name of the table to snapshot
+        cache_dir: Directory holding snapshots
+        source_version: Version of the source data the table reflects
+
+    Returns:
+        Path of the snapshot file
+    """
+    parquet_path, meta_path = _snapshot_paths(cache_dir, table_name)
+    if source_version and meta_path.exists():
+        meta = json.loads(meta_path.read_text())
+        if meta["source_version"] == source_version and parquet_path.exists():
+            logger.info(f"Snapshot of {table_name} is already current")
+            return str(parquet_path)
+
+    Path(cache_dir).mkdir(parents=True, exist_ok=True)
+    temp_path = parquet_path.with_suffix(".parquet.part")
+    num_rows = conn.execute(
+        f"""
+        COPY (SELECT * FROM {table_name})
+        TO '{temp_path}' (FORMAT PARQUET, COMPRESSION ZSTD)
+    """
+    ).fetchone()[0]
+    os.replace(temp_path, parquet_path)
+
+    meta = {
+        "table_name": table_name,
+        "source_version": source_version,
+        "sha256": _hash_files([str(parquet_path)]),
+        "rows": num_rows,
+    }
+    meta_path.write_text(json.dumps(meta, indent=2))
+    logger.info(f"Wrote {num_rows} rows of {table_name} to {parquet_path}")
+    return str(parquet_path)
+
+
+def load_snapshot(
+    conn: DuckDBPyConnection,
+    table_name: str,
+    cache_dir: str,
+    source_version: Optional[str] = None,
+    as_view: bool = False,
+    create_spatial_index: bool = False,
+) -> bool:
+    """
+    Loads a table from its cached snapshot, if the snapshot is valid.
+
+    The snapshot is rejected when its checksum does not match the file,
+    or when a source_version is given and differs from the one recorded.
+    With as_view set, a view over the Parquet file is created instead of
+    importing it, so the data is queried in place.
+
+    Args:
+        conn: DuckDB connection to use
+        table_name: Name of the table (or view) to create
+        cache_dir: Directory holding snapshots
+        source_version: Required source version, if known
+        as_view: Whether to query the snapshot in place instead of
+            importing it
+        create_spatial_index: Whether to create a spatial index on the
+            geom column; ignored for views
+
+    Returns:
+        True if the table was loaded from the snapshot
+    """
+    parquet_path, meta_path = _snapshot_paths(cache_dir, table_name)
+    if not (parquet_path.exists() and meta_path.exists()):
+        return False
+
+    meta = json.loads(meta_path.read_text())
+    if source_version and meta["source_version"] != source_version:
+        logger.info(
+            f"Snapshot of {table_name} is for source version "
+            f"{meta['source_version']}, not {source_version}"
+        )
+        return False
+    if _hash_files([str(parquet_path)]) != meta["sha256"]:
+        logger.warning(f"Snapshot of {table_name} failed its checksum")
+        return False
+
+    relation = "VIEW" if as_view else "TABLE"
+    conn.execute(
+        f"""
+        CREATE OR REPLACE {relation} {table_name} AS
+        SELECT * FROM read_parquet('{parquet_path}')
+    """
+    )
+    logger.info(f"Loaded {table_name} from snapshot {parquet_path}")
+
+    if create_spatial_index and not as_view:
+        _create_spatial_index(conn, table_name)
+    return True
@@ -0,0 +1,231 @@
+"""Utility functions for indexing and querying reports by map grid cell."""
+
+import logging
+import math
+from typing import List, Optional, Tuple, Union
+
+from building_damage.utils.rollup_utils import DAMAGE_CATEGORIES
+
+logger = logging.getLogger(__name__)
+
+# Reports are indexed by the Web Mercator tile containing them at this
+# zoom (about 460 m across at NYC latitudes), stored as an integer
+# quadkey. A cell's parent at zoom z is cell >> 2 * (GRID_ZOOM - z).
+GRID_ZOOM = 16
+
+# Bounding boxes covering more cells than this are filtered on
+# coordinates alone, since a long IN list costs more than it prunes
+MAX_INDEXED_CELLS = 2048
+
+MAX_LATITUDE = 85.05112878
+EARTH_RADIUS_M = 6_371_000
+
+# (min_lon, min_lat, max_lon, max_lat)
+BBox = Tuple[float, float, float, float]
+
+
+def tile_xy(lat: float, lon: float, zoom: int = GRID_ZOOM) -> Tuple[int, int]:
+    """Web Mercator tile column and row containing a point."""
+    n = 1 << zoom
+    lat = max(-MAX_LATITUDE, min(MAX_LATITUDE, lat))
+    x = math.floor((lon + 180) / 360 * n)
+    y = math.floor(
+        (1 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2 * n
+    )
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+
+def _interleave(x: int, y: int, zoom: int) -> int:
+    cell = 0
+    for bit in range(zoom):
+        cell |= ((x >> bit) & 1) << (2 * bit)
+        cell |= ((y >> bit) & 1) << (2 * bit + 1)
+    return cell
+
+
+def grid_cell(lat: float, lon: float, zoom: int = GRID_ZOOM) -> int:
+    """Integer quadkey of the tile containing a point."""
+    return _interleave(*tile_xy(lat, lon, zoom), zoom)
+
+
+def cell_tile(cell: int, zoom: int = GRID_ZOOM) -> Tuple[int, int, int]:
+    """Tile (x, y, zoom) of an integer quadkey, e.g. for map tile URLs."""
+    x = y = 0
+    for bit in range(zoom):
+        x |= ((cell >> (2 * bit)) & 1) << bit
+        y |= ((cell >> (2 * bit + 1)) & 1) << bit
+    return x, y, zoom
+
+
+def grid_cell_expression(
+    lat_column: str = "latitude",
+    lon_column: str = "longitude",
+    zoom: int = GRID_ZOOM,
+) -> str:
+    """
+    SQL expression computing grid_cell from coordinate columns.
+
+    Matches grid_cell() in Python, and is NULL when either coordinate
+    is NULL.
+
+    Args:
+        lat_column: Latitude column
+        lon_column: Longitude column
+        zoom: Tile zoom level of the cells
+
+    Returns:
+        SQL expression evaluating to a BIGINT quadkey
+    """
+    n = 1 << zoom
+    lat = f"LEAST(GREATEST({lat_column}, {-MAX_LATITUDE}), {MAX_LATITUDE})"
+    x = f"LEAST(GREATEST(FLOOR(({lon_column} + 180) / 360 * {n}), 0), {n - 1})"
+    y = (
+        f"LEAST(GREATEST(FLOOR((1 - asinh(tan(radians({lat}))) / pi()) "
+        f"/ 2 * {n}), 0), {n - 1})"
+    )
+    # Bitwise operators share one precedence level, so every term is
+    # parenthesized; DuckDB computes the repeated x and y only once
+    bits = []
+    for bit in range(zoom):
+        bits.append(f"((({x}::BIGINT >> {bit}) & 1) << {2 * bit})")
+        bits.append(f"((({y}::BIGINT >> {bit}) & 1) << {2 * bit + 1})")
+    return f"({' | '.join(bits)})"
+
+
+def cells_covering(bbox: BBox, zoom: int = GRID_ZOOM) -> List[int]:
+    """Integer quadkeys of every tile intersecting a bounding box."""
+    min_lon, min_lat, max_lon, max_lat = bbox
+    x0, y0 = tile_xy(max_lat, min_lon, zoom)
+    x1, y1 = tile_xy(min_lat, max_lon, zoom)
+    return [
+        _interleave(x, y, zoom)
+        for x in range(x0, x1 + 1)
+        for y in range(y0, y1 + 1)
+    ]
+
+
+def bbox_filter(bbox: BBox) -> str:
+    """
+    SQL predicate selecting reports inside a bounding box.
+
+    The covering cells are matched as a subquery. DuckDB runs it as a
+    hash semi-join and pushes the cells, and their min and max, into the
+    table scan as a dynamic filter. Pruning comes from the min/max
+    zonemaps of each row group, so it relies on rows being clustered by
+    grid_cell, as the pipeline inserts them; there is no index. The
+    coordinate conditions trim edge cells.
+
+    Args:
+        bbox: (min_lon, min_lat, max_lon, max_lat)
+
+    Returns:
+        SQL predicate over grid_cell, latitude and longitude
+    """
+    min_lon, min_lat, max_lon, max_lat = bbox
+    conditions = [
+        f"latitude BETWEEN {min_lat} AND {max_lat}",
+        f"longitude BETWEEN {min_lon} AND {max_lon}",
+    ]
+    # Estimate before listing, since a wide box at GRID_ZOOM is huge
+    x0, y0 = tile_xy(max_lat, min_lon)
+    x1, y1 = tile_xy(min_lat, max_lon)
+    if (x1 - x0 + 1) * (y1 - y0 + 1) <= MAX_INDEXED_CELLS:
+        cells = ", ".join(str(cell) for cell in cells_covering(bbox))
+        conditions.insert(
+            0, f"grid_cell IN (SELECT unnest([{cells}]::BIGINT[]))"
+        )
+    return " AND ".join(conditions)
+
+
+def bbox_query(table_name: str, bbox: BBox) -> str:
+    """Query for the reports inside a bounding box."""
+    return f"SELECT * FROM {table_name} WHERE {bbox_filter(bbox)}"
+
+
+def _radius_bbox(lat: float, lon: float, radius_m: float) -> BBox:
+    lat_delta = math.degrees(radius_m / EARTH_RADIUS_M)
+    lon_delta = lat_delta / max(math.cos(math.radians(lat)), 1e-6)
+    return (lon - lon_delta, lat - lat_delta, lon + lon_delta, lat + lat_delta)
+
+
+def distance_expression(
+    lat1: Union[str, float],
+    lon1: Union[str, float],
+    lat2: Union[str, float],
+    lon2: Union[str, float],
+) -> str:
+    """SQL expression for the great-circle distance in meters between two
+    points, given as column names or numbers."""
+    return f"""
+        2 * {EARTH_RADIUS_M} * asin(sqrt(
+            pow(sin(radians({lat1} - {lat2}) / 2), 2)
+            + cos(radians({lat1})) * cos(radians({lat2}))
+            * pow(sin(radians({lon1} - {lon2}) / 2), 2)
+        ))
+    """
+
+
+def radius_query(
+    table_name: str, lat: float, lon: float, radius_m: float
+) -> str:
+    """
+    Query for the reports within a distance of a point, nearest first.
+
+    Candidates come from the cells covering the circle's bounding box;
+    only those are checked against the great-circle distance.
+
+    Args:
+        table_name: Table of reports with grid_cell
+        lat: Latitude of the center
+        lon: Longitude of the center
+        radius_m: Radius in meters
+
+    Returns:
+        SQL query adding a distance_m column
+    """
+    distance = distance_expression("latitude", "longitude", lat, lon)
+    return f"""
+        SELECT * FROM (
+            SELECT *, {distance} AS distance_m
+            FROM {table_name}
+            WHERE {bbox_filter(_radius_bbox(lat, lon, radius_m))}
+        )
+        WHERE distance_m <= {radius_m}
+        ORDER BY distance_m
+    """
+
+
+def cell_density_query(
+    table_name: str, zoom: int = 14, bbox: Optional[BBox] = None
+) -> str:
+    """
+    Query counting reports and damage categories per grid cell.
+
+    Cells at coarser zooms than GRID_ZOOM are found by shifting the
+    stored quadkey, so any zoom up to GRID_ZOOM needs no geometry.
+
+    Args:
+        table_name: Table of reports with grid_cell
+        zoom: Zoom level of the cells to aggregate to
+        bbox: Optional (min_lon, min_lat, max_lon, max_lat) to limit to
+
+    Returns:
+        SQL query with cell (see cell_tile), total_reports and one count
+        per damage category
+    """
+    if zoom > GRID_ZOOM:
+        raise ValueError(f"zoom must be at most {GRID_ZOOM}, got {zoom}")
+    counts = ", ".join(
+        f"COUNT(*) FILTER (WHERE {column})::BIGINT AS {name}"
+        for name, column in DAMAGE_CATEGORIES.items()
+    )
+    where = f"WHERE {bbox_filter(bbox)}" if bbox else ""
+    return f"""
+        SELECT
+            grid_cell >> {2 * (GRID_ZOOM - zoom)} AS cell,
+            COUNT(*)::BIGINT AS total_reports,
+            {counts}
+        FROM {table_name}
+        {where}
+        GROUP BY cell
+    """
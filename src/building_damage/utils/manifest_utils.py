@@ -0,0 +1,248 @@
+"""Utility functions for tracking which input files have been ingested."""
+
+import hashlib
+import logging
+import os
+import threading
+from contextlib import nullcontext
+from dataclasses import dataclass, field, replace
+from typing import Any, Callable, Optional, Tuple
+
+from duckdb import DuckDBPyConnection
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_TABLE = "ingest_manifest"
+HASH_BLOCK_SIZE = 1 << 20
+
+
+@dataclass(frozen=True)
+class FileState:
+    """Identity of an input file at the time it was ingested."""
+
+    path: str
+    size: int
+    mtime_ns: int
+    content_hash: str
+
+
+@dataclass(frozen=True)
+class IngestPlan:
+    """What to ingest from a file, given the manifest.
+
+    A plan with skip set means nothing changed. Otherwise rows are read
+    starting at start_offset, which is 0 for a full ingest and the
+    previously ingested size for a file that was only appended to.
+    """
+
+    state: FileState
+    skip: bool = False
+    start_offset: int = 0
+    # Hash state of the bytes before start_offset, continued by
+    # progress_recorder as batches commit
+    prefix_hasher: Any = field(default=None, compare=False, repr=False)
+
+
+def ensure_manifest_table(conn: DuckDBPyConnection) -> None:
+    """Creates the ingest manifest table if it does not exist."""
+    conn.execute(
+        f"""
+        CREATE TABLE IF NOT EXISTS {MANIFEST_TABLE} (
+            path VARCHAR PRIMARY KEY,
+            size BIGINT,
+            mtime_ns BIGINT,
+            content_hash VARCHAR,
+            ingested_at TIMESTAMP
+        )
+    """
+    )
+
+
+def get_manifest_entry(
+    conn: DuckDBPyConnection, path: str
+) -> Optional[FileState]:
+    """Returns the manifest entry for a path, if it has been ingested."""
+    row = conn.execute(
+        f"""
+        SELECT path, size, mtime_ns, content_hash
+        FROM {MANIFEST_TABLE}
+        WHERE path = ?
+    """,
+        [path],
+    ).fetchone()
+    return FileState(*row) if row else None
+
+
+def record_ingest(conn: DuckDBPyConnection, state: FileState) -> None:
+    """Records a file as ingested up to its current size."""
+    conn.execute(
+        f"""
+        INSERT OR REPLACE INTO {MANIFEST_TABLE}
+        VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP::TIMESTAMP)
+    """,
+        [state.path, state.size, state.mtime_ns, state.content_hash],
+    )
+
+
+def _hash_file(
+    path: str, prefix_size: Optional[int], size: int
+) -> Tuple[str, Any]:
+    """Hash a file's first size bytes in one read, also returning the
+    hash state after a shorter prefix.
+
+    Bytes appended past size while the file is hashed are ignored, so
+    the hash always describes the bytes the ingest was planned for.
+
+    Returns:
+        Tuple of (full_hash, prefix_hasher); prefix_hasher is None when
+        no prefix size is given or the file is shorter than the prefix
+    """
+    hasher = hashlib.sha256()
+    prefix_hasher = None
+    remaining = min(prefix_size, size) if prefix_size is not None else 0
+
+    with open(path, "rb") as handle:
+        while remaining:
+            block = handle.read(min(HASH_BLOCK_SIZE, remaining))
+            if not block:
+                break
+            hasher.update(block)
+            remaining -= len(block)
+        if prefix_size is not None and prefix_size <= size and remaining == 0:
+            prefix_hasher = hasher.copy()
+        remaining = size - handle.tell()
+        while remaining > 0:
+            block = handle.read(min(HASH_BLOCK_SIZE, remaining))
+            if not block:
+                break
+            hasher.update(block)
+            remaining -= len(block)
+
+    return hasher.hexdigest(), prefix_hasher
+
+
+def _ends_with_newline(path: str, size: int) -> bool:
+    with open(path, "rb") as handle:
+        handle.seek(size - 1)
+        return handle.read(1) == b"\n"
+
+
+def plan_ingest(
+    conn: DuckDBPyConnection,
+    path: str,
+    write_lock: Optional[threading.Lock] = None,
+    appendable: bool = True,
+) -> IngestPlan:
+    """
+    Decide how much of a file needs ingesting, based on the manifest.
+
+    Files whose size and mtime match the manifest are skipped without
+    being read. Otherwise the file is hashed once: an unchanged hash is
+    skipped (and its new mtime recorded so the next check is free), a
+    file that only grew past the previously ingested bytes is ingested
+    from that offset, and anything else is ingested in full.
+
+    The plan covers the file as it was when planned: rows should only be
+    read up to state.size, so that bytes appended meanwhile are picked up
+    from the recorded size by the next ingest.
+
+    Formats that cannot be read from an offset, such as Parquet, are
+    planned with appendable unset: they are skipped when unchanged and
+    otherwise ingested in full.
+
+    Args:
+        conn: DuckDB connection holding the manifest table
+        path: Path to input file
+        write_lock: Optional lock shared by writers on the connection,
+            held while recording a file whose mtime alone changed
+        appendable: Whether rows appended to the file can be ingested
+            from the previously ingested size
+
+    Returns:
+        IngestPlan for the file
+    """
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+    previous = get_manifest_entry(conn, path)
+
+    if (
+        previous
+        and previous.size == stat.st_size
+        and previous.mtime_ns == stat.st_mtime_ns
+    ):
+        return IngestPlan(previous, skip=True)
+
+    full_hash, prefix_hasher = _hash_file(
+        path, previous.size if previous else None, stat.st_size
+    )
+    state = FileState(path, stat.st_size, stat.st_mtime_ns, full_hash)
+
+    if previous is None:
+        return IngestPlan(state)
+
+    if full_hash == previous.content_hash:
+        with write_lock or nullcontext():
+            record_ingest(conn, state)
+        return IngestPlan(state, skip=True)
+
+    if (
+        appendable
+        and prefix_hasher is not None
+        and prefix_hasher.hexdigest() == previous.content_hash
+        and previous.size > 0
+        and _ends_with_newline(path, previous.size)
+    ):
+        return IngestPlan(
+            state, start_offset=previous.size, prefix_hasher=prefix_hasher
+        )
+
+    logger.warning(
+        f"{path} was rewritten since last ingest; re-ingesting it in full. "
+        "Rows from its earlier version stay in the table."
+    )
+    return IngestPlan(state)
+
+
+def progress_recorder(
+    conn: DuckDBPyConnection, plan: IngestPlan
+) -> Callable[[int], None]:
+    """
+    Build a callback recording a planned ingest batch by batch.
+
+    Called with the byte offset a committed batch ends at, from inside
+    that batch's transaction, it records the file as ingested up to the
+    offset. A failure or crash after some batches then leaves the
+    manifest at the last committed batch, and the next incremental run
+    resumes there instead of ingesting those rows again.
+
+    Args:
+        conn: DuckDB connection holding the manifest table, the one the
+            batches are committed on
+        plan: Plan of the ingest, not skipped
+
+    Returns:
+        Callback taking the end offset of each committed batch
+    """
+    hasher = plan.prefix_hasher or hashlib.sha256()
+    offset = plan.start_offset
+
+    def record(end_offset: int) -> None:
+        nonlocal offset
+        with open(plan.state.path, "rb") as handle:
+            handle.seek(offset)
+            remaining = end_offset - offset
+            while remaining > 0:
+                block = handle.read(min(HASH_BLOCK_SIZE, remaining))
+                if not block:
+                    break
+                hasher.update(block)
+                remaining -= len(block)
+        offset = end_offset
+        record_ingest(
+            conn,
+            replace(
+                plan.state, size=end_offset, content_hash=hasher.hexdigest()
+            ),
+        )
+
+    return record
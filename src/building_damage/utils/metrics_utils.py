@@ -0,0 +1,121 @@
+"""Utility functions for recording per-stage pipeline metrics."""
+
+import json
+import logging
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+from duckdb import DuckDBPyConnection
+
+logger = logging.getLogger(__name__)
+
+METRICS_TABLE = "pipeline_metrics"
+
+
+@dataclass
+class StageMetric:
+    """Timing and row count of one pipeline stage for one batch."""
+
+    source: str
+    batch: int
+    stage: str
+    seconds: float
+    rows: Optional[int] = None
+
+
+@dataclass
+class RunMetrics:
+    """Stage metrics collected over one run of a pipeline.
+
+    Stages are timed with the stage context manager, which yields the
+    metric so the caller can fill in the row count once it is known.
+    """
+
+    run_id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    started_at: datetime = field(default_factory=datetime.now)
+    stages: List[StageMetric] = field(default_factory=list)
+
+    @contextmanager
+    def stage(
+        self, source: str, batch: int, name: str
+    ) -> Iterator[StageMetric]:
+        metric = StageMetric(source, batch, name, 0.0)
+        start = time.perf_counter()
+        try:
+            yield metric
+        finally:
+            metric.seconds = time.perf_counter() - start
+            self.stages.append(metric)
+
+    def extend(self, other: "RunMetrics") -> None:
+        """Adds the stages of another run, e.g. from a parallel worker."""
+        self.stages.extend(other.stages)
+
+    def total(self, stage: str) -> int:
+        """Sums the row counts recorded for a stage."""
+        return sum(m.rows or 0 for m in self.stages if m.stage == stage)
+
+    def log_summary(self) -> None:
+        """Logs total time and rows per stage, slowest stage first."""
+        seconds: Dict[str, float] = {}
+        rows: Dict[str, int] = {}
+        for m in self.stages:
+            seconds[m.stage] = seconds.get(m.stage, 0.0) + m.seconds
+            if m.rows is not None:
+                rows[m.stage] = rows.get(m.stage, 0) + m.rows
+        for stage in sorted(seconds, key=seconds.get, reverse=True):
+            row_info = f", {rows[stage]} rows" if stage in rows else ""
+            logger.info(f"Stage {stage}: {seconds[stage]:.3f}s{row_info}")
+
+    def write_json(self, path: str) -> None:
+        """Appends the run to a JSON lines log, one object per run."""
+        record = {
+            "run_id": self.run_id,
+            "started_at": self.started_at.isoformat(),
+            "stages": [asdict(metric) for metric in self.stages],
+        }
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "a") as log_file:
+            log_file.write(json.dumps(record) + "\n")
+        logger.info(f"Appended run {self.run_id} metrics to {path}")
+
+    def write_table(
+        self, conn: DuckDBPyConnection, table_name: str = METRICS_TABLE
+    ) -> None:
+        """Appends the run's stage metrics to a table."""
+        conn.execute(
+            f"""
+            CREATE TABLE IF NOT EXISTS {table_name} (
+                run_id VARCHAR,
+                started_at TIMESTAMP,
+                source VARCHAR,
+                batch INTEGER,
+                stage VARCHAR,
+                seconds DOUBLE,
+                rows BIGINT
+            )
+        """
+        )
+        if not self.stages:
+            return
+        conn.executemany(
+            f"INSERT INTO {table_name} VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [
+                [
+                    self.run_id,
+                    self.started_at,
+                    m.source,
+                    m.batch,
+                    m.stage,
+                    m.seconds,
+                    m.rows,
+                ]
+                for m in self.stages
+            ],
+        )
+        logger.info(f"Wrote run {self.run_id} metrics to {table_name}")
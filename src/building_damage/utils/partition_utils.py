@@ -0,0 +1,269 @@
+"""Utility functions for Hive-partitioned Parquet storage of reports."""
+
+import logging
+import os
+import re
+import shutil
+import uuid
+from datetime import date, datetime
+from pathlib import Path
+from typing import List, Optional
+
+from duckdb import DuckDBPyConnection
+
+logger = logging.getLogger(__name__)
+
+# Partition directories are <root>/event=<event>/ingest_date=<date>
+PARTITION_COLUMNS = ["event", "ingest_date"]
+
+DEFAULT_EVENT = "unassigned"
+
+# Suffix of files written but not yet published, which the report view's
+# glob does not match
+STAGED_SUFFIX = ".part"
+
+_EVENT_PATTERN = re.compile(r"[A-Za-z0-9_.-]+")
+
+
+def check_event_name(event: str) -> str:
+    """Rejects event names that are not safe as directory names."""
+    if not _EVENT_PATTERN.fullmatch(event):
+        raise ValueError(
+            f"Event name {event!r} may only contain letters, digits, "
+            "'_', '-' and '.'"
+        )
+    return event
+
+
+def _partition_files(root: str) -> str:
+    return f"{root}/**/*.parquet"
+
+
+def write_partitions(
+    conn: DuckDBPyConnection,
+    source: str,
+    root: str,
+    event: str,
+    file_prefix: str,
+) -> int:
+    """
+    Appends rows to the partitioned store under one event.
+
+    Rows are split by the date of their time_updated. Each call writes
+    new files named after file_prefix, staged outside the report view
+    until publish_batch_files is called once the batch's transaction has
+    committed, or removed with remove_batch_files if it rolls back.
+
+    Args:
+        conn: DuckDB connection to use
+        source: SQL table expression with a time_updated column
+        root: Root directory of the partitioned store
+        event: Event the rows belong to, e.g. a storm name
+        file_prefix: Prefix unique to this batch's files
+
+    Returns:
+        Number of rows written
+    """
+    return conn.execute(
+        f"""
+        COPY (
+            SELECT
+                *,
+                '{check_event_name(event)}' AS event,
+                time_updated::DATE AS ingest_date
+            FROM {source}
+        ) TO '{root}' (
+            FORMAT PARQUET,
+            COMPRESSION ZSTD,
+            PARTITION_BY ({', '.join(PARTITION_COLUMNS)}),
+            APPEND,
+            FILENAME_PATTERN '{file_prefix}_{{uuid}}',
+            FILE_EXTENSION 'parquet{STAGED_SUFFIX}'
+        )
+    """
+    ).fetchone()[0]
+
+
+def _batch_files(root: str, file_prefix: str) -> List[Path]:
+    return list(Path(root).glob(f"*/*/{file_prefix}_*.parquet{STAGED_SUFFIX}"))
+
+
+def publish_batch_files(root: str, file_prefix: str) -> int:
+    """Makes the files one write_partitions call staged visible."""
+    paths = _batch_files(root, file_prefix)
+    for path in paths:
+        os.replace(path, path.with_suffix(""))
+    return len(paths)
+
+
+def remove_batch_files(root: str, file_prefix: str) -> int:
+    """Deletes the files one write_partitions call staged."""
+    paths = _batch_files(root, file_prefix)
+    for path in paths:
+        path.unlink()
+    return len(paths)
+
+
+def create_partition_view(
+    conn: DuckDBPyConnection, view_name: str, root: str
+) -> bool:
+    """
+    Points a view at every file in the partitioned store.
+
+    Filters on event and ingest_date prune whole directories, so queries
+    on one event or a recent time window only open matching files.
+
+    Args:
+        conn: DuckDB connection to use
+        view_name: Name of the view, usually the report table's name
+        root: Root directory of the partitioned store
+
+    Returns:
+        Whether the view was created; it is not while the store is empty
+    """
+    if next(Path(root).glob("*/*/*.parquet"), None) is None:
+        return False
+    conn.execute(
+        f"""
+        CREATE OR REPLACE VIEW {view_name} AS
+        SELECT * FROM read_parquet(
+            '{_partition_files(root)}',
+            hive_partitioning = true,
+            hive_types = {{'event': VARCHAR, 'ingest_date': DATE}},
+            union_by_name = true
+        )
+    """
+    )
+    return True
+
+
+def time_window_filter(start: datetime, end: Optional[datetime] = None) -> str:
+    """
+    Builds a filter selecting reports updated in a time window.
+
+    The filter repeats the window on ingest_date, which is what lets
+    DuckDB skip partitions outside it.
+
+    Args:
+        start: Start of the window, inclusive
+        end: End of the window, exclusive; open-ended when not given
+
+    Returns:
+        SQL predicate over time_updated and ingest_date
+    """
+    conditions = [
+        f"ingest_date >= DATE '{start.date()}'",
+        f"time_updated >= TIMESTAMP '{start}'",
+    ]
+    if end:
+        conditions += [
+            f"ingest_date <= DATE '{end.date()}'",
+            f"time_updated < TIMESTAMP '{end}'",
+        ]
+    return " AND ".join(conditions)
+
+
+def _partition_dirs(
+    root: str, before: Optional[date] = None, event: Optional[str] = None
+) -> List[Path]:
+    """Partition directories, optionally for one event or older dates."""
+    dirs = []
+    for path in sorted(Path(root).glob("event=*/ingest_date=*")):
+        partition_event = path.parent.name.split("=", 1)[1]
+        partition_date = date.fromisoformat(path.name.split("=", 1)[1])
+        if event and partition_event != event:
+            continue
+        if before and partition_date >= before:
+            continue
+        dirs.append(path)
+    return dirs
+
+
+def compact_partitions(
+    conn: DuckDBPyConnection,
+    root: str,
+    before: Optional[date] = None,
+    event: Optional[str] = None,
+) -> int:
+    """
+    Rewrites each partition's batch files as a single file.
+
+    Every ingested batch adds a file per partition it touches, so closed
+    partitions are worth compacting to keep file counts, and the cost of
+    opening them, low. Only compact partitions no longer being written.
+
+    Args:
+        conn: DuckDB connection to use
+        root: Root directory of the partitioned store
+        before: Only compact partitions dated before this day
+        event: Only compact partitions of this event
+
+    Returns:
+        Number of partitions compacted
+    """
+    compacted = 0
+    for partition in _partition_dirs(root, before, event):
+        files = sorted(partition.glob("*.parquet"))
+        if len(files) < 2:
+            continue
+        temp_path = (
+            partition / f"compacted_{uuid.uuid4().hex}.parquet{STAGED_SUFFIX}"
+        )
+        conn.execute(
+            f"""
+            COPY (
+                SELECT * FROM read_parquet(
+                    [{', '.join(f"'{path}'" for path in files)}],
+                    hive_partitioning = false,
+                    union_by_name = true
+                )
+                ORDER BY time_updated
+            ) TO '{temp_path}' (FORMAT PARQUET, COMPRESSION ZSTD)
+        """
+        )
+        # Move the batch files out of the view before the compacted file
+        # enters it, so readers never see their rows twice
+        retired = [path.with_suffix(".retired") for path in files]
+        for path, retired_path in zip(files, retired):
+            os.replace(path, retired_path)
+        os.replace(temp_path, temp_path.with_suffix(""))
+        for path in retired:
+            path.unlink()
+        compacted += 1
+        logger.info(f"Compacted {len(files)} files in {partition}")
+    return compacted
+
+
+def archive_partitions(
+    root: str,
+    archive_root: str,
+    before: date,
+    event: Optional[str] = None,
+) -> List[Path]:
+    """
+    Moves old partitions out of the store, keeping their layout.
+
+    Archived partitions drop out of the report view but can be read by
+    pointing create_partition_view at the archive.
+
+    Args:
+        root: Root directory of the partitioned store
+        archive_root: Root directory of the archive
+        before: Archive partitions dated before this day
+        event: Only archive partitions of this event
+
+    Returns:
+        Archived partition directories at their new location
+    """
+    archived = []
+    for partition in _partition_dirs(root, before, event):
+        destination = Path(archive_root) / partition.relative_to(root)
+        destination.mkdir(parents=True, exist_ok=True)
+        for path in partition.glob("*.parquet"):
+            shutil.move(str(path), destination / path.name)
+        partition.rmdir()
+        if not any(partition.parent.iterdir()):
+            partition.parent.rmdir()
+        archived.append(destination)
+        logger.info(f"Archived {partition} to {destination}")
+    return archived
@@ -0,0 +1,94 @@
+"""Utility functions for reading report sources in their native formats."""
+
+import logging
+from pathlib import Path
+from typing import Dict, Sequence, Tuple
+
+from duckdb import DuckDBPyConnection
+
+from building_damage.utils.extension_utils import ensure_extension
+
+logger = logging.getLogger(__name__)
+
+# File formats by extension. CSVs are read by the pipeline itself, which
+# sniffs their dialect and types columns in the reader.
+SOURCE_FORMATS: Dict[str, str] = {
+    ".csv": "csv",
+    ".parquet": "parquet",
+    ".ndjson": "ndjson",
+    ".jsonl": "ndjson",
+    ".geojson": "geojson",
+}
+
+
+def source_format(path: str) -> str:
+    """Infer a source format from a file extension."""
+    suffix = Path(path).suffix.lower()
+    if suffix not in SOURCE_FORMATS:
+        raise ValueError(
+            f"Cannot infer source format of {path}; expected one of "
+            f"{', '.join(sorted(SOURCE_FORMATS))}"
+        )
+    return SOURCE_FORMATS[suffix]
+
+
+def read_query(
+    conn: DuckDBPyConnection, paths: Sequence[str], fmt: str
+) -> str:
+    """
+    Build a table expression reading files in a native format.
+
+    Parquet files are scanned directly, so only the columns and row
+    groups a query needs are read. GeoJSON features also get longitude
+    and latitude columns from their geometry (centroids for polygons),
+    unless their properties already carry coordinates.
+
+    Args:
+        conn: DuckDB connection, used to load spatial for GeoJSON
+        paths: Paths to files sharing a format and columns
+        fmt: 'parquet', 'ndjson' or 'geojson'
+
+    Returns:
+        SQL table expression reading the files
+    """
+    files = ", ".join(f"'{path}'" for path in paths)
+    if fmt == "parquet":
+        return f"read_parquet([{files}], union_by_name = true)"
+    if fmt == "ndjson":
+        return (
+            f"read_json([{files}], format = 'newline_delimited', "
+            "union_by_name = true)"
+        )
+    if fmt == "geojson":
+        ensure_extension(conn, "spatial")
+        features = " UNION ALL BY NAME ".join(
+            f"SELECT * FROM ST_Read('{path}')" for path in paths
+        )
+        headers = {
+            name.lower() for name in describe_source(conn, f"({features})")
+        }
+        if {"latitude", "longitude"} <= headers:
+            return f"({features})"
+        return f"""(
+            SELECT
+                *,
+                ST_X(ST_Centroid(geom)) AS longitude,
+                ST_Y(ST_Centroid(geom)) AS latitude
+            FROM ({features})
+        )"""
+    raise ValueError(f"Unsupported source format: {fmt}")
+
+
+def describe_source(conn: DuckDBPyConnection, source: str) -> Tuple[str, ...]:
+    """
+    Column names of a table expression, without reading its rows.
+
+    Args:
+        conn: DuckDB connection
+        source: SQL table expression or registered view name
+
+    Returns:
+        Column names in order
+    """
+    description = conn.execute(f"SELECT * FROM {source} LIMIT 0").description
+    return tuple(column[0] for column in description)
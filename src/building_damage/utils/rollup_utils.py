@@ -0,0 +1,240 @@
+"""Utility functions for maintaining pre-aggregated damage rollups."""
+
+import logging
+from typing import Dict
+
+from duckdb import DuckDBPyConnection
+
+from building_damage.utils.extension_utils import ensure_extension
+from building_damage.utils.extraction_utils import table_exists
+
+logger = logging.getLogger(__name__)
+
+ZIP_ROLLUP_TABLE = "zip_damage_rollup"
+DISTRICT_ROLLUP_TABLE = "district_damage_rollup"
+# Rollup table -> report table it was backfilled from, and so counts
+# in full
+ROLLUP_SOURCES_TABLE = "rollup_sources"
+
+# Rollup column name -> boolean report column it counts
+DAMAGE_CATEGORIES: Dict[str, str] = {
+    "no_electricity": "no_electricity",
+    "basement_flooded": "basement_flooded",
+    "roof_damaged": "roof_damaged",
+    "with_insurance": "insurance",
+}
+
+
+def _count_columns(alias: str) -> str:
+    counts = ["COUNT(*)::BIGINT AS total_reports"]
+    for rollup_column, report_column in DAMAGE_CATEGORIES.items():
+        counts.append(
+            f"COUNT(*) FILTER (WHERE {alias}.{report_column})::BIGINT "
+            f"AS {rollup_column}"
+        )
+    return ",\n            ".join(counts)
+
+
+def _create_rollup_table(
+    conn: DuckDBPyConnection, table_name: str, key: str
+) -> None:
+    columns = ", ".join(
+        f"{column} BIGINT"
+        for column in ["total_reports", *DAMAGE_CATEGORIES.keys()]
+    )
+    conn.execute(
+        f"""
+        CREATE TABLE IF NOT EXISTS {table_name} (
+            {key} VARCHAR PRIMARY KEY,
+            {columns}
+        )
+    """
+    )
+
+
+def _zip_counts(source: str) -> str:
+    return f"""
+        SELECT r.zip_code, {_count_columns("r")}
+        FROM {source} AS r
+        WHERE r.zip_code IS NOT NULL
+        GROUP BY r.zip_code
+    """
+
+
+def district_counts_query(source: str, district_column: str = "BoroCD") -> str:
+    """
+    SQL aggregating reports into per-district damage counts.
+
+    Matches aggregate_by_district.sql: reports take the location of their
+    building footprint, found by BIN.
+
+    Args:
+        source: SQL table expression holding valid reports
+        district_column: Community district identifier column
+
+    Returns:
+        SELECT statement with a district column and one count per category
+    """
+    return f"""
+        SELECT cd.{district_column}::VARCHAR AS district, {_count_columns("r")}
+        FROM {source} AS r
+        JOIN building_footprints AS bf ON r.bin = bf.bin::VARCHAR
+        JOIN community_districts AS cd ON ST_Within(bf.geom, cd.geom)
+        GROUP BY cd.{district_column}
+    """
+
+
+def _add_counts(
+    conn: DuckDBPyConnection, table_name: str, key: str, counts_sql: str
+) -> None:
+    """Adds a batch of counts onto a rollup table, key by key."""
+    updates = ", ".join(
+        f"{column} = {column} + EXCLUDED.{column}"
+        for column in ["total_reports", *DAMAGE_CATEGORIES.keys()]
+    )
+    conn.execute(
+        f"""
+        INSERT INTO {table_name}
+        {counts_sql}
+        ON CONFLICT ({key}) DO UPDATE SET {updates}
+    """
+    )
+
+
+def _record_source(
+    conn: DuckDBPyConnection, rollup_table: str, report_table: str
+) -> None:
+    """Records that a rollup counts every report of a report table."""
+    conn.execute(
+        f"""
+        CREATE TABLE IF NOT EXISTS {ROLLUP_SOURCES_TABLE} (
+            rollup_table VARCHAR PRIMARY KEY,
+            report_table VARCHAR
+        )
+    """
+    )
+    conn.execute(
+        f"INSERT OR REPLACE INTO {ROLLUP_SOURCES_TABLE} VALUES (?, ?)",
+        [rollup_table, report_table],
+    )
+
+
+def rollup_tracks(
+    conn: DuckDBPyConnection, rollup_table: str, report_table: str
+) -> bool:
+    """
+    Whether a rollup is known to count every report of a report table.
+
+    Only rollups built by backfill_rollups are known to be complete; one
+    created by a pipeline's first batch may be missing earlier reports.
+
+    Args:
+        conn: DuckDB connection to use
+        rollup_table: ZIP_ROLLUP_TABLE or DISTRICT_ROLLUP_TABLE
+        report_table: Table of valid damage reports
+
+    Returns:
+        True if the rollup can stand in for aggregating report_table
+    """
+    if not table_exists(conn, rollup_table) or not table_exists(
+        conn, ROLLUP_SOURCES_TABLE
+    ):
+        return False
+    row = conn.execute(
+        f"""
+        SELECT report_table FROM {ROLLUP_SOURCES_TABLE}
+        WHERE rollup_table = ?
+    """,
+        [rollup_table],
+    ).fetchone()
+    return row is not None and row[0] == report_table
+
+
+def update_rollups(
+    conn: DuckDBPyConnection,
+    source: str,
+    districts: bool = False,
+    district_column: str = "BoroCD",
+) -> None:
+    """
+    Adds the counts of a batch of new reports to the rollup tables.
+
+    Only the batch is aggregated, so the cost of keeping rollups current
+    depends on the batch size rather than on the size of the report table.
+
+    Args:
+        conn: DuckDB connection to use
+        source: SQL table expression holding only the new valid reports
+        districts: Whether to update the per-district rollup, which needs
+            the spatial extension and the base layers
+        district_column: Community district identifier column
+    """
+    _create_rollup_table(conn, ZIP_ROLLUP_TABLE, "zip_code")
+    _add_counts(conn, ZIP_ROLLUP_TABLE, "zip_code", _zip_counts(source))
+
+    if districts:
+        ensure_extension(conn, "spatial")
+        _create_rollup_table(conn, DISTRICT_ROLLUP_TABLE, "district")
+        _add_counts(
+            conn,
+            DISTRICT_ROLLUP_TABLE,
+            "district",
+            district_counts_query(source, district_column),
+        )
+
+
+def backfill_rollups(
+    conn: DuckDBPyConnection,
+    report_table: str,
+    district_column: str = "BoroCD",
+) -> None:
+    """
+    Builds each rollup from existing reports the first time it's used.
+
+    Reports ingested before a rollup was maintained would otherwise be
+    missing from it, since the pipeline only adds each new batch. The
+    per-district rollup is checked on its own, as it only starts being
+    maintained once the base layers have been downloaded.
+
+    Args:
+        conn: DuckDB connection to use
+        report_table: Table of valid damage reports
+        district_column: Community district identifier column
+    """
+    if not table_exists(conn, report_table):
+        return
+    if not table_exists(conn, ZIP_ROLLUP_TABLE):
+        conn.begin()
+        try:
+            _create_rollup_table(conn, ZIP_ROLLUP_TABLE, "zip_code")
+            _add_counts(
+                conn, ZIP_ROLLUP_TABLE, "zip_code", _zip_counts(report_table)
+            )
+            _record_source(conn, ZIP_ROLLUP_TABLE, report_table)
+        except Exception:
+            conn.rollback()
+            raise
+        conn.commit()
+        logger.info(f"Backfilled {ZIP_ROLLUP_TABLE} from {report_table}")
+
+    districts = all(
+        table_exists(conn, table)
+        for table in ["building_footprints", "community_districts"]
+    )
+    if districts and not table_exists(conn, DISTRICT_ROLLUP_TABLE):
+        ensure_extension(conn, "spatial")
+        conn.begin()
+        try:
+            _create_rollup_table(conn, DISTRICT_ROLLUP_TABLE, "district")
+            _add_counts(
+                conn,
+                DISTRICT_ROLLUP_TABLE,
+                "district",
+                district_counts_query(report_table, district_column),
+            )
+            _record_source(conn, DISTRICT_ROLLUP_TABLE, report_table)
+        except Exception:
+            conn.rollback()
+            raise
+        conn.commit()
+        logger.info(f"Backfilled {DISTRICT_ROLLUP_TABLE} from {report_table}")
@@ -0,0 +1,155 @@
+"""Utility functions for mapping source columns onto table columns."""
+
+import logging
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Column:
+    """A table column and the source headers that feed it.
+
+    Attributes:
+        name: Column name in the staging and output tables
+        type: DuckDB type the source values are cast to
+        aliases: Other source header names for this column, compared
+            after sanitizing, e.g. ("zip",) for zip_code
+    """
+
+    name: str
+    type: str
+    aliases: Tuple[str, ...] = ()
+
+
+# Either a list of columns or a "Name TYPE, ..." schema string
+Schema = Union[str, Sequence[Column]]
+
+
+def sanitize_name(name: str) -> str:
+    """Lowercase a header and replace spaces with underscores."""
+    return name.strip().lower().replace(" ", "_")
+
+
+def _split_schema(schema: str) -> List[str]:
+    """Split a schema string on commas outside parentheses."""
+    parts, depth, current = [], 0, ""
+    for char in schema:
+        depth += {"(": 1, ")": -1}.get(char, 0)
+        if char == "," and depth == 0:
+            parts.append(current)
+            current = ""
+        else:
+            current += char
+    parts.append(current)
+    return [part.strip() for part in parts if part.strip()]
+
+
+def parse_schema(schema: Schema) -> List[Column]:
+    """
+    Normalizes a schema to a list of columns with sanitized names.
+
+    Schema strings like "ZIP_Code VARCHAR, ..." are still accepted, so a
+    header spelled as in the string maps onto its sanitized column.
+
+    Args:
+        schema: List of columns or "Name TYPE, ..." schema string
+
+    Returns:
+        List of columns
+    """
+    if not isinstance(schema, str):
+        return list(schema)
+
+    columns = []
+    for definition in _split_schema(schema):
+        name, type_ = definition.split(None, 1)
+        name = name.strip('"')
+        aliases = (name,) if sanitize_name(name) != name else ()
+        columns.append(Column(sanitize_name(name), type_.strip(), aliases))
+    return columns
+
+
+def table_schema(columns: Sequence[Column]) -> str:
+    """Render columns as a CREATE TABLE column list."""
+    return ", ".join(f"{column.name} {column.type}" for column in columns)
+
+
+def match_columns(
+    columns: Sequence[Column], headers: Sequence[str]
+) -> Dict[str, Optional[str]]:
+    """
+    Finds the source header feeding each column.
+
+    Headers match a column by sanitized name or by one of its aliases.
+    A source matching none of the columns is almost certainly the wrong
+    file, or was read with the wrong dialect, and is rejected.
+
+    Args:
+        columns: Columns to fill
+        headers: Header names of the source, in order
+
+    Returns:
+        Mapping of column name to source header, or None when the source
+        lacks the column
+
+    Raises:
+        ValueError: If no header matches any column
+    """
+    by_name = {sanitize_name(header): header for header in headers}
+    mapping = {}
+    for column in columns:
+        names = [column.name, *map(sanitize_name, column.aliases)]
+        mapping[column.name] = next(
+            (by_name[name] for name in names if name in by_name), None
+        )
+
+    missing = [name for name, header in mapping.items() if header is None]
+    if len(missing) == len(columns):
+        raise ValueError(
+            f"No source column matches the schema; headers: {list(headers)}"
+        )
+    if missing:
+        logger.warning(f"Source has no column for {', '.join(missing)}")
+    return mapping
+
+
+def projection_query(
+    source: str,
+    columns: Sequence[Column],
+    mapping: Dict[str, Optional[str]],
+    normalizations: Optional[Dict[str, str]] = None,
+) -> str:
+    """
+    Builds a query that renames, casts and normalizes a source's columns.
+
+    Unmapped source columns are dropped and missing columns are NULL, so
+    the result always has exactly the given columns in order. DuckDB
+    folds the projection into the scan, so no intermediate table is
+    written.
+
+    Args:
+        source: SQL table expression to read from, e.g. read_csv(...)
+        columns: Columns to produce
+        mapping: Source header per column, as from match_columns
+        normalizations: Optional SQL expressions replacing a column,
+            written in terms of the column's own name
+
+    Returns:
+        SQL query over the source
+    """
+    projections = []
+    for column in columns:
+        header = mapping.get(column.name)
+        value = f'"{header}"' if header else "NULL"
+        projections.append(f"{value}::{column.type} AS {column.name}")
+    query = f"SELECT {', '.join(projections)} FROM {source}"
+
+    if normalizations:
+        replacements = ", ".join(
+            f"{expression} AS {name}"
+            for name, expression in normalizations.items()
+        )
+        query = f"SELECT * REPLACE ({replacements}) FROM ({query})"
+    return query
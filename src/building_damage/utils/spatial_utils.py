@@ -0,0 +1,128 @@
+"""Utility functions for spatial enrichment of staged damage reports."""
+
+import logging
+from typing import Tuple
+
+from duckdb import DuckDBPyConnection
+
+from building_damage.utils.extension_utils import ensure_extension
+
+logger = logging.getLogger(__name__)
+
+# Roughly 50 meters at NYC latitudes, in EPSG:4326 degrees
+DEFAULT_NEAREST_DISTANCE = 0.0005
+
+
+def match_points_to_footprints(
+    conn: DuckDBPyConnection,
+    table_name: str,
+    footprints_table: str = "building_footprints",
+    max_distance: float = DEFAULT_NEAREST_DISTANCE,
+) -> str:
+    """
+    Match every located row of a table to a building footprint BIN.
+
+    Rows are matched in bulk: a point-in-polygon join first, then, for
+    points that fall in no footprint, the nearest footprint within
+    max_distance. Both are single set-based joins, which DuckDB runs as
+    spatial joins rather than per-row lookups. Results are written to a
+    temporary table of (row_id, footprint_bin) named after table_name,
+    so pipelines staging into their own tables on a shared connection
+    never overwrite each other's matches. The caller drops it.
+
+    Args:
+        conn: DuckDB connection; spatial is loaded on first use
+        table_name: Table with latitude and longitude columns
+        footprints_table: Table of footprints with bin and geom columns
+        max_distance: Search radius in degrees for the nearest fallback
+
+    Returns:
+        Name of the temporary table of matches
+    """
+    ensure_extension(conn, "spatial")
+    points = f"{table_name}_footprint_points"
+    matches = f"{table_name}_footprint_matches"
+    conn.execute(
+        f"""
+        CREATE OR REPLACE TEMPORARY TABLE {points} AS
+        SELECT rowid AS row_id, ST_Point(longitude, latitude) AS geom
+        FROM {table_name}
+        WHERE latitude IS NOT NULL AND longitude IS NOT NULL;
+
+        CREATE OR REPLACE TEMPORARY TABLE {matches} AS
+        SELECT p.row_id, bf.bin::VARCHAR AS footprint_bin
+        FROM {points} AS p
+        JOIN {footprints_table} AS bf
+            ON ST_Intersects(bf.geom, p.geom)
+        QUALIFY ROW_NUMBER() OVER (
+            PARTITION BY p.row_id ORDER BY ST_Area(bf.geom)
+        ) = 1;
+
+        INSERT INTO {matches}
+        SELECT p.row_id, bf.bin::VARCHAR
+        FROM {points} AS p
+        ANTI JOIN {matches} AS m ON p.row_id = m.row_id
+        JOIN {footprints_table} AS bf
+            ON ST_DWithin(bf.geom, p.geom, {max_distance})
+        QUALIFY ROW_NUMBER() OVER (
+            PARTITION BY p.row_id ORDER BY ST_Distance(bf.geom, p.geom)
+        ) = 1;
+
+        DROP TABLE {points};
+    """
+    )
+    return matches
+
+
+def assign_bins_from_footprints(
+    conn: DuckDBPyConnection,
+    table_name: str,
+    bin_rule: str,
+    footprints_table: str = "building_footprints",
+    max_distance: float = DEFAULT_NEAREST_DISTANCE,
+) -> Tuple[int, int]:
+    """
+    Fill in missing or malformed BINs from the footprint under each report.
+
+    Rows whose BIN already satisfies bin_rule are left alone, but are
+    counted as mismatches when the footprint match disagrees with them.
+
+    Args:
+        conn: DuckDB connection; spatial is loaded on first use
+        table_name: Table with bin, latitude and longitude columns
+        bin_rule: SQL expression that is true for a well-formed BIN
+        footprints_table: Table of footprints with bin and geom columns
+        max_distance: Search radius in degrees for the nearest fallback
+
+    Returns:
+        Tuple of (filled_count, mismatch_count)
+    """
+    matches = match_points_to_footprints(
+        conn, table_name, footprints_table, max_distance
+    )
+    try:
+        filled_count = conn.execute(
+            f"""
+            UPDATE {table_name} SET bin = m.footprint_bin
+            FROM {matches} AS m
+            WHERE {table_name}.rowid = m.row_id
+                AND NOT COALESCE({bin_rule}, FALSE)
+        """
+        ).fetchone()[0]
+
+        mismatch_count = conn.execute(
+            f"""
+            SELECT COUNT(*)
+            FROM {table_name} AS t
+            JOIN {matches} AS m ON t.rowid = m.row_id
+            WHERE t.bin IS DISTINCT FROM m.footprint_bin
+        """
+        ).fetchone()[0]
+    finally:
+        conn.execute(f"DROP TABLE IF EXISTS {matches}")
+
+    logger.info(
+        f"Assigned {filled_count} BINs from {footprints_table}; "
+        f"{mismatch_count} reported BINs disagree with the footprint"
+    )
+    return filled_count, mismatch_count
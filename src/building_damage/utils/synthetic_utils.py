@@ -0,0 +1,187 @@
+"""Utility functions for generating synthetic damage reports and footprints.
+
+Values are derived from hashes of the row number and a seed rather than
+from a random generator, so a given seed always produces the same rows
+no matter how many threads DuckDB uses to generate them.
+"""
+
+import logging
+
+from duckdb import DuckDBPyConnection
+
+logger = logging.getLogger(__name__)
+
+# Borough code, city, ZIP codes and a rough latitude/longitude box. Boxes
+# are kept inside the pipeline's NYC bounds, and Manhattan's inside the
+# location_mismatch rule's box for 100xx ZIP codes.
+BOROUGHS = """
+    (1, 'NEW YORK', ['10001', '10002', '10003', '10009', '10011', '10016',
+        '10025', '10027', '10031', '10128'], 40.70, 40.87, -74.01, -73.93),
+    (2, 'BRONX', ['10451', '10452', '10453', '10456', '10458', '10460',
+        '10462', '10467', '10469', '10472'], 40.81, 40.90, -73.93, -73.79),
+    (3, 'BROOKLYN', ['11201', '11203', '11206', '11207', '11211', '11215',
+        '11220', '11223', '11226', '11235'], 40.58, 40.73, -74.03, -73.86),
+    (4, 'QUEENS', ['11101', '11354', '11355', '11368', '11372', '11373',
+        '11375', '11385', '11432', '11691'], 40.55, 40.80, -73.96, -73.70),
+    (5, 'STATEN ISLAND', ['10301', '10304', '10305', '10306', '10309',
+        '10312', '10314'], 40.50, 40.64, -74.25, -74.05)
+"""
+
+STREETS = (
+    "['BROADWAY', 'MAIN ST', 'PARK AVE', 'OCEAN AVE', 'JAMAICA AVE', "
+    "'GRAND CONCOURSE', 'HYLAN BLVD', 'FLATBUSH AVE', 'QUEENS BLVD', "
+    "'AMSTERDAM AVE', 'ATLANTIC AVE', 'VICTORY BLVD']"
+)
+
+# Half-width of a synthetic footprint square, in degrees
+FOOTPRINT_HALF_WIDTH = 0.0001
+
+
+def _unit(key: str, *args: str) -> str:
+    """SQL for a deterministic pseudo-random DOUBLE in [0, 1)."""
+    return f"((hash({', '.join(args)}, '{key}') % 1000000) / 1000000.0)"
+
+
+def _yes_no(key: str, args: str, probability: float) -> str:
+    """SQL for 'Yes' with the given probability, otherwise 'No'."""
+    return f"CASE WHEN {_unit(key, args)} < {probability} THEN 'Yes' ELSE 'No' END"
+
+
+def _buildings_query(buildings: int, seed: int) -> str:
+    """SQL for one row per synthetic building: BIN, location and ZIP."""
+    return f"""
+        SELECT
+            k,
+            (b.code * 1000000 + k)::VARCHAR AS bin,
+            b.city,
+            b.zips[(1 + hash(k, {seed}, 'zip') % len(b.zips))::BIGINT] AS zip_code,
+            b.lat_min + (b.lat_max - b.lat_min) * {_unit("lat", "k", str(seed))}
+                AS latitude,
+            b.lon_min + (b.lon_max - b.lon_min) * {_unit("lon", "k", str(seed))}
+                AS longitude
+        FROM range({buildings}) AS t(k)
+        JOIN (VALUES {BOROUGHS})
+            AS b(code, city, zips, lat_min, lat_max, lon_min, lon_max)
+            ON b.code = 1 + hash(k, {seed}, 'borough') % 5
+    """
+
+
+def synthetic_reports_query(
+    rows: int,
+    invalid_ratio: float = 0.02,
+    seed: int = 0,
+    buildings: int = 0,
+) -> str:
+    """
+    SQL generating damage reports shaped like the source CSV.
+
+    Each report belongs to one synthetic building, taking its BIN, ZIP
+    code and location (jittered by a few meters). A share of rows given
+    by invalid_ratio is corrupted in one of four ways that the pipeline
+    rejects: a placeholder BIN, a missing ZIP code, an out-of-range
+    latitude or an empty address.
+
+    Args:
+        rows: Number of reports
+        invalid_ratio: Share of reports to corrupt, between 0 and 1
+        seed: Seed for the generated values
+        buildings: Number of distinct buildings; defaults to one per
+            ten reports
+
+    Returns:
+        SELECT statement with the CSV's columns
+    """
+    buildings = buildings or max(rows // 10, 1)
+    i = f"i, {seed}"
+    return f"""
+        WITH buildings AS ({_buildings_query(buildings, seed)}),
+        reports AS (
+            SELECT
+                r.i,
+                bd.*,
+                {_unit("invalid", i)} < {invalid_ratio} AS corrupt,
+                hash(r.i, {seed}, 'kind') % 4 AS kind
+            FROM range({rows}) AS r(i)
+            JOIN buildings AS bd ON bd.k = hash(r.i, {seed}, 'k') % {buildings}
+        )
+        SELECT
+            CASE WHEN corrupt AND kind = 3 THEN ''
+                ELSE (1 + hash({i}, 'number') % 2000)::VARCHAR || ' '
+                    || {STREETS}[(1 + hash({i}, 'street') % 12)::BIGINT]
+            END AS Address,
+            city AS City,
+            CASE WHEN corrupt AND kind = 1 THEN NULL ELSE zip_code END
+                AS ZIP_Code,
+            {_yes_no("electricity", i, 0.4)} AS No_Electricity,
+            {_yes_no("basement", i, 0.3)} AS Basement_Flooded,
+            {_yes_no("roof", i, 0.2)} AS Roof_Damaged,
+            {_yes_no("insurance", i, 0.6)} AS Insurance,
+            CASE WHEN corrupt AND kind = 0 THEN '0.0' ELSE bin END AS BIN,
+            CASE WHEN corrupt AND kind = 2 THEN 0.0
+                ELSE latitude + ({_unit("dlat", i)} - 0.5) * 0.00005
+            END AS Latitude,
+            longitude + ({_unit("dlon", i)} - 0.5) * 0.00005 AS Longitude
+        FROM reports
+    """
+
+
+def write_synthetic_reports(
+    conn: DuckDBPyConnection,
+    path: str,
+    rows: int,
+    invalid_ratio: float = 0.02,
+    seed: int = 0,
+    buildings: int = 0,
+) -> None:
+    """
+    Writes synthetic damage reports to a CSV with the source header.
+
+    Rows are streamed from DuckDB to the file, so tens of millions of
+    reports can be generated without holding them in memory.
+
+    Args:
+        conn: DuckDB connection to use
+        path: Output CSV path
+        rows: Number of reports
+        invalid_ratio: Share of reports to corrupt, between 0 and 1
+        seed: Seed for the generated values
+        buildings: Number of distinct buildings; defaults to one per
+            ten reports
+    """
+    query = synthetic_reports_query(rows, invalid_ratio, seed, buildings)
+    conn.execute(f"COPY ({query}) TO '{path}' (HEADER, DELIMITER ',')")
+    logger.info(f"Wrote {rows} synthetic reports to {path}")
+
+
+def create_synthetic_footprints(
+    conn: DuckDBPyConnection,
+    buildings: int,
+    seed: int = 0,
+    table_name: str = "building_footprints",
+) -> None:
+    """
+    Creates square footprints for the buildings synthetic reports use.
+
+    Given the same seed and building count as write_synthetic_reports,
+    every valid report falls inside its building's footprint.
+
+    Args:
+        conn: DuckDB connection with the spatial extension loaded
+        buildings: Number of buildings
+        seed: Seed for the generated values
+        table_name: Name of the table to create
+    """
+    d = FOOTPRINT_HALF_WIDTH
+    conn.execute(
+        f"""
+        CREATE OR REPLACE TABLE {table_name} AS
+        SELECT
+            bin,
+            ST_MakeEnvelope(
+                longitude - {d}, latitude - {d},
+                longitude + {d}, latitude + {d}
+            ) AS geom
+        FROM ({_buildings_query(buildings, seed)})
+    """
+    )
+    logger.info(f"Created {buildings} synthetic footprints in {table_name}")
@@ -5,7 +5,8 @@ CREATE TEMPORARY TABLE damage_locations AS
 SELECT 
     sd.*,
     bf.geom
-FROM storm_damage AS sd
+-- Reports ingested with --grid-index carry their own geom point
+FROM (SELECT COLUMNS(c -> c <> 'geom') FROM storm_damage) AS sd
 JOIN building_footprints AS bf 
     ON sd.bin = bf.bin::VARCHAR;
 
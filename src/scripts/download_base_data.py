@@ -6,13 +6,23 @@ into a DuckDB database with spatial support.
 
 import logging
 from pathlib import Path
-from typing import Optional
+from typing import Dict, List, Optional
 
 import click
 import duckdb as db
 
-from building_damage.utils.extraction_utils import (download_geojson_to_table,
-                                                    ensure_spatial_extension)
+from building_damage.ConnectionPool import ConnectionPool
+from building_damage.utils.extraction_utils import (
+    ARCGIS_PAGING,
+    SOCRATA_PAGING,
+    download_paged_geojson_to_table,
+    fetch_source_version,
+    get_source_version,
+    load_snapshot,
+    refresh_paged_geojson_table,
+    table_exists,
+    write_snapshot,
+)
 
 # Configure logging
 logging.basicConfig(
@@ -30,57 +40,251 @@ COMMUNITY_DISTRICTS_URL = (
     "NYC_Community_Districts/FeatureServer/0/query"
 )
 
+# ArcGIS services cap each response at their max record count, commonly
+# 1000 or 2000, so district pages stay below that
+ARCGIS_PAGE_SIZE = 1000
+
+DISTRICTS_PARAMS = {
+    "where": "1=1",
+    "outFields": "*",
+    "f": "geojson",
+    "returnGeometry": "true",
+}
+
+BASE_LAYERS = ["building_footprints", "community_districts"]
+
+# Building footprints fields used for incremental refreshes
+FOOTPRINTS_KEY_COLUMN = "doitt_id"
+FOOTPRINTS_MODIFIED_FIELD = "last_edited_date"
+
+
+def _layer_dir(checkpoint_dir: Optional[str], layer: str) -> Optional[str]:
+    """Checkpoint subdirectory for one layer, if checkpointing is on."""
+    return str(Path(checkpoint_dir) / layer) if checkpoint_dir else None
+
+
+def source_versions(
+    footprints_url: Optional[str] = None,
+    districts_url: Optional[str] = None,
+    workers: int = 4,
+) -> Dict[str, Optional[str]]:
+    """Current source version of each base layer.
+
+    Footprints are versioned by their latest edit date; districts have
+    no such field, so their few dozen features are hashed.
+    """
+    return {
+        "building_footprints": fetch_source_version(
+            footprints_url or BUILDING_FOOTPRINTS_URL,
+            SOCRATA_PAGING,
+            modified_field=FOOTPRINTS_MODIFIED_FIELD,
+        ),
+        "community_districts": fetch_source_version(
+            districts_url or COMMUNITY_DISTRICTS_URL,
+            ARCGIS_PAGING,
+            params=DISTRICTS_PARAMS,
+            page_size=ARCGIS_PAGE_SIZE,
+            max_workers=workers,
+        ),
+    }
+
+
+def load_cached_layers(
+    conn: db.DuckDBPyConnection,
+    cache_dir: str,
+    versions: Optional[Dict[str, Optional[str]]] = None,
+    as_view: bool = False,
+) -> List[str]:
+    """Load any missing base layers from valid snapshots in cache_dir.
+
+    Args:
+        conn: DuckDB connection to use
+        cache_dir: Directory holding snapshots
+        versions: Required source version of each layer; snapshots of
+            other versions are skipped. Without it, any snapshot passing
+            its checksum is loaded.
+        as_view: Whether to query snapshots in place
+
+    Returns:
+        Names of the layers loaded from the cache
+    """
+    versions = versions or {}
+    return [
+        layer
+        for layer in BASE_LAYERS
+        if not table_exists(conn, layer)
+        and load_snapshot(
+            conn,
+            layer,
+            cache_dir,
+            versions.get(layer),
+            as_view=as_view,
+            create_spatial_index=True,
+        )
+    ]
+
+
+def write_cached_layers(
+    conn: db.DuckDBPyConnection, cache_dir: str, layers: List[str]
+) -> None:
+    """Snapshot base layers to cache_dir, tagged with their versions."""
+    for layer in layers:
+        write_snapshot(conn, layer, cache_dir, get_source_version(conn, layer))
+
 
 def download_base_data(
     db_path: str,
     max_records: int,
     footprints_url: Optional[str] = None,
     districts_url: Optional[str] = None,
+    page_size: int = 50_000,
+    workers: int = 4,
+    checkpoint_dir: Optional[str] = None,
+    cache_dir: Optional[str] = None,
+    snapshot_view: bool = False,
 ) -> None:
     """
     Download and load building footprints and community districts data.
 
+    Both layers are fetched in pages, concurrently, with completed pages
+    checkpointed so that a failed download resumes where it stopped.
+    With a cache directory, layers are bootstrapped from GeoParquet
+    snapshots of the source's current version when available, and
+    snapshotted after downloading.
+
     Args:
         db_path: Path to DuckDB database
         max_records: Maximum number of records to download
         footprints_url: Optional custom URL for building footprints
         districts_url: Optional custom URL for community districts
+        page_size: Number of footprint records per page
+        workers: Maximum number of concurrent page downloads
+        checkpoint_dir: Optional directory to keep completed pages in
+            between runs; one subdirectory is used per layer
+        cache_dir: Optional directory of GeoParquet snapshots
+        snapshot_view: Query cached snapshots in place through views
+            instead of importing them
     """
-    conn = db.connect(db_path)
-    ensure_spatial_extension(conn)
+    with ConnectionPool(
+        db_path, extensions=["spatial"]
+    ) as pool, pool.session() as conn:
+        cached_layers = []
+        if cache_dir:
+            cached_layers = load_cached_layers(
+                conn,
+                cache_dir,
+                source_versions(footprints_url, districts_url, workers),
+                snapshot_view,
+            )
 
-    try:
         # Load building footprints
         logger.info("Starting building footprints download")
-        download_geojson_to_table(
+        download_paged_geojson_to_table(
             conn,
             "building_footprints",
             footprints_url or BUILDING_FOOTPRINTS_URL,
+            SOCRATA_PAGING,
             create_spatial_index=True,
-            params={"$limit": max_records},
+            checkpoint_dir=_layer_dir(checkpoint_dir, "building_footprints"),
+            modified_field=FOOTPRINTS_MODIFIED_FIELD,
+            page_size=page_size,
+            max_records=max_records,
+            max_workers=workers,
         )
         logger.info("Completed building footprints download")
 
         # Load community districts
         logger.info("Starting community districts download")
-        download_geojson_to_table(
+        download_paged_geojson_to_table(
             conn,
             "community_districts",
             districts_url or COMMUNITY_DISTRICTS_URL,
-            params={
-                "where": "1=1",
-                "outFields": "*",
-                "f": "geojson",
-                "returnGeometry": "true",
-            },
+            ARCGIS_PAGING,
+            params=DISTRICTS_PARAMS,
             create_spatial_index=True,
+            checkpoint_dir=_layer_dir(checkpoint_dir, "community_districts"),
+            page_size=ARCGIS_PAGE_SIZE,
+            max_workers=workers,
         )
         logger.info("Completed community districts download")
 
+        if cache_dir:
+            downloaded = [
+                layer for layer in BASE_LAYERS if layer not in cached_layers
+            ]
+            write_cached_layers(conn, cache_dir, downloaded)
+
         logger.info("Base data download process completed successfully")
 
-    finally:
-        conn.close()
+
+def refresh_base_data(
+    db_path: str,
+    footprints_url: Optional[str] = None,
+    districts_url: Optional[str] = None,
+    page_size: int = 50_000,
+    workers: int = 4,
+    key_column: str = FOOTPRINTS_KEY_COLUMN,
+    modified_field: str = FOOTPRINTS_MODIFIED_FIELD,
+    cache_dir: Optional[str] = None,
+) -> None:
+    """
+    Refresh previously downloaded base data in place.
+
+    Building footprints modified since the last sync are merged in by
+    key, keeping the spatial index current, and footprints no longer
+    listed at the source (demolished buildings) are deleted. Community districts have no
+    modified-date field, so they are re-downloaded (a few dozen
+    features) and replaced only when their content hash changed.
+
+    Args:
+        db_path: Path to DuckDB database
+        footprints_url: Optional custom URL for building footprints
+        districts_url: Optional custom URL for community districts
+        page_size: Number of footprint records per page
+        workers: Maximum number of concurrent page downloads
+        key_column: Column that uniquely identifies a footprint
+        modified_field: Footprint field holding the last modified date
+        cache_dir: Optional directory of GeoParquet snapshots to bootstrap
+            missing layers from and to update after the refresh
+    """
+    with ConnectionPool(
+        db_path, extensions=["spatial"]
+    ) as pool, pool.session() as conn:
+        if cache_dir:
+            # Any intact snapshot will do: the refresh below brings an
+            # outdated one up to date
+            load_cached_layers(conn, cache_dir)
+
+        logger.info("Starting building footprints refresh")
+        refresh_paged_geojson_table(
+            conn,
+            "building_footprints",
+            footprints_url or BUILDING_FOOTPRINTS_URL,
+            SOCRATA_PAGING,
+            key_column=key_column,
+            modified_field=modified_field,
+            create_spatial_index=True,
+            remove_deleted=True,
+            page_size=page_size,
+            max_workers=workers,
+        )
+
+        logger.info("Starting community districts refresh")
+        refresh_paged_geojson_table(
+            conn,
+            "community_districts",
+            districts_url or COMMUNITY_DISTRICTS_URL,
+            ARCGIS_PAGING,
+            params=DISTRICTS_PARAMS,
+            create_spatial_index=True,
+            page_size=ARCGIS_PAGE_SIZE,
+            max_workers=workers,
+        )
+
+        if cache_dir:
+            write_cached_layers(conn, cache_dir, BASE_LAYERS)
+
+        logger.info("Base data refresh completed successfully")
 
 
 @click.command()
@@ -106,22 +310,97 @@ def download_base_data(
     type=str,
     help="Custom URL for community districts data (optional)",
 )
+@click.option(
+    "--page-size",
+    type=click.IntRange(min=1),
+    default=50_000,
+    show_default=True,
+    help="Number of building footprint records per page request",
+)
+@click.option(
+    "--workers",
+    type=click.IntRange(min=1),
+    default=4,
+    show_default=True,
+    help="Maximum number of concurrent page downloads",
+)
+@click.option(
+    "--checkpoint-dir",
+    type=click.Path(file_okay=False),
+    help="Directory to keep downloaded pages in so a failed run can resume",
+)
+@click.option(
+    "--refresh",
+    is_flag=True,
+    help="Update existing tables with only the features changed since the "
+    "last sync instead of skipping them",
+)
+@click.option(
+    "--key-column",
+    type=str,
+    default=FOOTPRINTS_KEY_COLUMN,
+    show_default=True,
+    help="Building footprint ID column used to merge refreshed features",
+)
+@click.option(
+    "--modified-field",
+    type=str,
+    default=FOOTPRINTS_MODIFIED_FIELD,
+    show_default=True,
+    help="Building footprint field holding each feature's last edit date",
+)
+@click.option(
+    "--cache-dir",
+    type=click.Path(file_okay=False),
+    help="Directory of GeoParquet snapshots to bootstrap from and update",
+)
+@click.option(
+    "--snapshot-view",
+    is_flag=True,
+    help="Query cached snapshots in place through views instead of importing",
+)
 def main(
     db_path: str,
     max_records: int,
     footprints_url: Optional[str],
     districts_url: Optional[str],
+    page_size: int,
+    workers: int,
+    checkpoint_dir: Optional[str],
+    refresh: bool,
+    key_column: str,
+    modified_field: str,
+    cache_dir: Optional[str],
+    snapshot_view: bool,
 ) -> None:
     """Download building footprints and community districts data into DuckDB."""
     try:
         # Create parent directories if they don't exist
         Path(db_path).parent.mkdir(parents=True, exist_ok=True)
 
+        if refresh:
+            refresh_base_data(
+                db_path=db_path,
+                footprints_url=footprints_url,
+                districts_url=districts_url,
+                page_size=page_size,
+                workers=workers,
+                key_column=key_column,
+                modified_field=modified_field,
+                cache_dir=cache_dir,
+            )
+            return
+
         download_base_data(
             db_path=db_path,
             max_records=max_records,
             footprints_url=footprints_url,
             districts_url=districts_url,
+            page_size=page_size,
+            workers=workers,
+            checkpoint_dir=checkpoint_dir,
+            cache_dir=cache_dir,
+            snapshot_view=snapshot_view,
         )
     except Exception as e:
         logger.error(f"Data download failed: {str(e)}")
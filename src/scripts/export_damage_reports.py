@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Script to export processed damage reports and district counts from the
+DuckDB database to GeoJSON, GeoParquet or FlatGeobuf.
+"""
+
+import logging
+import sys
+from typing import Optional
+
+import click
+
+from building_damage.ConnectionPool import ConnectionPool
+from building_damage.utils.export_utils import (
+    EXPORT_FORMATS,
+    export_district_counts,
+    export_reports,
+    format_for_path,
+)
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(levelname)s - %(message)s",
+)
+logger = logging.getLogger(__name__)
+
+REPORT_TABLE = "storm_damage"
+
+
+def export_damage_data(
+    db_path: str,
+    output: str,
+    layer: str = "reports",
+    export_format: Optional[str] = None,
+    with_districts: bool = False,
+    watermark_name: Optional[str] = None,
+    memory_limit: Optional[str] = None,
+) -> None:
+    """
+    Export a layer of processed damage data to a file.
+
+    Args:
+        db_path: Path to DuckDB database file
+        output: Output file path
+        layer: 'reports' for individual reports, 'districts' for
+            per-district counts
+        export_format: One of EXPORT_FORMATS; inferred from the output
+            extension when not given
+        with_districts: Tag each report with its community district
+        watermark_name: Export only reports updated since the last export
+            under this name, then advance its watermark
+        memory_limit: Optional DuckDB memory ceiling, e.g. '2GB'
+    """
+    export_format = export_format or format_for_path(output)
+
+    config = {
+        # Lets COPY stream rows to the writer instead of buffering them
+        "preserve_insertion_order": False,
+        **({"memory_limit": memory_limit} if memory_limit else {}),
+    }
+    with ConnectionPool(
+        db_path, extensions=["spatial"], config=config
+    ) as pool, pool.session() as conn:
+        if layer == "districts":
+            export_district_counts(conn, output, export_format, REPORT_TABLE)
+        else:
+            export_reports(
+                conn,
+                output,
+                export_format,
+                REPORT_TABLE,
+                with_districts,
+                watermark_name,
+            )
+
+
+@click.command()
+@click.option(
+    "--db-path",
+    type=click.Path(exists=True),
+    required=True,
+    help="Path to DuckDB database file",
+)
+@click.option(
+    "--output",
+    type=click.Path(dir_okay=False),
+    required=True,
+    help="Output file, e.g. data/processed/damage_reports.geojson",
+)
+@click.option(
+    "--layer",
+    type=click.Choice(["reports", "districts"]),
+    default="reports",
+    show_default=True,
+    help="Export individual reports or per-district counts",
+)
+@click.option(
+    "--format",
+    "export_format",
+    type=click.Choice(sorted(EXPORT_FORMATS)),
+    help="Output format (default: inferred from the output extension)",
+)
+@click.option(
+    "--with-districts",
+    is_flag=True,
+    help="Tag each report with the community district containing it",
+)
+@click.option(
+    "--since-watermark",
+    "watermark_name",
+    type=str,
+    help=(
+        "Export only reports updated since the last export under this "
+        "name, then advance its watermark"
+    ),
+)
+@click.option(
+    "--memory-limit",
+    type=str,
+    help="DuckDB memory ceiling, e.g. '2GB' (optional)",
+)
+def main(
+    db_path: str,
+    output: str,
+    layer: str,
+    export_format: Optional[str],
+    with_districts: bool,
+    watermark_name: Optional[str],
+    memory_limit: Optional[str],
+):
+    """Export processed damage data for mapping."""
+    if layer == "districts" and (watermark_name or with_districts):
+        raise click.UsageError(
+            "--since-watermark and --with-districts apply to --layer reports"
+        )
+
+    try:
+        export_damage_data(
+            db_path,
+            output,
+            layer,
+            export_format,
+            with_districts,
+            watermark_name,
+            memory_limit,
+        )
+    except Exception as e:
+        logger.error(f"Failed to export damage data: {str(e)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
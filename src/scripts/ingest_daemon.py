@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Long-running daemon that watches an inbox directory and ingests damage
+report CSVs in micro-batches, keeping one warm database connection.
+"""
+
+import logging
+import signal
+import sys
+from typing import Optional, Tuple
+
+import click
+
+from building_damage.ConnectionPool import ConnectionPool
+from building_damage.DamageReportPipeline import (
+    DAMAGE_REPORT_COLUMNS,
+    INVALID_TABLE,
+    TARGET_TABLE,
+)
+from building_damage.IngestDaemon import IngestDaemon
+from building_damage.utils.partition_utils import DEFAULT_EVENT
+from building_damage.utils.rollup_utils import backfill_rollups
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+
+@click.command()
+@click.option(
+    "--db-path",
+    type=click.Path(exists=True),
+    required=True,
+    help="Path to DuckDB database file",
+)
+@click.option(
+    "--inbox",
+    type=click.Path(exists=True, file_okay=False),
+    required=True,
+    help="Directory to watch for new CSV files",
+)
+@click.option(
+    "--max-batch-files",
+    type=click.IntRange(min=1),
+    default=100,
+    show_default=True,
+    help="Maximum number of files ingested together",
+)
+@click.option(
+    "--max-batch-mb",
+    type=click.IntRange(min=1),
+    default=256,
+    show_default=True,
+    help="Batch size in MB at which a batch is ingested without waiting",
+)
+@click.option(
+    "--max-wait",
+    type=click.FloatRange(min=0),
+    default=1.0,
+    show_default=True,
+    help="Seconds to wait for more files after the first of a batch",
+)
+@click.option(
+    "--poll-interval",
+    type=click.FloatRange(min=0.05),
+    default=0.5,
+    show_default=True,
+    help="Seconds between inbox scans",
+)
+@click.option(
+    "--max-queued-files",
+    type=click.IntRange(min=1),
+    default=1000,
+    show_default=True,
+    help="Files that may wait for ingestion before new ones are left alone",
+)
+@click.option(
+    "--memory-limit",
+    type=str,
+    help="DuckDB memory ceiling, e.g. '2GB' (optional)",
+)
+@click.option(
+    "--assign-bins",
+    is_flag=True,
+    help="Fill in missing or malformed BINs from building_footprints",
+)
+@click.option(
+    "--merge-key",
+    multiple=True,
+    help="Key column to upsert the latest report per key into "
+    "storm_damage_current; repeat for composite keys",
+)
+@click.option(
+    "--maintain-rollups",
+    is_flag=True,
+    help="Keep per-ZIP and per-district damage counts current as reports load",
+)
+@click.option(
+    "--grid-index",
+    is_flag=True,
+    help="Store each report's map grid cell, clustered for map queries",
+)
+@click.option(
+    "--dedup",
+    is_flag=True,
+    help="Drop reports duplicating an earlier report of the same building",
+)
+@click.option(
+    "--partition-dir",
+    type=click.Path(file_okay=False),
+    help=(
+        "Store valid reports as Parquet partitioned by event and ingest "
+        "date under this directory; storm_damage becomes a view over it"
+    ),
+)
+@click.option(
+    "--event",
+    type=str,
+    default=DEFAULT_EVENT,
+    show_default=True,
+    help="Event the reports belong to, e.g. a storm name (with --partition-dir)",
+)
+def main(
+    db_path: str,
+    inbox: str,
+    max_batch_files: int,
+    max_batch_mb: int,
+    max_wait: float,
+    poll_interval: float,
+    max_queued_files: int,
+    memory_limit: Optional[str],
+    assign_bins: bool,
+    merge_key: Tuple[str, ...],
+    maintain_rollups: bool,
+    grid_index: bool,
+    dedup: bool,
+    partition_dir: Optional[str],
+    event: str,
+):
+    """Ingest damage report CSVs as they land in an inbox directory."""
+    config = {"memory_limit": memory_limit} if memory_limit else None
+    try:
+        with ConnectionPool(
+            db_path,
+            extensions=["spatial"] if assign_bins else [],
+            config=config,
+        ) as pool:
+            if maintain_rollups:
+                with pool.session() as conn:
+                    backfill_rollups(conn, TARGET_TABLE)
+
+            daemon = IngestDaemon(
+                pool,
+                inbox,
+                DAMAGE_REPORT_COLUMNS,
+                TARGET_TABLE,
+                INVALID_TABLE,
+                {
+                    "assign_bins": assign_bins,
+                    "merge_key": merge_key,
+                    "maintain_rollups": maintain_rollups,
+                    "grid_index": grid_index,
+                    "dedup": dedup,
+                    "partition_dir": partition_dir,
+                    "event": event,
+                },
+                max_batch_files=max_batch_files,
+                max_batch_bytes=max_batch_mb << 20,
+                max_wait=max_wait,
+                poll_interval=poll_interval,
+                max_queued_files=max_queued_files,
+            )
+            for signum in [signal.SIGINT, signal.SIGTERM]:
+                signal.signal(signum, lambda *_: daemon.stop())
+            daemon.run()
+    except Exception as e:
+        logger.error(f"Ingest daemon failed: {str(e)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
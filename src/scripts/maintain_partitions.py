@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Script to compact and archive partitions of the Parquet report store
+written by update_damage_reports.py --partition-dir.
+"""
+
+import logging
+import sys
+from datetime import date, datetime
+from typing import Optional
+
+import click
+import duckdb as db
+
+from building_damage.utils.partition_utils import (
+    archive_partitions,
+    compact_partitions,
+)
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(levelname)s - %(message)s",
+)
+logger = logging.getLogger(__name__)
+
+
+def maintain_partitions(
+    partition_dir: str,
+    compact_before: date,
+    archive_dir: Optional[str] = None,
+    archive_before: Optional[date] = None,
+    event: Optional[str] = None,
+) -> None:
+    """
+    Compact closed partitions, then archive old ones.
+
+    Args:
+        partition_dir: Root directory of the partitioned store
+        compact_before: Compact partitions dated before this day
+        archive_dir: Optional root directory to archive partitions to
+        archive_before: Archive partitions dated before this day
+        event: Only touch partitions of this event
+    """
+    conn = db.connect()
+    try:
+        compacted = compact_partitions(
+            conn, partition_dir, compact_before, event
+        )
+        logger.info(f"Compacted {compacted} partitions")
+    finally:
+        conn.close()
+
+    if archive_dir and archive_before:
+        archived = archive_partitions(
+            partition_dir, archive_dir, archive_before, event
+        )
+        logger.info(f"Archived {len(archived)} partitions to {archive_dir}")
+
+
+@click.command()
+@click.option(
+    "--partition-dir",
+    type=click.Path(exists=True, file_okay=False),
+    required=True,
+    help="Root directory of the partitioned report store",
+)
+@click.option(
+    "--compact-before",
+    type=click.DateTime(formats=["%Y-%m-%d"]),
+    help="Compact partitions dated before this day (default: today)",
+)
+@click.option(
+    "--archive-dir",
+    type=click.Path(file_okay=False),
+    help="Move old partitions to this directory",
+)
+@click.option(
+    "--archive-before",
+    type=click.DateTime(formats=["%Y-%m-%d"]),
+    help="Archive partitions dated before this day (with --archive-dir)",
+)
+@click.option(
+    "--event",
+    type=str,
+    help="Only compact or archive partitions of this event",
+)
+def main(
+    partition_dir: str,
+    compact_before: Optional[datetime],
+    archive_dir: Optional[str],
+    archive_before: Optional[datetime],
+    event: Optional[str],
+):
+    """Compact and archive partitions of the report store."""
+    if bool(archive_dir) != bool(archive_before):
+        raise click.UsageError(
+            "--archive-dir and --archive-before must be passed together"
+        )
+
+    try:
+        maintain_partitions(
+            partition_dir,
+            compact_before.date() if compact_before else date.today(),
+            archive_dir,
+            archive_before.date() if archive_before else None,
+            event,
+        )
+    except Exception as e:
+        logger.error(f"Partition maintenance failed: {str(e)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -11,54 +11,61 @@ from pathlib import Path
 import click
 import duckdb as db
 
+from building_damage.DamageReportPipeline import DAMAGE_REPORT_COLUMNS
+from building_damage.utils.schema_utils import table_schema
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
 )
 logger = logging.getLogger(__name__)
 
-# Database schema
-TABLE_SCHEMA = (
-    "address VARCHAR,"
-    "city VARCHAR,"
-    "zip VARCHAR,"
-    "no_electricity BOOLEAN,"
-    "basement_flooded BOOLEAN,"
-    "roof_damaged BOOLEAN,"
-    "insurance BOOLEAN,"
-    "bin VARCHAR,"
-    "latitude DOUBLE,"
-    "longitude DOUBLE,"
-    "time_updated TIMESTAMP"
-)
+# Database schema: the report columns plus the pipeline's update time
+TABLE_SCHEMA = table_schema(DAMAGE_REPORT_COLUMNS) + ", time_updated TIMESTAMP"
 
 
-def set_up_database(db_path: str, schema: str) -> None:
+def set_up_database(
+    db_path: str, schema: str, partitioned: bool = False
+) -> None:
     """
     Set up database tables for damage reports.
 
     Args:
         db_path: Path to DuckDB database file
         schema: Database schema definition
+        partitioned: Leave out storm_damage, which the pipeline creates as
+            a view over its partitioned Parquet store
     """
     try:
         # Connect to database (create if doesn't exist)
         conn = db.connect(db_path)
         logger.info(f"Connected to database: {db_path}")
 
-        # Drop existing tables if they exist
+        # Drop existing tables if they exist; storm_damage is a view over
+        # the Parquet store in partitioned databases
         tables_to_drop = ["storm_damage", "storm_damage_invalid"]
         for table in tables_to_drop:
-            conn.execute(f"DROP TABLE IF EXISTS {table}")
+            existing = conn.execute(
+                "SELECT table_type FROM information_schema.tables "
+                "WHERE table_name = ?",
+                [table],
+            ).fetchone()
+            if existing:
+                kind = "VIEW" if existing[0] == "VIEW" else "TABLE"
+                conn.execute(f"DROP {kind} {table}")
 
         # Create main table for valid records
-        conn.execute(f"CREATE TABLE storm_damage ({schema})")
-        logger.info("Created storm_damage table")
+        if not partitioned:
+            conn.execute(f"CREATE TABLE storm_damage ({schema})")
+            logger.info("Created storm_damage table")
 
-        # Create table for invalid records with additional error column
+        # Create table for invalid records with the rules each one failed
         conn.execute(
             f"""
-            CREATE TABLE storm_damage_invalid ({schema})
+            CREATE TABLE storm_damage_invalid (
+                {schema},
+                failed_rules VARCHAR[]
+            )
         """
         )
         logger.info("Created storm_damage_invalid table")
@@ -78,12 +85,20 @@ def set_up_database(db_path: str, schema: str) -> None:
     required=True,
     help="Path to DuckDB database file (will be created if it does not exist)",
 )
-def main(db_path: str):
+@click.option(
+    "--partitioned",
+    is_flag=True,
+    help=(
+        "Store valid reports as partitioned Parquet (update_damage_reports.py "
+        "--partition-dir) instead of a storm_damage table"
+    ),
+)
+def main(db_path: str, partitioned: bool):
     """Set up DuckDB database tables for building damage reports."""
     try:
         # Create parent directories if they don't exist
         Path(db_path).parent.mkdir(parents=True, exist_ok=True)
-        set_up_database(db_path, TABLE_SCHEMA)
+        set_up_database(db_path, TABLE_SCHEMA, partitioned)
         logger.info("Database setup completed successfully")
     except Exception as e:
         logger.error(f"Database setup failed: {str(e)}")
@@ -4,14 +4,42 @@ Script to process and update building damage reports from CSV files into a DuckD
 Assumes database tables are already set up with correct schema.
 """
 
+import glob
 import logging
+import os
 import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from functools import partial
 from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
 import click
 import duckdb as db
 
-from building_damage.DamageReportPipeline import DamageReportPipeline
+from building_damage.BasePipeline import DEFAULT_BATCH_SIZE
+from building_damage.ConnectionPool import ConnectionPool
+from building_damage.DamageReportPipeline import (
+    DAMAGE_REPORT_COLUMNS,
+    INVALID_TABLE,
+    TARGET_TABLE,
+    DamageReportPipeline,
+)
+from building_damage.utils.metrics_utils import RunMetrics
+from building_damage.utils.manifest_utils import (
+    ensure_manifest_table,
+    plan_ingest,
+    progress_recorder,
+    record_ingest,
+)
+from building_damage.utils.partition_utils import DEFAULT_EVENT
+from building_damage.utils.reader_utils import (
+    SOURCE_FORMATS,
+    source_format,
+)
+from building_damage.utils.rollup_utils import backfill_rollups
+from building_damage.utils.schema_utils import Schema
 
 # Configure logging
 logging.basicConfig(
@@ -19,24 +47,132 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Database schema for reference
-# To-do: Create separate step to sanitize column names in CSV
-# rather than reproducing idiosyncratic names here
-CSV_SCHEMA = (
-    "Address VARCHAR,"
-    "City VARCHAR,"
-    "ZIP_Code VARCHAR,"
-    "No_Electricity BOOLEAN,"
-    "Basement_Flooded BOOLEAN,"
-    "Roof_Damaged BOOLEAN,"
-    "Insurance BOOLEAN,"
-    "BIN VARCHAR,"
-    "Latitude DOUBLE,"
-    "Longitude DOUBLE"
-)
+
+def resolve_csv_paths(csv_glob: str) -> List[str]:
+    """
+    Resolve a directory or glob pattern to a sorted list of report files.
+
+    Args:
+        csv_glob: Directory containing CSV, Parquet, NDJSON or GeoJSON
+            reports, or a glob pattern
+
+    Returns:
+        Sorted list of matching file paths
+    """
+    if Path(csv_glob).is_dir():
+        paths = [
+            str(path)
+            for path in Path(csv_glob).iterdir()
+            if path.suffix.lower() in SOURCE_FORMATS
+        ]
+    else:
+        paths = glob.glob(csv_glob, recursive=True)
+
+    if not paths:
+        raise FileNotFoundError(f"No report files match: {csv_glob}")
+    return sorted(paths)
 
 
-def process_damage_reports(db_path: str, csv_path: str, schema: str) -> None:
+def _ingest_file(
+    pipeline: DamageReportPipeline,
+    csv_path: str,
+    batch_size: Optional[int],
+    incremental: bool = False,
+) -> Tuple[int, int]:
+    """
+    Run one file through the pipeline, in batches if requested.
+
+    With incremental set, the ingest manifest decides whether the file is
+    skipped, read from the end of the previously ingested bytes, or read
+    in full, and the manifest is updated in the same transaction as each
+    committed batch, so an interrupted run resumes after the last one.
+    Parquet, NDJSON and GeoJSON files are read whole in their own format,
+    so they are either skipped when unchanged or ingested in full.
+    """
+    is_csv = source_format(csv_path) == "csv"
+    plan = (
+        plan_ingest(
+            pipeline.conn, csv_path, pipeline.write_lock, appendable=is_csv
+        )
+        if incremental
+        else None
+    )
+    if plan and plan.skip:
+        logger.info(f"{csv_path} unchanged since last ingest, skipping")
+        return 0, 0
+
+    if not is_csv:
+        counts = pipeline.process_file(
+            csv_path,
+            TARGET_TABLE,
+            INVALID_TABLE,
+            on_commit=plan
+            and partial(record_ingest, pipeline.conn, plan.state),
+        )
+    elif batch_size or plan:
+        # Planned files are read in chunks up to the planned size, so the
+        # manifest matches the bytes ingested even if the file grows
+        if plan and plan.start_offset:
+            logger.info(f"{csv_path} was appended to, ingesting new rows")
+        counts = pipeline.process_csv_chunked(
+            csv_path,
+            TARGET_TABLE,
+            INVALID_TABLE,
+            batch_size=batch_size or DEFAULT_BATCH_SIZE,
+            start_offset=plan.start_offset if plan else 0,
+            end_offset=plan.state.size if plan else None,
+            on_commit=plan and progress_recorder(pipeline.conn, plan),
+        )
+    else:
+        counts = pipeline.process_csv(csv_path, TARGET_TABLE, INVALID_TABLE)
+    pipeline.log_rule_stats()
+    return counts
+
+
+def publish_metrics(
+    conn: db.DuckDBPyConnection,
+    metrics: RunMetrics,
+    metrics_log: Optional[str] = None,
+    metrics_table: bool = False,
+) -> None:
+    """Logs a run's stage summary and writes it to a log or table."""
+    metrics.log_summary()
+    if metrics_log:
+        metrics.write_json(metrics_log)
+    if metrics_table:
+        metrics.write_table(conn)
+
+
+@contextmanager
+def open_pool(
+    db_path: str,
+    memory_limit: Optional[str] = None,
+    pool: Optional[ConnectionPool] = None,
+) -> Iterator[ConnectionPool]:
+    """Use the caller's connection pool, or open one for this run."""
+    if pool is not None:
+        if memory_limit:
+            pool.conn.execute(f"SET memory_limit = '{memory_limit}'")
+        yield pool
+        return
+
+    config = {"memory_limit": memory_limit} if memory_limit else None
+    with ConnectionPool(db_path, config=config) as owned_pool:
+        yield owned_pool
+
+
+def process_damage_reports(
+    db_path: str,
+    csv_path: str,
+    schema: Schema,
+    batch_size: Optional[int] = None,
+    memory_limit: Optional[str] = None,
+    incremental: bool = False,
+    pipeline_options: Optional[Dict[str, Any]] = None,
+    metrics_log: Optional[str] = None,
+    metrics_table: bool = False,
+    pool: Optional[ConnectionPool] = None,
+) -> None:
     """
     Process damage reports from CSV and update database.
     Assumes required tables already exist.
@@ -44,40 +180,165 @@ def process_damage_reports(db_path: str, csv_path: str, schema: str) -> None:
     Args:
         db_path: Path to DuckDB database file
         csv_path: Path to input CSV file
-        schema: Database schema definition
+        schema: Staging columns, usually DAMAGE_REPORT_COLUMNS
+        batch_size: Optional number of records per batch; when set, the CSV
+            is streamed through the pipeline in batches of this size
+        memory_limit: Optional DuckDB memory ceiling, e.g. '2GB'
+        incremental: Skip the file if the manifest shows it was already
+            ingested, or ingest only rows appended since the last run
+        pipeline_options: Optional keyword arguments for
+            DamageReportPipeline, e.g. merge_key or maintain_rollups
+        metrics_log: Optional JSON lines file to append stage metrics to
+        metrics_table: Whether to append stage metrics to pipeline_metrics
+        pool: Optional open connection pool on db_path to reuse, e.g. in
+            a long-lived worker; by default one is opened for the run
     """
     try:
         # Validate paths
         if not Path(csv_path).exists():
             raise FileNotFoundError(f"CSV file not found: {csv_path}")
 
-        # Connect to database
-        conn = db.connect(db_path)
-        logger.info(f"Connected to database: {db_path}")
-
-        # Initialize and run pipeline
-        pipeline = DamageReportPipeline(conn, schema)
-        pipeline.process_csv(csv_path, "storm_damage", "storm_damage_invalid")
+        with open_pool(
+            db_path, memory_limit, pool
+        ) as pool, pool.session() as conn:
+            if incremental:
+                ensure_manifest_table(conn)
+            if (pipeline_options or {}).get("maintain_rollups"):
+                backfill_rollups(conn, TARGET_TABLE)
 
-        # Log summary statistics
-        valid_count = conn.execute(
-            "SELECT COUNT(*) FROM storm_damage"
-        ).fetchone()[0]
-        invalid_count = conn.execute(
-            "SELECT COUNT(*) FROM storm_damage_invalid"
-        ).fetchone()[0]
+            # Initialize and run pipeline
+            pipeline = DamageReportPipeline(
+                conn,
+                schema,
+                write_lock=pool.write_lock,
+                **(pipeline_options or {}),
+            )
+            valid_count, invalid_count = _ingest_file(
+                pipeline, csv_path, batch_size, incremental
+            )
 
-        logger.info(
-            f"Processing complete. Valid records: {valid_count}, "
-            f"Invalid records: {invalid_count}"
-        )
+            # Counts come from the batches themselves, not table scans
+            logger.info(
+                f"Processing complete. Valid records: {valid_count}, "
+                f"Invalid records: {invalid_count}"
+            )
+            publish_metrics(conn, pipeline.metrics, metrics_log, metrics_table)
 
     except Exception as e:
         logger.error(f"Failed to process damage reports: {str(e)}")
         raise
-    finally:
-        if "conn" in locals():
-            conn.close()
+
+
+def _ingest_file_in_worker(
+    pool: ConnectionPool,
+    csv_path: str,
+    schema: Schema,
+    batch_size: Optional[int],
+    incremental: bool,
+    pipeline_options: Dict[str, Any],
+) -> Tuple[int, int, float, RunMetrics]:
+    """Parse and validate one CSV in its own session, sharing the writer."""
+    start = time.perf_counter()
+    with pool.session() as cursor:
+        pipeline = DamageReportPipeline(
+            cursor, schema, write_lock=pool.write_lock, **pipeline_options
+        )
+        valid_count, invalid_count = _ingest_file(
+            pipeline, csv_path, batch_size, incremental
+        )
+    seconds = time.perf_counter() - start
+    return valid_count, invalid_count, seconds, pipeline.metrics
+
+
+def process_damage_report_files(
+    db_path: str,
+    csv_paths: List[str],
+    schema: Schema,
+    workers: int,
+    batch_size: Optional[int] = None,
+    memory_limit: Optional[str] = None,
+    incremental: bool = False,
+    pipeline_options: Optional[Dict[str, Any]] = None,
+    metrics_log: Optional[str] = None,
+    metrics_table: bool = False,
+    pool: Optional[ConnectionPool] = None,
+) -> None:
+    """
+    Process many damage report CSVs in parallel and update database.
+    Assumes required tables already exist.
+
+    Files are parsed and validated concurrently, each in its own session
+    of a connection pool; inserts into the output tables are serialized
+    through the pool's write lock.
+
+    Args:
+        db_path: Path to DuckDB database file
+        csv_paths: Paths to input CSV files
+        schema: Staging columns, usually DAMAGE_REPORT_COLUMNS
+        workers: Number of files to process concurrently
+        batch_size: Optional number of records per batch within each file
+        memory_limit: Optional DuckDB memory ceiling, e.g. '2GB'
+        incremental: Skip files the manifest shows were already ingested,
+            and ingest only rows appended to the others
+        pipeline_options: Optional keyword arguments for
+            DamageReportPipeline, e.g. merge_key or maintain_rollups
+        metrics_log: Optional JSON lines file to append stage metrics to
+        metrics_table: Whether to append stage metrics to pipeline_metrics
+        pool: Optional open connection pool on db_path to reuse, e.g. in
+            a long-lived worker; by default one is opened for the run
+    """
+    with open_pool(
+        db_path, memory_limit, pool
+    ) as pool, pool.session() as conn:
+        if incremental:
+            ensure_manifest_table(conn)
+        if (pipeline_options or {}).get("maintain_rollups"):
+            backfill_rollups(conn, TARGET_TABLE)
+
+        valid_total, invalid_total, failed = 0, 0, []
+        metrics = RunMetrics()
+        start = time.perf_counter()
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(
+                    _ingest_file_in_worker,
+                    pool,
+                    csv_path,
+                    schema,
+                    batch_size,
+                    incremental,
+                    pipeline_options or {},
+                ): csv_path
+                for csv_path in csv_paths
+            }
+            for future in as_completed(futures):
+                csv_path = futures[future]
+                try:
+                    valid_count, invalid_count, seconds, file_metrics = (
+                        future.result()
+                    )
+                except Exception as e:
+                    logger.error(f"Failed to process {csv_path}: {str(e)}")
+                    failed.append(csv_path)
+                    continue
+
+                valid_total += valid_count
+                invalid_total += invalid_count
+                metrics.extend(file_metrics)
+                logger.info(
+                    f"{csv_path}: {valid_count} valid, "
+                    f"{invalid_count} invalid records in {seconds:.2f}s"
+                )
+
+        logger.info(
+            f"Processed {len(csv_paths) - len(failed)} of {len(csv_paths)} "
+            f"files in {time.perf_counter() - start:.2f}s. "
+            f"Valid records: {valid_total}, Invalid records: {invalid_total}"
+        )
+        publish_metrics(conn, metrics, metrics_log, metrics_table)
+        if failed:
+            raise RuntimeError(f"{len(failed)} file(s) failed: {failed}")
 
 
 @click.command()
@@ -90,13 +351,160 @@ def process_damage_reports(db_path: str, csv_path: str, schema: str) -> None:
 @click.option(
     "--csv-path",
     type=click.Path(exists=True),
-    required=True,
-    help="Path to input CSV file",
+    help="Path to input CSV (or Parquet, NDJSON, GeoJSON) file",
+)
+@click.option(
+    "--csv-glob",
+    type=str,
+    help="Directory or glob pattern of report files to process in parallel",
+)
+@click.option(
+    "--workers",
+    type=click.IntRange(min=1),
+    default=os.cpu_count(),
+    show_default=True,
+    help="Number of files to process concurrently with --csv-glob",
+)
+@click.option(
+    "--batch-size",
+    type=click.IntRange(min=1),
+    help="Stream the CSV in batches of this many records (optional)",
+)
+@click.option(
+    "--memory-limit",
+    type=str,
+    help="DuckDB memory ceiling, e.g. '2GB' (optional)",
+)
+@click.option(
+    "--incremental",
+    is_flag=True,
+    help="Skip already-ingested files and ingest only appended rows",
+)
+@click.option(
+    "--assign-bins",
+    is_flag=True,
+    help="Fill in missing or malformed BINs from building_footprints",
+)
+@click.option(
+    "--merge-key",
+    multiple=True,
+    help=(
+        "Key column to upsert the latest report per key into "
+        "storm_damage_current; repeat for composite keys (e.g. --merge-key bin)"
+    ),
 )
-def main(db_path: str, csv_path: str):
+@click.option(
+    "--maintain-rollups",
+    is_flag=True,
+    help="Keep per-ZIP and per-district damage counts current as reports load",
+)
+@click.option(
+    "--grid-index",
+    is_flag=True,
+    help="Store each report's map grid cell, clustered for map queries",
+)
+@click.option(
+    "--dedup",
+    is_flag=True,
+    help="Drop reports duplicating an earlier report of the same building",
+)
+@click.option(
+    "--profile-rules",
+    is_flag=True,
+    help="Time each validation rule on its own and log the slowest",
+)
+@click.option(
+    "--metrics-log",
+    type=click.Path(dir_okay=False),
+    help="Append per-stage timings and row counts to this JSON lines file",
+)
+@click.option(
+    "--metrics-table",
+    is_flag=True,
+    help="Append per-stage timings and row counts to pipeline_metrics",
+)
+@click.option(
+    "--profile-dir",
+    type=click.Path(file_okay=False),
+    help="Write a DuckDB JSON query profile of every stage to this directory",
+)
+@click.option(
+    "--partition-dir",
+    type=click.Path(file_okay=False),
+    help=(
+        "Store valid reports as Parquet partitioned by event and ingest "
+        "date under this directory; storm_damage becomes a view over it"
+    ),
+)
+@click.option(
+    "--event",
+    type=str,
+    default=DEFAULT_EVENT,
+    show_default=True,
+    help="Event the reports belong to, e.g. a storm name (with --partition-dir)",
+)
+def main(
+    db_path: str,
+    csv_path: Optional[str],
+    csv_glob: Optional[str],
+    workers: int,
+    batch_size: Optional[int],
+    memory_limit: Optional[str],
+    incremental: bool,
+    assign_bins: bool,
+    merge_key: Tuple[str, ...],
+    maintain_rollups: bool,
+    grid_index: bool,
+    dedup: bool,
+    profile_rules: bool,
+    metrics_log: Optional[str],
+    metrics_table: bool,
+    profile_dir: Optional[str],
+    partition_dir: Optional[str],
+    event: str,
+):
     """Process building damage reports from CSV into DuckDB database."""
+    if bool(csv_path) == bool(csv_glob):
+        raise click.UsageError("Pass exactly one of --csv-path or --csv-glob")
+
+    pipeline_options = {
+        "assign_bins": assign_bins,
+        "merge_key": merge_key,
+        "maintain_rollups": maintain_rollups,
+        "grid_index": grid_index,
+        "dedup": dedup,
+        "profile_rules": profile_rules,
+        "profile_dir": profile_dir,
+        "partition_dir": partition_dir,
+        "event": event,
+    }
+
     try:
-        process_damage_reports(db_path, csv_path, CSV_SCHEMA)
+        if csv_glob:
+            process_damage_report_files(
+                db_path,
+                resolve_csv_paths(csv_glob),
+                DAMAGE_REPORT_COLUMNS,
+                workers,
+                batch_size,
+                memory_limit,
+                incremental,
+                pipeline_options,
+                metrics_log,
+                metrics_table,
+            )
+        else:
+            process_damage_reports(
+                db_path,
+                csv_path,
+                DAMAGE_REPORT_COLUMNS,
+                batch_size,
+                memory_limit,
+                incremental,
+                pipeline_options,
+                metrics_log,
+                metrics_table,
+            )
     except Exception as e:
         logger.error(f"Script failed: {str(e)}")
         sys.exit(1)
@@ -0,0 +1,52 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from building_damage.ConnectionPool import ConnectionPool
+from building_damage.DamageReportPipeline import DamageReportPipeline
+from test_pipeline import CSV_PATH, CSV_SCHEMA
+
+
+def ingest(pool):
+    with pool.session() as cursor:
+        pipeline = DamageReportPipeline(
+            cursor, CSV_SCHEMA, write_lock=pool.write_lock
+        )
+        return pipeline.process_csv(
+            str(CSV_PATH), "storm_damage", "storm_damage_invalid"
+        )
+
+
+def test_sessions_run_pipelines_concurrently(tmp_path):
+    with ConnectionPool(
+        str(tmp_path / "pool.db"), max_sessions=2
+    ) as pool, ThreadPoolExecutor(max_workers=4) as executor:
+        results = list(executor.map(ingest, [pool] * 4))
+
+        with pool.session() as cursor:
+            valid = cursor.execute(
+                "SELECT COUNT(*) FROM storm_damage"
+            ).fetchone()[0]
+            staging = cursor.execute(
+                "SELECT COUNT(*) FROM duckdb_tables() "
+                "WHERE table_name LIKE 'staging_%'"
+            ).fetchone()[0]
+    assert valid == sum(result[0] for result in results)
+    assert staging == 0
+
+
+def test_pipelines_sharing_a_connection_use_separate_staging(tmp_path):
+    with ConnectionPool(":memory:") as pool, pool.session() as cursor:
+        first = DamageReportPipeline(cursor, CSV_SCHEMA)
+        second = DamageReportPipeline(cursor, CSV_SCHEMA)
+
+        # Stage a batch in the first pipeline, then run the second one
+        # to completion on the same connection before validating it
+        first._load_staging(f"read_csv('{CSV_PATH}')")
+        second.process_csv(str(CSV_PATH), "storm_damage", "invalid")
+
+        assert first.staging_table != second.staging_table
+        assert (
+            cursor.execute(
+                f"SELECT COUNT(*) FROM {first.staging_table}"
+            ).fetchone()[0]
+            == 625
+        )
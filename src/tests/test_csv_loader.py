@@ -1,33 +1,29 @@
 import duckdb as db
 
 from building_damage.DamageReportPipeline import DamageReportPipeline
-
-conn = db.connect("data/db/building_damage.db")
-path = "data/raw/storm_damage_BIN.csv"
-
-CSV_SCHEMA = (
-    "Address VARCHAR,"
-    "City VARCHAR,"
-    "ZIP_Code VARCHAR,"
-    "No_Electricity BOOLEAN,"
-    "Basement_Flooded BOOLEAN,"
-    "Roof_Damaged BOOLEAN,"
-    "Insurance BOOLEAN,"
-    "BIN VARCHAR,"
-    "Latitude DOUBLE,"
-    "Longitude DOUBLE"
-)
+from test_pipeline import CSV_PATH, CSV_SCHEMA
 
 TABLE_SCHEMA = CSV_SCHEMA + ", time_updated TIMESTAMP"
 
-pipeline = DamageReportPipeline(conn, CSV_SCHEMA)
 
-conn.execute("DROP TABLE test_storm_damage")
-conn.execute("DROP TABLE test_storm_damage_invalid")
-conn.execute("DROP TABLE staging_data")
+def test_process_csv_into_existing_tables(tmp_path):
+    conn = db.connect(str(tmp_path / "building_damage.db"))
+
+    # Create target tables following schema, as set_up_database.py does
+    conn.execute(f"CREATE TABLE test_storm_damage ({TABLE_SCHEMA})")
+    conn.execute(f"CREATE TABLE test_storm_damage_invalid ({TABLE_SCHEMA})")
 
-# Create target table following schema
-conn.execute(f"CREATE TABLE test_storm_damage ({TABLE_SCHEMA})")
-conn.execute(f"CREATE TABLE test_storm_damage_invalid ({TABLE_SCHEMA})")
+    pipeline = DamageReportPipeline(conn, CSV_SCHEMA)
+    valid, invalid = pipeline.process_csv(
+        str(CSV_PATH), "test_storm_damage", "test_storm_damage_invalid"
+    )
 
-pipeline.process_csv(path, "test_storm_damage", "test_storm_damage_invalid")
+    assert valid + invalid == 625
+    assert (
+        conn.execute(
+            "SELECT COUNT(*) FROM test_storm_damage_invalid "
+            "WHERE failed_rules IS NOT NULL"
+        ).fetchone()[0]
+        == invalid
+    )
+    conn.close()
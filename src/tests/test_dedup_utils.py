@@ -0,0 +1,101 @@
+import duckdb as db
+import pytest
+
+from building_damage.DamageReportPipeline import (
+    DAMAGE_REPORT_COLUMNS,
+    DamageReportPipeline,
+)
+from building_damage.utils.dedup_utils import (
+    dedup_reports,
+    house_number_expression,
+    normalized_address_expression,
+)
+from test_pipeline import CSV_PATH
+
+
+@pytest.fixture
+def conn():
+    conn = db.connect()
+    yield conn
+    conn.close()
+
+
+def test_dedup_reports_collapses_near_duplicates(conn):
+    conn.execute(
+        """
+        CREATE TABLE reports AS
+        SELECT * FROM (VALUES
+            ('12 West 3rd Street', '1000001', 40.70000, -73.99000),
+            ('12 W 3RD ST.', NULL, 40.70005, -73.99005),
+            ('12 W 3rd St', '1000001', 40.80000, -73.99000),
+            ('14 W 3rd St', '1000002', 40.70010, -73.99000),
+            ('900 Broadway', '1000003', 40.70000, -73.99000)
+        ) AS t(address, bin, latitude, longitude)
+    """
+    )
+
+    assert dedup_reports(conn, "reports") == 1
+    remaining = [
+        row[0]
+        for row in conn.execute("SELECT address FROM reports").fetchall()
+    ]
+    # Same address but far away, and nearby but a different address and
+    # BIN, are kept
+    assert remaining == [
+        "12 West 3rd Street",
+        "12 W 3rd St",
+        "14 W 3rd St",
+        "900 Broadway",
+    ]
+
+
+def test_pipeline_dedup_drops_reports_already_stored(conn):
+    pipeline = DamageReportPipeline(conn, DAMAGE_REPORT_COLUMNS, dedup=True)
+
+    first, _ = pipeline.process_csv(
+        str(CSV_PATH), "storm_damage", "storm_damage_invalid"
+    )
+    second, _ = pipeline.process_csv(
+        str(CSV_PATH), "storm_damage", "storm_damage_invalid"
+    )
+
+    stored = conn.execute("SELECT COUNT(*) FROM storm_damage").fetchone()[0]
+    assert 0 < first == stored
+    assert second == 0
+
+
+def test_dedup_keys_are_stored_for_earlier_reports(conn):
+    first, _ = DamageReportPipeline(conn, DAMAGE_REPORT_COLUMNS).process_csv(
+        str(CSV_PATH), "storm_damage", "storm_damage_invalid"
+    )
+    pipeline = DamageReportPipeline(conn, DAMAGE_REPORT_COLUMNS, dedup=True)
+    second, _ = pipeline.process_csv(
+        str(CSV_PATH), "storm_damage", "storm_damage_invalid"
+    )
+
+    assert first > 0 and second == 0
+    missing_keys = conn.execute(
+        """
+        SELECT COUNT(*) FROM storm_damage
+        WHERE address_key IS NULL OR house_number IS NULL
+    """
+    ).fetchone()[0]
+    assert missing_keys == 0
+
+
+def test_house_number_matches_normalized_address(conn):
+    addresses = ["12 West 3rd St", "  #12-34 Main", "0099 Broad", "Pier 5"]
+    rows = conn.execute(
+        f"""
+        SELECT
+            regexp_extract({normalized_address_expression()}, '^[0-9]*'),
+            {house_number_expression()}
+        FROM unnest(?) AS t(address)
+    """,
+        [addresses],
+    ).fetchall()
+
+    # Stored reports are prefiltered on the cheap expression, so it must
+    # agree with the normalized address the pairs are matched on
+    assert [new for _, new in rows] == ["12", "12", "0099", ""]
+    assert all(old == new for old, new in rows)
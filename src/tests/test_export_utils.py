@@ -0,0 +1,128 @@
+import threading
+
+import duckdb as db
+import pytest
+
+from building_damage.DamageReportPipeline import DamageReportPipeline
+from building_damage.utils.export_utils import (
+    _pending_rows,
+    ensure_watermark_table,
+    export_reports,
+    format_for_path,
+    get_watermark,
+    set_watermark,
+)
+from test_pipeline import CSV_PATH, CSV_SCHEMA
+
+
+def make_reports(conn):
+    conn.execute(
+        """
+        CREATE TABLE storm_damage AS
+        SELECT * FROM (VALUES
+            ('1000001', 40.7005, -73.9995, TIMESTAMP '2024-01-01 00:00:00'),
+            ('1000002', 40.7005, -73.9895, TIMESTAMP '2024-01-02 00:00:00')
+        ) AS t(bin, latitude, longitude, time_updated)
+        """
+    )
+
+
+def test_format_is_inferred_from_extension():
+    assert format_for_path("out/reports.fgb") == "flatgeobuf"
+    assert format_for_path("out/reports.parquet") == "geoparquet"
+    with pytest.raises(ValueError):
+        format_for_path("out/reports.csv")
+
+
+def test_pending_rows_respect_watermark():
+    conn = db.connect()
+    make_reports(conn)
+    ensure_watermark_table(conn)
+
+    assert get_watermark(conn, "tiles") is None
+    num_rows, newest = _pending_rows(conn, "storm_damage", None)
+    assert num_rows == 2
+
+    set_watermark(conn, "tiles", newest)
+    assert (
+        _pending_rows(conn, "storm_damage", get_watermark(conn, "tiles"))[0]
+        == 0
+    )
+    conn.close()
+
+
+def test_incremental_export_writes_only_new_reports(tmp_path):
+    conn = db.connect()
+    try:
+        conn.execute("LOAD spatial")
+    except db.Error:
+        pytest.skip("DuckDB spatial extension is not available")
+    make_reports(conn)
+    conn.execute(
+        "CREATE TABLE building_footprints (bin VARCHAR, geom GEOMETRY)"
+    )
+    output = str(tmp_path / "reports.parquet")
+
+    assert export_reports(conn, output, "geoparquet", watermark_name="t") == 2
+    assert export_reports(conn, output, "geoparquet", watermark_name="t") == 0
+
+    conn.execute(
+        """
+        INSERT INTO storm_damage
+        VALUES ('1000003', 40.7, -73.98, TIMESTAMP '2024-01-03 00:00:00')
+        """
+    )
+    assert export_reports(conn, output, "geoparquet", watermark_name="t") == 1
+    assert conn.execute(
+        f"SELECT bin FROM read_parquet('{output}')"
+    ).fetchall() == [("1000003",)]
+    conn.close()
+
+
+class GatedLock:
+    """Write lock that holds a pipeline back between validation and
+    commit until released."""
+
+    def __init__(self, lock):
+        self.lock = lock
+        self.waiting = threading.Event()
+        self.release = threading.Event()
+
+    def __enter__(self):
+        self.waiting.set()
+        self.release.wait()
+        return self.lock.__enter__()
+
+    def __exit__(self, *exc_info):
+        return self.lock.__exit__(*exc_info)
+
+
+def test_batch_committed_after_export_is_left_for_next_export():
+    conn = db.connect()
+    ensure_watermark_table(conn)
+    write_lock = threading.Lock()
+    gate = GatedLock(write_lock)
+    slow = DamageReportPipeline(conn.cursor(), CSV_SCHEMA, write_lock=gate)
+    fast = DamageReportPipeline(
+        conn.cursor(), CSV_SCHEMA, write_lock=write_lock
+    )
+
+    # The slow pipeline validates its batch first but commits last
+    slow_thread = threading.Thread(
+        target=slow.process_csv,
+        args=(str(CSV_PATH), "storm_damage", "storm_damage_invalid"),
+    )
+    slow_thread.start()
+    gate.waiting.wait()
+    valid, _ = fast.process_csv(
+        str(CSV_PATH), "storm_damage", "storm_damage_invalid"
+    )
+    num_rows, newest = _pending_rows(conn, "storm_damage", None)
+    assert num_rows == valid
+    set_watermark(conn, "tiles", newest)
+
+    gate.release.set()
+    slow_thread.join()
+    since = get_watermark(conn, "tiles")
+    assert _pending_rows(conn, "storm_damage", since)[0] == valid
+    conn.close()
@@ -0,0 +1,38 @@
+import duckdb as db
+
+from building_damage.DamageReportPipeline import DamageReportPipeline
+from building_damage.utils import extension_utils
+from building_damage.utils.extension_utils import (
+    ensure_extension,
+    set_extension_directory,
+)
+from test_pipeline import CSV_PATH, CSV_SCHEMA
+
+
+def test_ensure_extension_uses_pinned_directory_and_caches(tmp_path):
+    conn = db.connect()
+    set_extension_directory(str(tmp_path))
+    try:
+        ensure_extension(conn, "json")
+        ensure_extension(conn, "json")
+    finally:
+        set_extension_directory(None)
+
+    directory = conn.execute(
+        "SELECT current_setting('extension_directory')"
+    ).fetchone()[0]
+    assert directory == str(tmp_path)
+    assert extension_utils._loaded[conn] == {"json"}
+
+
+def test_pipeline_without_spatial_features_does_not_load_spatial():
+    conn = db.connect()
+    pipeline = DamageReportPipeline(conn, CSV_SCHEMA)
+    pipeline.process_csv(str(CSV_PATH), "storm_damage", "storm_damage_invalid")
+
+    loaded = conn.execute(
+        "SELECT loaded FROM duckdb_extensions() "
+        "WHERE extension_name = 'spatial'"
+    ).fetchone()[0]
+    assert not loaded
+    assert "spatial" not in extension_utils._loaded.get(conn, set())
@@ -0,0 +1,273 @@
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import duckdb as db
+import pytest
+import requests
+
+from building_damage.utils import extraction_utils
+from building_damage.utils.extraction_utils import (
+    SOCRATA_PAGING,
+    download_to_file,
+    fetch_pages,
+    fetch_source_version,
+    load_snapshot,
+    refresh_paged_geojson_table,
+    write_snapshot,
+)
+
+FEATURES = [
+    {
+        "type": "Feature",
+        "geometry": {"type": "Point", "coordinates": [-74.0, 40.7 + i / 1e4]},
+        "properties": {"bin": str(1000000 + i)},
+    }
+    for i in range(250)
+]
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Serves features like a Socrata GeoJSON endpoint.
+
+    Offsets listed in failures answer with a 500 that many times, and
+    offsets listed in stalls wait that many seconds before answering,
+    once. A $where of the form "field >= 'value'", and a $select of one
+    field or of "max(field) AS latest", are honoured.
+    """
+
+    features = FEATURES
+    failures = {}
+    stalls = {}
+    requested_offsets = []
+
+    def do_GET(self):
+        query = {
+            key: values[0]
+            for key, values in parse_qs(urlparse(self.path).query).items()
+        }
+        features = self.features
+        if "$where" in query:
+            field, value = re.match(
+                r"(\w+) >= '(.*)'", query["$where"]
+            ).groups()
+            features = [
+                feature
+                for feature in features
+                if feature["properties"][field] >= value
+            ]
+        select = query.get("$select")
+        latest = re.match(r"max\((\w+)\) AS latest", select or "")
+        if select == "count(*)":
+            properties = {"count": str(len(features))}
+            features = [{"type": "Feature", "properties": properties}]
+        elif latest:
+            value = max(
+                feature["properties"][latest.group(1)] for feature in features
+            )
+            features = [{"type": "Feature", "properties": {"latest": value}}]
+        else:
+            offset = int(query.get("$offset", 0))
+            limit = int(query.get("$limit", len(features)))
+            self.requested_offsets.append(offset)
+            if self.failures.get(offset, 0) > 0:
+                self.failures[offset] -= 1
+                self.send_error(500)
+                return
+            time.sleep(self.stalls.pop(offset, 0))
+            features = features[offset : offset + limit]
+            if select:
+                features = [
+                    {
+                        "type": "Feature",
+                        "geometry": None,
+                        "properties": {select: feature["properties"][select]},
+                    }
+                    for feature in features
+                ]
+
+        body = json.dumps(
+            {"type": "FeatureCollection", "features": features}
+        ).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/geo+json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    StandInHandler.features = FEATURES
+    StandInHandler.failures = {}
+    StandInHandler.stalls = {}
+    StandInHandler.requested_offsets = []
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_port}/resource.geojson"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_download_to_file_streams_body_to_disk(server, tmp_path):
+    path = tmp_path / "layer.geojson"
+
+    num_bytes = download_to_file(server, str(path), chunk_size=1024)
+
+    assert num_bytes == path.stat().st_size
+    assert json.loads(path.read_text())["features"] == FEATURES
+
+
+def read_pages(paths):
+    features = []
+    for path in paths:
+        with open(path) as page:
+            features.extend(json.load(page)["features"])
+    return features
+
+
+def test_fetch_pages_retries_failed_pages(server, tmp_path):
+    StandInHandler.failures = {100: 1}
+
+    paths = fetch_pages(
+        server,
+        SOCRATA_PAGING,
+        str(tmp_path),
+        page_size=100,
+        max_workers=3,
+        retry_delay=0,
+    )
+
+    assert len(paths) == 3
+    assert read_pages(paths) == FEATURES
+
+
+def test_fetch_pages_retries_stalled_pages(server, tmp_path, monkeypatch):
+    monkeypatch.setattr(extraction_utils, "REQUEST_TIMEOUT", (1, 0.2))
+    StandInHandler.stalls = {100: 1.0}
+
+    paths = fetch_pages(
+        server, SOCRATA_PAGING, str(tmp_path), page_size=100, retry_delay=0
+    )
+
+    assert StandInHandler.requested_offsets.count(100) == 2
+    assert read_pages(paths) == FEATURES
+
+
+def test_fetch_pages_resumes_from_checkpoint(server, tmp_path):
+    StandInHandler.failures = {200: 10}
+    with pytest.raises(requests.HTTPError, match="500"):
+        fetch_pages(
+            server,
+            SOCRATA_PAGING,
+            str(tmp_path),
+            page_size=100,
+            max_retries=2,
+            retry_delay=0,
+        )
+
+    StandInHandler.failures = {}
+    StandInHandler.requested_offsets = []
+    paths = fetch_pages(server, SOCRATA_PAGING, str(tmp_path), page_size=100)
+
+    assert StandInHandler.requested_offsets == [200]
+    assert read_pages(paths) == FEATURES
+
+
+def test_snapshot_is_invalidated_by_version_and_checksum(tmp_path):
+    source = db.connect()
+    source.execute("CREATE TABLE layer AS SELECT range AS id FROM range(100)")
+    path = write_snapshot(source, "layer", str(tmp_path), "v1")
+
+    worker = db.connect()
+    assert not load_snapshot(worker, "layer", str(tmp_path), "v2")
+    assert load_snapshot(worker, "layer", str(tmp_path), "v1", as_view=True)
+    assert worker.execute("SELECT COUNT(*) FROM layer").fetchone()[0] == 100
+
+    with open(path, "ab") as snapshot:
+        snapshot.write(b"corrupt")
+    assert not load_snapshot(db.connect(), "layer", str(tmp_path))
+
+
+def footprint(doitt_id, modified, height=10.0):
+    return {
+        "type": "Feature",
+        "geometry": {
+            "type": "Point",
+            "coordinates": [-74.0, 40.7 + doitt_id / 1e4],
+        },
+        "properties": {
+            "doitt_id": doitt_id,
+            "modified": modified,
+            "height": height,
+        },
+    }
+
+
+def test_incremental_refresh_inserts_updates_and_deletes(server):
+    conn = db.connect()
+    try:
+        conn.execute("LOAD spatial")
+    except db.Error:
+        pytest.skip("DuckDB spatial extension is not available")
+
+    def refresh():
+        return refresh_paged_geojson_table(
+            conn,
+            "footprints",
+            server,
+            SOCRATA_PAGING,
+            key_column="doitt_id",
+            modified_field="modified",
+            create_spatial_index=True,
+            remove_deleted=True,
+            page_size=2,
+        )
+
+    StandInHandler.features = [
+        footprint(i, "2024-01-01T00:00:00") for i in range(5)
+    ]
+    assert refresh() == 5
+
+    StandInHandler.features = [
+        footprint(0, "2024-01-01T00:00:00"),
+        footprint(1, "2024-02-01T00:00:00", height=25.0),
+        footprint(3, "2024-01-01T00:00:00"),
+        footprint(4, "2024-01-01T00:00:00"),
+        footprint(5, "2024-02-01T00:00:00"),
+    ]
+    refresh()
+
+    rows = conn.execute(
+        "SELECT doitt_id, height FROM footprints ORDER BY doitt_id"
+    ).fetchall()
+    assert rows == [(0, 10.0), (1, 25.0), (3, 10.0), (4, 10.0), (5, 10.0)]
+    assert conn.execute(
+        "SELECT index_name FROM duckdb_indexes() "
+        "WHERE table_name = 'footprints'"
+    ).fetchall() == [("footprints_geom",)]
+
+
+def test_source_version_follows_edits(server):
+    StandInHandler.features = [
+        footprint(0, "2024-01-01T00:00:00.000"),
+        footprint(1, "2024-03-01T12:30:00.000"),
+    ]
+    stamp = fetch_source_version(
+        server, SOCRATA_PAGING, modified_field="modified"
+    )
+    digest = fetch_source_version(server, SOCRATA_PAGING)
+
+    assert stamp == "2024-03-01T12:30:00"
+    assert digest == fetch_source_version(server, SOCRATA_PAGING)
+    StandInHandler.features = StandInHandler.features + [
+        footprint(2, "2024-04-01T00:00:00.000")
+    ]
+    assert fetch_source_version(server, SOCRATA_PAGING) != digest
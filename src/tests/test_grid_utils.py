@@ -0,0 +1,104 @@
+import duckdb as db
+import pytest
+
+from building_damage.DamageReportPipeline import (
+    DAMAGE_REPORT_COLUMNS,
+    DamageReportPipeline,
+)
+from building_damage.utils.grid_utils import (
+    GRID_ZOOM,
+    bbox_query,
+    cell_density_query,
+    cell_tile,
+    grid_cell,
+    grid_cell_expression,
+    radius_query,
+)
+from test_pipeline import CSV_PATH
+
+BBOX = (-74.0, 40.68, -73.95, 40.72)
+
+
+@pytest.fixture
+def conn():
+    conn = db.connect()
+    pipeline = DamageReportPipeline(
+        conn, DAMAGE_REPORT_COLUMNS, grid_index=True
+    )
+    pipeline.process_csv(str(CSV_PATH), "storm_damage", "storm_damage_invalid")
+    yield conn
+    conn.close()
+
+
+def test_sql_grid_cell_matches_python():
+    points = [(40.7128, -74.006), (40.6892, -74.0445), (-33.86, 151.21)]
+    conn = db.connect()
+    cells = [
+        conn.execute(
+            f"""
+            SELECT {grid_cell_expression()}
+            FROM (SELECT {lat} AS latitude, {lon} AS longitude)
+        """
+        ).fetchone()[0]
+        for lat, lon in points
+    ]
+    conn.close()
+
+    assert cells == [grid_cell(lat, lon) for lat, lon in points]
+    # NYC at zoom 16 is around tile (19295, 24640)
+    x, y, zoom = cell_tile(cells[0])
+    assert (x // 10, y // 10, zoom) == (1929, 2464, GRID_ZOOM)
+
+
+def test_bbox_and_radius_queries_match_coordinate_filters(conn):
+    min_lon, min_lat, max_lon, max_lat = BBOX
+    expected = conn.execute(
+        f"""
+        SELECT COUNT(*) FROM storm_damage
+        WHERE latitude BETWEEN {min_lat} AND {max_lat}
+        AND longitude BETWEEN {min_lon} AND {max_lon}
+    """
+    ).fetchone()[0]
+    assert expected > 0
+    assert len(conn.execute(bbox_query("storm_damage", BBOX)).fetchall()) == (
+        expected
+    )
+
+    distances = [
+        row[0]
+        for row in conn.execute(
+            f"""
+            SELECT distance_m
+            FROM ({radius_query("storm_damage", 40.7, -73.97, 2000)})
+        """
+        ).fetchall()
+    ]
+    assert distances and distances == sorted(distances)
+    assert max(distances) <= 2000
+
+
+def test_cell_density_rolls_up_to_coarser_zooms(conn):
+    total = conn.execute("SELECT COUNT(*) FROM storm_damage").fetchone()[0]
+    fine = conn.execute(cell_density_query("storm_damage", 16)).fetchall()
+    coarse = conn.execute(cell_density_query("storm_damage", 10)).fetchall()
+
+    assert sum(row[1] for row in fine) == total
+    assert sum(row[1] for row in coarse) == total
+    assert len(coarse) < len(fine)
+    with pytest.raises(ValueError):
+        cell_density_query("storm_damage", GRID_ZOOM + 1)
+
+
+def test_reports_are_stored_in_grid_cell_order(conn):
+    cells = [
+        row[0]
+        for row in conn.execute(
+            "SELECT grid_cell FROM storm_damage ORDER BY rowid"
+        ).fetchall()
+    ]
+
+    assert cells == sorted(cells)
+    # Pruning relies on zonemaps, so no index is kept up on insert
+    assert not conn.execute(
+        "SELECT * FROM duckdb_indexes() WHERE table_name = 'storm_damage'"
+    ).fetchall()
@@ -0,0 +1,52 @@
+import shutil
+import threading
+import time
+
+from building_damage.ConnectionPool import ConnectionPool
+from building_damage.IngestDaemon import IngestDaemon
+from test_pipeline import CSV_PATH, CSV_SCHEMA
+
+
+def wait_for(condition, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.05)
+
+
+def test_daemon_ingests_dropped_files_in_batches(tmp_path):
+    inbox = tmp_path / "inbox"
+    inbox.mkdir()
+    (inbox / "bad.csv").write_text('Address,City\n"unterminated\n')
+
+    with ConnectionPool(str(tmp_path / "daemon.db")) as pool:
+        daemon = IngestDaemon(
+            pool,
+            str(inbox),
+            CSV_SCHEMA,
+            "storm_damage",
+            "storm_damage_invalid",
+            max_wait=0.2,
+            poll_interval=0.05,
+        )
+        thread = threading.Thread(target=daemon.run)
+        thread.start()
+        try:
+            for name in ["a.csv", "b.csv"]:
+                shutil.copy(CSV_PATH, inbox / name)
+            wait_for(lambda: len(list(inbox.glob("*.csv"))) == 0)
+        finally:
+            daemon.stop()
+            thread.join()
+
+        with pool.session() as conn:
+            total = conn.execute(
+                "SELECT (SELECT COUNT(*) FROM storm_damage) "
+                "+ (SELECT COUNT(*) FROM storm_damage_invalid)"
+            ).fetchone()[0]
+
+    assert total == 2 * 625
+    assert len(list((inbox / "processed").iterdir())) == 2
+    assert [
+        path.name.split("_", 1)[1] for path in (inbox / "failed").iterdir()
+    ] == ["bad.csv"]
@@ -0,0 +1,107 @@
+import duckdb as db
+
+from building_damage.utils.csv_utils import (
+    iter_csv_chunk_offsets,
+    iter_csv_chunks,
+)
+from building_damage.utils.manifest_utils import (
+    ensure_manifest_table,
+    plan_ingest,
+    progress_recorder,
+    record_ingest,
+)
+
+
+def test_plan_ingest_skips_unchanged_and_tails_appends(tmp_path):
+    conn = db.connect()
+    ensure_manifest_table(conn)
+    csv_path = tmp_path / "reports.csv"
+    csv_path.write_text("a,b\n1,x\n")
+
+    plan = plan_ingest(conn, str(csv_path))
+    assert not plan.skip and plan.start_offset == 0
+    record_ingest(conn, plan.state)
+
+    assert plan_ingest(conn, str(csv_path)).skip
+
+    ingested_size = csv_path.stat().st_size
+    with open(csv_path, "a") as handle:
+        handle.write("2,y\n")
+    plan = plan_ingest(conn, str(csv_path))
+    assert not plan.skip and plan.start_offset == ingested_size
+    record_ingest(conn, plan.state)
+
+    csv_path.write_text("a,b\n9,z\n2,y\n")
+    plan = plan_ingest(conn, str(csv_path))
+    assert not plan.skip and plan.start_offset == 0
+
+
+def test_rows_appended_during_ingest_are_left_for_next_run(tmp_path):
+    conn = db.connect()
+    ensure_manifest_table(conn)
+    csv_path = tmp_path / "reports.csv"
+    csv_path.write_text("a,b\n1,x\n")
+
+    plan = plan_ingest(conn, str(csv_path))
+    # The feed writes more rows while the planned ingest is running
+    with open(csv_path, "a") as handle:
+        handle.write("2,y\n")
+    chunks = [
+        open(chunk).read()
+        for chunk in iter_csv_chunks(
+            str(csv_path), 10, plan.start_offset, plan.state.size
+        )
+    ]
+    assert chunks == ["a,b\n1,x\n"]
+    record_ingest(conn, plan.state)
+
+    plan = plan_ingest(conn, str(csv_path))
+    assert not plan.skip and plan.start_offset == len("a,b\n1,x\n")
+    chunks = [
+        open(chunk).read()
+        for chunk in iter_csv_chunks(
+            str(csv_path), 10, plan.start_offset, plan.state.size
+        )
+    ]
+    assert chunks == ["a,b\n2,y\n"]
+
+
+def test_unappendable_files_are_skipped_or_ingested_in_full(tmp_path):
+    conn = db.connect()
+    ensure_manifest_table(conn)
+    ndjson_path = tmp_path / "reports.ndjson"
+    ndjson_path.write_text('{"a": 1}\n')
+
+    plan = plan_ingest(conn, str(ndjson_path), appendable=False)
+    record_ingest(conn, plan.state)
+    assert plan_ingest(conn, str(ndjson_path), appendable=False).skip
+
+    with open(ndjson_path, "a") as handle:
+        handle.write('{"a": 2}\n')
+    plan = plan_ingest(conn, str(ndjson_path), appendable=False)
+    assert not plan.skip and plan.start_offset == 0
+
+
+def test_interrupted_ingest_resumes_after_last_committed_batch(tmp_path):
+    conn = db.connect()
+    ensure_manifest_table(conn)
+    csv_path = tmp_path / "reports.csv"
+    csv_path.write_text("a,b\n1,x\n2,y\n3,z\n")
+
+    plan = plan_ingest(conn, str(csv_path))
+    record = progress_recorder(conn, plan)
+    chunks = iter_csv_chunk_offsets(str(csv_path), 2, 0, plan.state.size)
+    _, chunk_end = next(chunks)
+    # Only the first batch commits before the run is interrupted
+    record(chunk_end)
+
+    plan = plan_ingest(conn, str(csv_path))
+    assert not plan.skip and plan.start_offset == len("a,b\n1,x\n2,y\n")
+    record = progress_recorder(conn, plan)
+    for chunk, chunk_end in iter_csv_chunk_offsets(
+        str(csv_path), 2, plan.start_offset, plan.state.size
+    ):
+        assert open(chunk).read() == "a,b\n3,z\n"
+        record(chunk_end)
+
+    assert plan_ingest(conn, str(csv_path)).skip
@@ -0,0 +1,102 @@
+from datetime import date, datetime, timedelta
+
+import duckdb as db
+import pytest
+
+from building_damage.DamageReportPipeline import (
+    DAMAGE_REPORT_COLUMNS,
+    DamageReportPipeline,
+)
+from building_damage.utils.partition_utils import (
+    archive_partitions,
+    compact_partitions,
+    time_window_filter,
+)
+from test_pipeline import CSV_PATH
+
+
+@pytest.fixture
+def conn():
+    conn = db.connect()
+    yield conn
+    conn.close()
+
+
+def ingest(conn, store, event, **kwargs):
+    pipeline = DamageReportPipeline(
+        conn,
+        DAMAGE_REPORT_COLUMNS,
+        partition_dir=str(store),
+        event=event,
+        **kwargs,
+    )
+    return pipeline.process_csv(str(CSV_PATH), "storm_damage", "invalid")
+
+
+def test_batches_land_in_event_partitions_behind_a_view(conn, tmp_path):
+    store = tmp_path / "store"
+    valid, _ = ingest(conn, store, "ida")
+    ingest(conn, store, "ida")
+    ingest(conn, store, "sandy")
+
+    counts = dict(
+        conn.execute(
+            "SELECT event, COUNT(*) FROM storm_damage GROUP BY event"
+        ).fetchall()
+    )
+    assert counts == {"ida": 2 * valid, "sandy": valid}
+    assert len(list(store.glob("event=ida/ingest_date=*/*.parquet"))) == 2
+
+    recent = time_window_filter(datetime.now() - timedelta(hours=1))
+    plan = conn.execute(
+        "EXPLAIN ANALYZE SELECT COUNT(*) FROM storm_damage "
+        f"WHERE event = 'sandy' AND {recent}"
+    ).fetchall()[0][1]
+    assert "Scanning Files: 1/3" in plan
+
+
+def test_failed_batch_leaves_no_files(conn, tmp_path):
+    store = tmp_path / "store"
+    with pytest.raises(db.Error):
+        ingest(conn, store, "ida", merge_key=["no_such_column"])
+
+    assert not list(store.glob("**/*.parquet*"))
+
+
+def test_batch_files_are_hidden_until_commit(conn, tmp_path):
+    store = tmp_path / "store"
+    pipeline = DamageReportPipeline(
+        conn, DAMAGE_REPORT_COLUMNS, partition_dir=str(store)
+    )
+    visible = []
+    pipeline.process_csv_chunked(
+        str(CSV_PATH),
+        "storm_damage",
+        "invalid",
+        batch_size=200,
+        on_commit=lambda _: visible.append(
+            len(list(store.glob("**/*.parquet")))
+        ),
+    )
+
+    # Each batch's files were still staged when its commit began
+    assert visible == list(range(len(visible)))
+    assert len(list(store.glob("**/*.parquet"))) == len(visible) > 1
+
+
+def test_compact_and_archive_old_partitions(conn, tmp_path):
+    store, archive = tmp_path / "store", tmp_path / "archive"
+    valid, _ = ingest(conn, store, "ida")
+    ingest(conn, store, "ida")
+    tomorrow = date.today() + timedelta(days=1)
+
+    assert compact_partitions(conn, str(store), before=tomorrow) == 1
+    assert len(list(store.glob("**/*.parquet"))) == 1
+    assert (
+        conn.execute("SELECT COUNT(*) FROM storm_damage").fetchone()[0]
+        == 2 * valid
+    )
+
+    archived = archive_partitions(str(store), str(archive), tomorrow, "ida")
+    assert [path.parent.name for path in archived] == ["event=ida"]
+    assert not list(store.glob("**/*.parquet"))
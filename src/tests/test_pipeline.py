@@ -0,0 +1,352 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import duckdb as db
+import pytest
+
+from building_damage.DamageReportPipeline import DamageReportPipeline
+from building_damage.utils.rollup_utils import (
+    ZIP_ROLLUP_TABLE,
+    backfill_rollups,
+    rollup_tracks,
+)
+
+CSV_PATH = Path(__file__).parents[2] / "data" / "raw" / "storm_damage_BIN.csv"
+
+CSV_SCHEMA = (
+    "Address VARCHAR,"
+    "City VARCHAR,"
+    "ZIP_Code VARCHAR,"
+    "No_Electricity BOOLEAN,"
+    "Basement_Flooded BOOLEAN,"
+    "Roof_Damaged BOOLEAN,"
+    "Insurance BOOLEAN,"
+    "BIN VARCHAR,"
+    "Latitude DOUBLE,"
+    "Longitude DOUBLE"
+)
+
+
+@pytest.fixture
+def conn():
+    conn = db.connect()
+    yield conn
+    conn.close()
+
+
+def count(conn, table):
+    return conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+
+def test_process_csv_routes_every_row(conn):
+    pipeline = DamageReportPipeline(conn, CSV_SCHEMA)
+
+    valid, invalid = pipeline.process_csv(
+        str(CSV_PATH), "storm_damage", "storm_damage_invalid"
+    )
+
+    csv_rows = count(conn, f"read_csv('{CSV_PATH}')")
+    assert valid + invalid == csv_rows
+    assert count(conn, "storm_damage") == valid
+    assert count(conn, "storm_damage_invalid") == invalid
+    assert invalid > 0
+
+
+def test_process_csv_can_run_twice_on_one_connection(conn):
+    pipeline = DamageReportPipeline(conn, CSV_SCHEMA)
+
+    first = pipeline.process_csv(
+        str(CSV_PATH), "storm_damage", "storm_damage_invalid"
+    )
+    second = pipeline.process_csv(
+        str(CSV_PATH), "storm_damage", "storm_damage_invalid"
+    )
+
+    assert first == second
+    assert count(conn, "storm_damage") == 2 * first[0]
+    columns = [
+        row[0] for row in conn.execute("DESCRIBE storm_damage").fetchall()
+    ]
+    assert columns[-1] == "time_updated"
+    assert "is_valid" not in columns
+
+
+def test_process_csv_chunked_matches_single_batch(conn):
+    pipeline = DamageReportPipeline(conn, CSV_SCHEMA)
+
+    whole = pipeline.process_csv(str(CSV_PATH), "whole", "whole_invalid")
+    chunked = pipeline.process_csv_chunked(
+        str(CSV_PATH), "chunked", "chunked_invalid", batch_size=50
+    )
+
+    assert chunked == whole
+    difference = conn.execute(
+        """
+        SELECT COUNT(*) FROM (
+            SELECT * EXCLUDE (time_updated) FROM whole
+            EXCEPT ALL
+            SELECT * EXCLUDE (time_updated) FROM chunked
+        )
+        """
+    ).fetchone()[0]
+    assert difference == 0
+
+
+def test_process_csv_files_maps_each_header(conn, tmp_path):
+    reordered = tmp_path / "reordered.csv"
+    conn.execute(
+        f"""
+        COPY (
+            SELECT Longitude, Latitude, BIN, Insurance, Roof_Damaged,
+                Basement_Flooded, No_Electricity, ZIP_Code, City, Address
+            FROM read_csv('{CSV_PATH}', all_varchar = true)
+        ) TO '{reordered}' (HEADER)
+        """
+    )
+    pipeline = DamageReportPipeline(conn, CSV_SCHEMA)
+
+    whole = pipeline.process_csv(str(CSV_PATH), "whole", "whole_invalid")
+    batch = pipeline.process_csv_files(
+        [str(CSV_PATH), str(reordered)], "batch", "batch_invalid"
+    )
+
+    assert batch == (2 * whole[0], 2 * whole[1])
+    difference = conn.execute(
+        """
+        SELECT COUNT(*) FROM (
+            SELECT * EXCLUDE (time_updated) FROM batch
+            EXCEPT ALL (
+                SELECT * EXCLUDE (time_updated) FROM whole
+                UNION ALL
+                SELECT * EXCLUDE (time_updated) FROM whole
+            )
+        )
+        """
+    ).fetchone()[0]
+    assert difference == 0
+
+
+def test_parallel_pipelines_share_one_writer(conn):
+    write_lock = threading.Lock()
+
+    def run(_):
+        cursor = conn.cursor()
+        try:
+            pipeline = DamageReportPipeline(
+                cursor, CSV_SCHEMA, write_lock=write_lock
+            )
+            return pipeline.process_csv(
+                str(CSV_PATH), "storm_damage", "storm_damage_invalid"
+            )
+        finally:
+            cursor.close()
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = list(executor.map(run, range(4)))
+
+    assert len(set(results)) == 1
+    assert count(conn, "storm_damage") == 4 * results[0][0]
+    assert count(conn, "storm_damage_invalid") == 4 * results[0][1]
+
+
+def test_merge_key_keeps_one_current_row_per_bin(conn):
+    pipeline = DamageReportPipeline(conn, CSV_SCHEMA, merge_key=["bin"])
+
+    valid, _ = pipeline.process_csv(
+        str(CSV_PATH), "storm_damage", "storm_damage_invalid"
+    )
+    pipeline.process_csv(str(CSV_PATH), "storm_damage", "storm_damage_invalid")
+
+    distinct_bins = conn.execute(
+        "SELECT COUNT(DISTINCT bin) FROM storm_damage"
+    ).fetchone()[0]
+    assert count(conn, "storm_damage") == 2 * valid
+    assert count(conn, "storm_damage_current") == distinct_bins
+    latest = conn.execute(
+        "SELECT MAX(time_updated) FROM storm_damage"
+    ).fetchone()[0]
+    assert (
+        conn.execute(
+            "SELECT MIN(time_updated) FROM storm_damage_current"
+        ).fetchone()[0]
+        == latest
+    )
+
+
+def test_zip_rollup_matches_full_aggregation(conn):
+    pipeline = DamageReportPipeline(conn, CSV_SCHEMA, maintain_rollups=True)
+
+    pipeline.process_csv(str(CSV_PATH), "storm_damage", "storm_damage_invalid")
+    pipeline.process_csv(str(CSV_PATH), "storm_damage", "storm_damage_invalid")
+
+    expected = conn.execute(
+        """
+        SELECT zip_code, COUNT(*), COUNT(*) FILTER (WHERE roof_damaged)
+        FROM storm_damage
+        WHERE zip_code IS NOT NULL
+        GROUP BY zip_code
+        ORDER BY zip_code
+    """
+    ).fetchall()
+    rollup = conn.execute(
+        """
+        SELECT zip_code, total_reports, roof_damaged
+        FROM zip_damage_rollup
+        ORDER BY zip_code
+    """
+    ).fetchall()
+    assert rollup == expected
+
+
+def test_backfill_builds_missing_zip_rollup_once(conn):
+    pipeline = DamageReportPipeline(conn, CSV_SCHEMA)
+    pipeline.process_csv(str(CSV_PATH), "storm_damage", "storm_damage_invalid")
+    # A district rollup already being maintained must not stop the
+    # ZIP rollup from being backfilled
+    conn.execute("CREATE TABLE district_damage_rollup (district VARCHAR)")
+
+    backfill_rollups(conn, "storm_damage")
+    backfill_rollups(conn, "storm_damage")
+
+    rollup_total = conn.execute(
+        "SELECT SUM(total_reports) FROM zip_damage_rollup"
+    ).fetchone()[0]
+    expected = conn.execute(
+        "SELECT COUNT(*) FROM storm_damage WHERE zip_code IS NOT NULL"
+    ).fetchone()[0]
+    assert rollup_total == expected
+    assert rollup_tracks(conn, ZIP_ROLLUP_TABLE, "storm_damage")
+    assert not rollup_tracks(conn, ZIP_ROLLUP_TABLE, "other_reports")
+
+
+def test_rollup_started_mid_table_is_not_complete(conn):
+    DamageReportPipeline(conn, CSV_SCHEMA).process_csv(
+        str(CSV_PATH), "storm_damage", "storm_damage_invalid"
+    )
+    DamageReportPipeline(conn, CSV_SCHEMA, maintain_rollups=True).process_csv(
+        str(CSV_PATH), "storm_damage", "storm_damage_invalid"
+    )
+
+    assert not rollup_tracks(conn, ZIP_ROLLUP_TABLE, "storm_damage")
+
+
+def test_invalid_rows_record_failed_rules(conn):
+    pipeline = DamageReportPipeline(conn, CSV_SCHEMA, profile_rules=True)
+
+    valid, invalid = pipeline.process_csv(
+        str(CSV_PATH), "storm_damage", "storm_damage_invalid"
+    )
+
+    assert "failed_rules" not in [
+        col[0]
+        for col in conn.execute(
+            "SELECT * FROM storm_damage LIMIT 0"
+        ).description
+    ]
+    assert (
+        conn.execute(
+            "SELECT COUNT(*) FROM storm_damage_invalid WHERE len(failed_rules) > 0"
+        ).fetchone()[0]
+        == invalid
+    )
+    failures = dict(
+        conn.execute(
+            "SELECT rule, failures FROM validation_rule_stats"
+        ).fetchall()
+    )
+    assert failures == pipeline.rule_failures
+    assert set(pipeline.rule_seconds) == set(pipeline.validation_rules())
+    assert conn.execute(
+        "SELECT DISTINCT batch_rows FROM validation_rule_stats"
+    ).fetchall() == [(valid + invalid,)]
+
+
+def test_stage_metrics_count_rows_from_batches(conn, tmp_path):
+    pipeline = DamageReportPipeline(
+        conn, CSV_SCHEMA, profile_dir=str(tmp_path)
+    )
+
+    valid, invalid = pipeline.process_csv_chunked(
+        str(CSV_PATH), "storm_damage", "storm_damage_invalid", batch_size=200
+    )
+
+    metrics = pipeline.metrics
+    assert metrics.total("load") == valid + invalid
+    assert metrics.total("insert_valid") == valid
+    assert metrics.total("insert_invalid") == invalid
+    assert "validate" in {m.stage for m in metrics.stages}
+    assert list(tmp_path.glob("*_load.json"))
+
+    metrics.write_table(conn)
+    assert count(conn, "pipeline_metrics") == len(metrics.stages)
+
+
+def test_batch_hooks_rewrite_staging_from_arrow(conn):
+    pc = pytest.importorskip("pyarrow.compute")
+
+    def lower_city(batch):
+        cities = batch.column("city")
+        return batch.set_column(
+            batch.schema.get_field_index("city"), "city", pc.utf8_lower(cities)
+        )
+
+    def drop_uninsured(batch):
+        return batch.filter(pc.fill_null(batch.column("insurance"), False))
+
+    class EnrichingPipeline(DamageReportPipeline):
+        batch_hooks = [lower_city, drop_uninsured]
+
+    pipeline = EnrichingPipeline(conn, CSV_SCHEMA, hook_workers=2)
+    valid, invalid = pipeline.process_csv(
+        str(CSV_PATH), "storm_damage", "storm_damage_invalid"
+    )
+
+    insured = count(conn, f"read_csv('{CSV_PATH}') WHERE Insurance")
+    assert valid + invalid == insured
+    assert (
+        conn.execute(
+            "SELECT COUNT(*) FROM storm_damage WHERE city <> lower(city)"
+        ).fetchone()[0]
+        == 0
+    )
+    assert "batch_hooks" in {
+        metric.stage for metric in pipeline.metrics.stages
+    }
+
+
+def test_batch_hooks_run_window_by_window(conn, monkeypatch):
+    pytest.importorskip("pyarrow")
+    monkeypatch.setattr("building_damage.BasePipeline.ARROW_BATCH_ROWS", 100)
+    batch_rows = []
+
+    def record_rows(batch):
+        batch_rows.append(batch.num_rows)
+        return batch
+
+    class CountingPipeline(DamageReportPipeline):
+        batch_hooks = [record_rows]
+
+    valid, invalid = CountingPipeline(
+        conn, CSV_SCHEMA, hook_workers=2
+    ).process_csv(str(CSV_PATH), "storm_damage", "storm_damage_invalid")
+
+    # Windows of two 100-row batches cover every staged row once
+    assert sum(batch_rows) == valid + invalid
+    assert max(batch_rows) <= 100 and len(batch_rows) > 2
+
+
+def test_process_csv_chunked_restores_memory_limit(conn):
+    pipeline = DamageReportPipeline(conn, CSV_SCHEMA)
+    setting = "SELECT current_setting('memory_limit')"
+    before = conn.execute(setting).fetchone()[0]
+
+    pipeline.process_csv_chunked(
+        str(CSV_PATH),
+        "storm_damage",
+        "storm_damage_invalid",
+        batch_size=200,
+        memory_limit="512MB",
+    )
+
+    assert conn.execute(setting).fetchone()[0] == before
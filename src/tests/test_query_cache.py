@@ -0,0 +1,75 @@
+import duckdb as db
+import pytest
+
+from building_damage.DamageReportPipeline import DamageReportPipeline
+from building_damage.QueryCache import QueryCache
+from test_pipeline import CSV_PATH, CSV_SCHEMA
+
+pytest.importorskip("pyarrow")
+
+FLOODED_PER_ZIP = """
+    SELECT zip_code, COUNT(*) FILTER (WHERE basement_flooded) AS flooded
+    FROM storm_damage
+    GROUP BY zip_code
+    ORDER BY zip_code
+"""
+
+
+@pytest.fixture
+def conn():
+    conn = db.connect()
+    yield conn
+    conn.close()
+
+
+def ingest(conn, cache):
+    pipeline = DamageReportPipeline(
+        conn, CSV_SCHEMA, maintain_rollups=True, result_cache=cache
+    )
+    return pipeline.process_csv(
+        str(CSV_PATH), "storm_damage", "storm_damage_invalid"
+    )
+
+
+def test_cache_hits_on_reformatted_query_until_commit(conn):
+    cache = QueryCache()
+    ingest(conn, cache)
+    conn.execute("CREATE VIEW roofs AS SELECT * FROM zip_damage_rollup")
+
+    first = cache.query(conn, FLOODED_PER_ZIP)
+    reformatted = " ".join(FLOODED_PER_ZIP.lower().split())
+    assert cache.query(conn, reformatted) is first
+    rollup = cache.query(
+        conn, "SELECT * FROM roofs WHERE total_reports > ?", [1]
+    )
+    assert (
+        cache.query(conn, "SELECT * FROM roofs WHERE total_reports > ?", [2])
+        is not rollup
+    )
+    assert (cache.hits, cache.misses) == (1, 3)
+
+    ingest(conn, cache)
+
+    assert len(cache) == 0
+    second = cache.query(conn, FLOODED_PER_ZIP)
+    assert second is not first
+    assert sum(second.column("flooded").to_pylist()) == 2 * sum(
+        first.column("flooded").to_pylist()
+    )
+
+
+def test_cache_evicts_least_recently_used(conn):
+    cache = QueryCache(max_entries=2)
+    queries = [f"SELECT {n} AS n" for n in range(3)]
+
+    first = cache.query(conn, queries[0])
+    cache.query(conn, queries[1])
+    cache.query(conn, queries[0])
+    cache.query(conn, queries[2])
+
+    assert len(cache) == 2
+    assert cache.query(conn, queries[0]) is first
+    cache.query(conn, queries[1])
+    assert cache.misses == 4
+    with pytest.raises(ValueError):
+        cache.query(conn, "DELETE FROM storm_damage")
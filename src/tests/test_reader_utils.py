@@ -0,0 +1,83 @@
+import duckdb as db
+import pytest
+
+from building_damage.DamageReportPipeline import (
+    DAMAGE_REPORT_COLUMNS,
+    DamageReportPipeline,
+)
+from building_damage.utils.reader_utils import source_format
+from test_pipeline import CSV_PATH
+
+
+@pytest.fixture
+def conn():
+    conn = db.connect()
+    yield conn
+    conn.close()
+
+
+def export(conn, path, options):
+    conn.execute(
+        f"COPY (SELECT * FROM read_csv('{CSV_PATH}', all_varchar = true)) "
+        f"TO '{path}' ({options})"
+    )
+
+
+def test_formats_match_csv(conn, tmp_path):
+    parquet_path, ndjson_path = tmp_path / "r.parquet", tmp_path / "r.ndjson"
+    export(conn, parquet_path, "FORMAT PARQUET")
+    export(conn, ndjson_path, "FORMAT JSON")
+    pipeline = DamageReportPipeline(conn, DAMAGE_REPORT_COLUMNS)
+
+    expected = pipeline.process_csv(str(CSV_PATH), "from_csv", "invalid")
+    assert pipeline.process_file(str(parquet_path), "from_parquet", "invalid")
+    assert pipeline.process_file(str(ndjson_path), "from_ndjson", "invalid")
+
+    for table in ["from_parquet", "from_ndjson"]:
+        difference = conn.execute(
+            f"""
+            SELECT COUNT(*) FROM (
+                SELECT * EXCLUDE (time_updated) FROM from_csv
+                EXCEPT ALL
+                SELECT * EXCLUDE (time_updated) FROM {table}
+            )
+            """
+        ).fetchone()[0]
+        assert difference == 0
+        count = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+        assert count == expected[0]
+
+
+def test_where_filters_rows_while_reading(conn, tmp_path):
+    parquet_path = tmp_path / "r.parquet"
+    export(conn, parquet_path, "FORMAT PARQUET")
+    pipeline = DamageReportPipeline(conn, DAMAGE_REPORT_COLUMNS)
+
+    valid, invalid = pipeline.process_file(
+        str(parquet_path), "reports", "invalid", where="zip_code = '10004'"
+    )
+
+    zips = conn.execute(
+        "SELECT DISTINCT zip_code FROM reports "
+        "UNION SELECT DISTINCT zip_code FROM invalid"
+    ).fetchall()
+    assert zips == [("10004",)]
+    assert 0 < valid + invalid < 625
+
+
+def test_process_arrow_table(conn):
+    pytest.importorskip("pyarrow")
+    table = conn.execute(
+        f"SELECT * FROM read_csv('{CSV_PATH}')"
+    ).to_arrow_table()
+    pipeline = DamageReportPipeline(conn, DAMAGE_REPORT_COLUMNS)
+
+    valid, invalid = pipeline.process_arrow(table, "reports", "invalid")
+
+    assert valid + invalid == 625
+
+
+def test_source_format_rejects_unknown_extensions():
+    assert source_format("feed.JSONL") == "ndjson"
+    with pytest.raises(ValueError):
+        source_format("feed.xlsx")
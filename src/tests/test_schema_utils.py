@@ -0,0 +1,48 @@
+import duckdb as db
+
+from building_damage.DamageReportPipeline import (
+    DAMAGE_REPORT_COLUMNS,
+    DamageReportPipeline,
+)
+from building_damage.utils import csv_utils
+from building_damage.utils.schema_utils import Column, parse_schema
+from test_pipeline import CSV_PATH
+
+
+def test_parse_schema_sanitizes_names_and_keeps_aliases():
+    columns = parse_schema("ZIP_Code VARCHAR, Price DECIMAL(10, 2)")
+
+    assert columns == [
+        Column("zip_code", "VARCHAR", ("ZIP_Code",)),
+        Column("price", "DECIMAL(10, 2)", ("Price",)),
+    ]
+
+
+def test_columns_are_mapped_by_name_not_position(tmp_path):
+    # Reordered, renamed and extra columns, with BIN missing entirely
+    csv_path = tmp_path / "feed.csv"
+    csv_path.write_text(
+        "lon;Source;lat;zip;city;address;Insurance;Roof_Damaged;"
+        "Basement_Flooded;No_Electricity\n"
+        "-74.01;app;40.71;10007; new york ;179 broadway;No;No;No;Yes\n"
+    )
+    conn = db.connect()
+    pipeline = DamageReportPipeline(conn, DAMAGE_REPORT_COLUMNS)
+    pipeline.process_csv(str(csv_path), "reports", "invalid")
+
+    row = conn.execute(
+        "SELECT address, city, zip_code, bin, latitude, longitude "
+        "FROM invalid"
+    ).fetchone()
+    assert row == ("179 BROADWAY", "NEW YORK", "10007", None, 40.71, -74.01)
+
+
+def test_dialect_is_sniffed_once_per_feed(tmp_path):
+    conn = db.connect()
+    copy = tmp_path / "copy.csv"
+    copy.write_bytes(CSV_PATH.read_bytes())
+
+    first = csv_utils.sniff_dialect(conn, str(CSV_PATH))
+    # Same header line, so the cached dialect is reused
+    assert csv_utils.sniff_dialect(conn, str(copy)) is first
+    assert first.headers[2] == "ZIP_Code"
@@ -0,0 +1,56 @@
+import duckdb as db
+import pytest
+
+from building_damage.utils.spatial_utils import assign_bins_from_footprints
+
+BIN_RULE = "LENGTH(bin::VARCHAR) >= 7 AND bin SIMILAR TO '[0-9]+'"
+
+
+@pytest.fixture
+def spatial_conn():
+    conn = db.connect()
+    try:
+        conn.execute("LOAD spatial")
+    except db.Error:
+        pytest.skip("DuckDB spatial extension is not available")
+    yield conn
+    conn.close()
+
+
+def test_assign_bins_fills_missing_and_uses_nearest(spatial_conn):
+    spatial_conn.execute(
+        """
+        CREATE TABLE building_footprints AS
+        SELECT * FROM (VALUES
+            ('1000001', ST_GeomFromText('POLYGON((-74.0 40.7, -73.999 40.7,
+                -73.999 40.701, -74.0 40.701, -74.0 40.7))')),
+            ('1000002', ST_GeomFromText('POLYGON((-73.99 40.7, -73.989 40.7,
+                -73.989 40.701, -73.99 40.701, -73.99 40.7))'))
+        ) AS t(bin, geom)
+        """
+    )
+    spatial_conn.execute(
+        """
+        CREATE TEMPORARY TABLE staging_data AS
+        SELECT bin, latitude::DOUBLE AS latitude, longitude::DOUBLE AS longitude
+        FROM (VALUES
+            ('0.0', 40.7005, -73.9995),
+            (NULL, 40.7005, -73.9888),
+            ('1000001', 40.7005, -73.9895),
+            ('0.0', 40.8, -73.9)
+        ) AS t(bin, latitude, longitude)
+        """
+    )
+
+    filled, mismatched = assign_bins_from_footprints(
+        spatial_conn, "staging_data", BIN_RULE
+    )
+
+    bins = [
+        row[0]
+        for row in spatial_conn.execute(
+            "SELECT bin FROM staging_data ORDER BY rowid"
+        ).fetchall()
+    ]
+    assert bins == ["1000001", "1000002", "1000001", "0.0"]
+    assert (filled, mismatched) == (2, 1)
@@ -0,0 +1,29 @@
+import duckdb as db
+
+from building_damage.DamageReportPipeline import DamageReportPipeline
+from building_damage.utils.synthetic_utils import write_synthetic_reports
+from test_pipeline import CSV_SCHEMA
+
+
+def test_synthetic_reports_are_deterministic(tmp_path):
+    conn = db.connect()
+    first, second = tmp_path / "a.csv", tmp_path / "b.csv"
+
+    write_synthetic_reports(conn, str(first), 1000, seed=7)
+    write_synthetic_reports(conn, str(second), 1000, seed=7)
+
+    assert first.read_bytes() == second.read_bytes()
+    conn.close()
+
+
+def test_synthetic_reports_fail_validation_at_invalid_ratio(tmp_path):
+    conn = db.connect()
+    csv_path = str(tmp_path / "reports.csv")
+    write_synthetic_reports(conn, csv_path, 20_000, invalid_ratio=0.1)
+
+    pipeline = DamageReportPipeline(conn, CSV_SCHEMA)
+    valid, invalid = pipeline.process_csv(csv_path, "reports", "invalid")
+
+    assert valid + invalid == 20_000
+    assert 1600 < invalid < 2400
+    conn.close()